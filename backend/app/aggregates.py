@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Response
+
+from app.async_database import get_async_connection
+from app.cache import notify_invalidation
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the advisory lock that stops several workers refreshing at once.
+_REFRESH_LOCK_KEY = 220022
+
+# Views the scheduler keeps fresh, in refresh order. Their definitions live in
+# app/migrations/0002_aggregates.sql (movie_catalogue since 0005_rating_histograms.sql).
+MATERIALIZED_VIEWS = ("movie_catalogue", "genre_stats")
+
+# Cached API responses derived from each view.
+_VIEW_ROUTES = {
+    "movie_catalogue": "/api/movies",
+    "genre_stats": "/api/genres",
+}
+
+
+async def refresh_view(view_name: str) -> bool:
+    """Concurrently refresh one view; returns False if another worker holds the refresh lock.
+
+    REFRESH ... CONCURRENTLY diffs into the existing view, so readers keep
+    seeing the previous contents until the new ones commit.
+    """
+    if view_name not in MATERIALIZED_VIEWS:
+        raise ValueError(f"Unknown materialized view: {view_name}")
+    started = time.monotonic()
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT pg_try_advisory_xact_lock(%s::int, hashtext(%s)) AS locked",
+                              (_REFRESH_LOCK_KEY, view_name))
+            row = await cur.fetchone()
+            if not row["locked"]:
+                return False
+            await cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}")
+            await cur.execute(
+                """
+                INSERT INTO aggregate_refreshes (view_name, refreshed_at, duration_ms)
+                VALUES (%s, NOW(), %s)
+                ON CONFLICT (view_name)
+                DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+                """,
+                (view_name, int((time.monotonic() - started) * 1000)),
+            )
+    logger.info("Refreshed %s in %.1fs", view_name, time.monotonic() - started)
+    await notify_invalidation(_VIEW_ROUTES[view_name])
+    return True
+
+
+async def refresh_all() -> None:
+    for view_name in MATERIALIZED_VIEWS:
+        try:
+            await refresh_view(view_name)
+        except Exception as e:
+            logger.warning("Could not refresh %s: %s", view_name, e)
+
+
+class RefreshScheduler:
+    """Background task, owned by the app lifespan, that periodically refreshes every view."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="aggregate-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await refresh_all()
+
+
+scheduler = RefreshScheduler(settings.AGGREGATE_REFRESH_INTERVAL)
+
+
+def set_freshness_header(response: Response, refreshed_at: Optional[datetime]) -> None:
+    """Tell clients when the aggregate they are reading was last rebuilt."""
+    if refreshed_at is not None:
+        response.headers["X-Data-Refreshed-At"] = refreshed_at.isoformat()
@@ -0,0 +1,182 @@
+"""Versioned on-disk artifacts built offline and served from memory.
+
+Build scripts write each version into ``ARTIFACTS_DIR/<name>/<version>/`` and
+then atomically repoint ``ARTIFACTS_DIR/<name>/CURRENT`` at it. API workers load
+the current version at startup, and ``ArtifactWatcher`` swaps a newer one in
+as soon as it is published, with no restart.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Generic, Optional, TypeVar
+
+import pandas as pd
+
+from app.cache import invalidate
+from app.config import settings
+from app.database import connect
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Versions kept per artifact; older ones are pruned when a new one is published.
+_KEEP_VERSIONS = 3
+
+
+class ArtifactUnavailable(Exception):
+    """The artifact has not been built yet, or failed to load."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.name = name
+
+
+def artifact_dir(name: str) -> Path:
+    return Path(settings.ARTIFACTS_DIR) / name
+
+
+def current_version(name: str) -> Optional[str]:
+    try:
+        return (artifact_dir(name) / "CURRENT").read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(name: str, write: Callable[[Path], None]) -> str:
+    """Build a new version with ``write(directory)`` and make it current."""
+    root = artifact_dir(name)
+    root.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"{int(now * 1000) % 1000:03d}"
+    staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=root))
+    try:
+        write(staging)
+        staging.rename(root / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    pointer = root / ".CURRENT.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, root / "CURRENT")
+    logger.info("Published %s version %s", name, version)
+
+    versions = sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    # Workers that still map an old version keep reading it after unlink.
+    for old in versions[:-_KEEP_VERSIONS]:
+        shutil.rmtree(root / old, ignore_errors=True)
+    return version
+
+
+def read_frame(sql: str, dtypes: dict[str, str]) -> pd.DataFrame:
+    """Run ``sql`` through COPY into a DataFrame; far faster than row fetches for bulk reads."""
+    conn = connect()
+    try:
+        with tempfile.TemporaryFile() as buf:
+            with conn.cursor() as cur:
+                cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buf)
+            buf.seek(0)
+            return pd.read_csv(buf, dtype=dtypes)
+    finally:
+        conn.close()
+
+
+class Artifact(Generic[T]):
+    """The loaded current version of one artifact.
+
+    ``load(directory)`` turns a version directory into the served object. A
+    failed reload keeps serving the previous version. Cached responses under
+    ``invalidates`` are dropped whenever a new version is swapped in.
+    """
+
+    def __init__(
+        self, name: str, load: Callable[[Path], T], invalidates: Optional[str] = None
+    ) -> None:
+        self.name = name
+        self._load = load
+        self.invalidates = invalidates
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self.version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        _registry.append(self)
+
+    def reload(self) -> bool:
+        """Load the current version if it differs from the one in memory."""
+        version = current_version(self.name)
+        if version is None or version == self.version:
+            return False
+        with self._lock:
+            if version == self.version:
+                return False
+            try:
+                value = self._load(artifact_dir(self.name) / version)
+            except Exception as e:
+                logger.warning("Could not load %s version %s: %s", self.name, version, e)
+                return False
+            self._value, self.version, self.loaded_at = value, version, time.time()
+        logger.info("Loaded %s version %s", self.name, version)
+        if self.invalidates is not None:
+            invalidate(self.invalidates)
+        return True
+
+    def load_version(self, version: str) -> T:
+        """Load a specific version without serving it, e.g. in a worker process."""
+        return self._load(artifact_dir(self.name) / version)
+
+    def get(self) -> T:
+        value = self._value
+        if value is None:
+            raise ArtifactUnavailable(self.name)
+        return value
+
+    def stats(self) -> dict[str, Any]:
+        return {"version": self.version, "loaded_at": self.loaded_at}
+
+
+_registry: list[Artifact] = []
+
+
+def reload_all() -> None:
+    for artifact in _registry:
+        artifact.reload()
+
+
+def artifact_stats() -> dict[str, dict[str, Any]]:
+    return {artifact.name: artifact.stats() for artifact in _registry}
+
+
+class ArtifactWatcher:
+    """Background task, owned by the app lifespan, that hot-swaps newly published artifacts."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await asyncio.to_thread(reload_all)
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="artifact-watcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(reload_all)
+
+
+watcher = ArtifactWatcher(settings.ARTIFACT_POLL_INTERVAL)
@@ -0,0 +1,455 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import logging
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, TypeVar
+
+from psycopg import AsyncConnection, OperationalError
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
+
+from app.config import settings
+from app.database import PoolStats, PoolTimeoutError, is_preparable, prepared_stats
+from app.metrics import register_pool, track_query, unregister_pool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_pool: Optional[AsyncConnectionPool] = None
+_stats = PoolStats()
+
+# Mirror of each connection's prepared-statement LRU, used only for hit/miss
+# accounting; psycopg itself PREPAREs, reuses and DEALLOCATEs the statements.
+# Prepared statements outlive putconn, so the mirror lives as long as the
+# connection object: a reconnect is a new object with an empty entry.
+_prepared: "weakref.WeakKeyDictionary[AsyncConnection, OrderedDict[str, None]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def conninfo(host: Optional[str] = None, port: Optional[int] = None) -> str:
+    return make_conninfo(
+        host=host or settings.DB_HOST,
+        port=port or settings.DB_PORT,
+        dbname=settings.DB_NAME,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+    )
+
+
+async def _configure(conn: AsyncConnection) -> None:
+    if settings.DB_PREPARED_STATEMENTS:
+        # Never prepare automatically; _execute opts in per statement with prepare=True.
+        conn.prepare_threshold = 2**31 - 1
+        conn.prepared_max = settings.DB_PREPARED_MAX
+    else:
+        conn.prepare_threshold = None
+
+
+async def _execute(cur, sql: str, params: tuple) -> None:
+    if not (settings.DB_PREPARED_STATEMENTS and is_preparable(sql)):
+        await cur.execute(sql, params)
+        return
+    seen = _prepared.setdefault(cur.connection, OrderedDict())
+    hit = sql in seen
+    prepared_stats.record(sql, hit=hit)
+    seen[sql] = None
+    seen.move_to_end(sql)
+    if len(seen) > settings.DB_PREPARED_MAX:
+        seen.popitem(last=False)
+        prepared_stats.record_eviction()
+    await cur.execute(sql, params, prepare=True)
+
+
+async def init_async_pool() -> None:
+    global _pool
+    pool = AsyncConnectionPool(
+        conninfo(),
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        timeout=settings.DB_POOL_TIMEOUT,
+        max_waiting=settings.DB_POOL_MAX_WAITING,
+        kwargs={"row_factory": dict_row},
+        configure=_configure,
+        open=False,
+    )
+    try:
+        await pool.open(wait=True, timeout=max(settings.DB_POOL_TIMEOUT, 1.0))
+        _pool = pool
+        logger.info("Async database connection pool created")
+    except PoolTimeout as e:
+        logger.warning("Could not connect to database: %s", e)
+        await pool.close()
+        _pool = None
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool:
+        await _pool.close()
+        _pool = None
+        logger.info("Async database connection pool closed")
+
+
+# --- Read replicas ---
+
+# How far a replica's replay is behind the primary; 0 when it has replayed
+# everything received (an idle primary must not look like lag), and for a
+# server that is not in recovery at all.
+_REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float8 AS lag
+"""
+
+
+class Replica:
+    """One read-replica pool plus its last observed health and replay lag."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.name = f"{host}:{port}"
+        self.pool = AsyncConnectionPool(
+            conninfo(host, port),
+            min_size=min(settings.DB_POOL_MIN_SIZE, settings.DB_REPLICA_POOL_MAX_SIZE),
+            max_size=settings.DB_REPLICA_POOL_MAX_SIZE,
+            timeout=settings.DB_POOL_TIMEOUT,
+            max_waiting=settings.DB_POOL_MAX_WAITING,
+            kwargs={"row_factory": dict_row},
+            configure=_configure,
+            open=False,
+        )
+        self.stats = PoolStats()
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    @property
+    def usable(self) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= settings.DB_REPLICA_MAX_LAG
+
+    async def check(self) -> None:
+        was_usable = self.usable
+        try:
+            async with self.pool.connection(timeout=settings.DB_POOL_TIMEOUT) as conn:
+                cur = await conn.execute(_REPLICA_LAG_SQL)
+                row = await cur.fetchone()
+            self.healthy, self.lag, self.error = True, float(row["lag"]), None
+        except Exception as e:
+            self.healthy, self.error = False, str(e)
+        self.checked_at = time.time()
+        if was_usable and not self.usable:
+            logger.warning("Replica %s bypassed (lag=%s, error=%s)", self.name, self.lag, self.error)
+        elif self.usable and not was_usable:
+            logger.info("Replica %s in use (lag=%.2fs)", self.name, self.lag)
+
+    def mark_failed(self, error: Exception) -> None:
+        self.healthy, self.error = False, str(error)
+        logger.warning("Replica %s failed, reading from the primary: %s", self.name, error)
+
+    def pool_stats(self) -> dict[str, Any]:
+        stats = self.pool.get_stats()
+        return self.stats.snapshot(
+            in_use=stats["pool_size"] - stats["pool_available"],
+            idle=stats["pool_available"],
+            waiters=stats.get("requests_waiting", 0),
+            max_size=self.pool.max_size,
+        )
+
+    def health(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": "in_use" if self.usable else ("lagging" if self.healthy else "unavailable"),
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_at": self.checked_at,
+        }
+
+
+class ReplicaSet:
+    """Lifespan-owned replica pools and the task that keeps their lag current.
+
+    Reads are spread round-robin over replicas within DB_REPLICA_MAX_LAG; when
+    none qualify they go to the primary.
+    """
+
+    def __init__(self) -> None:
+        self.replicas: list[Replica] = []
+        self._cycle = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        for host, port in settings.replica_hosts_list:
+            replica = Replica(host, port)
+            # Connect in the background: a replica that is down must not block start-up.
+            await replica.pool.open(wait=False)
+            register_pool(f"replica:{replica.name}", replica.pool_stats)
+            self.replicas.append(replica)
+        if self.replicas:
+            await self.check()
+            self._task = asyncio.create_task(self._run(), name="replica-monitor")
+            logger.info("Routing replica reads to %s", ", ".join(r.name for r in self.replicas))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            unregister_pool(f"replica:{replica.name}")
+            await replica.pool.close()
+        self.replicas = []
+
+    async def check(self) -> list[dict[str, Any]]:
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+        return [replica.health() for replica in self.replicas]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+    def pick(self) -> Optional[Replica]:
+        usable = [replica for replica in self.replicas if replica.usable]
+        return usable[next(self._cycle) % len(usable)] if usable else None
+
+    def pool_stats(self) -> dict[str, dict[str, Any]]:
+        return {replica.name: replica.pool_stats() for replica in self.replicas}
+
+
+replicas = ReplicaSet()
+
+# Whether reads in the current request may use a replica. Set by @replica_reads
+# and cleared by the first write, so reads after it see that write.
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+def replica_reads(endpoint):
+    """Let an endpoint's read helpers (execute_query, execute_query_one, stream_query) use replicas.
+
+    Only for endpoints that tolerate data up to DB_REPLICA_MAX_LAG old.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    return wrapper
+
+
+# --- Connections and query helpers ---
+
+async def _getconn(pool: AsyncConnectionPool, stats: PoolStats) -> AsyncConnection:
+    # psycopg_pool queues waiters FIFO and enforces the timeout / max_waiting bounds.
+    start = time.monotonic()
+    try:
+        conn = await pool.getconn()
+    except (PoolTimeout, TooManyRequests) as e:
+        stats.record_timeout()
+        raise PoolTimeoutError(str(e)) from e
+    stats.record_wait(time.monotonic() - start)
+    return conn
+
+
+async def _checkout(
+    readonly: bool,
+) -> tuple[AsyncConnectionPool, AsyncConnection, Optional[Replica]]:
+    """Return (pool, connection, replica); replica is None when the primary was used."""
+    if readonly:
+        replica = replicas.pick()
+        if replica is not None:
+            try:
+                return replica.pool, await _getconn(replica.pool, replica.stats), replica
+            except (PoolTimeoutError, OperationalError) as e:
+                replica.mark_failed(e)
+    if _pool is None:
+        raise ConnectionError("Async database pool is not initialised")
+    return _pool, await _getconn(_pool, _stats), None
+
+
+@asynccontextmanager
+async def _transaction(pool: AsyncConnectionPool, conn: AsyncConnection):
+    try:
+        yield conn
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    finally:
+        await pool.putconn(conn)
+
+
+@asynccontextmanager
+async def get_async_connection(readonly: bool = False):
+    """Yield a connection, committing on success; ``readonly`` allows a healthy replica."""
+    if not readonly:
+        _replica_reads.set(False)
+    pool, conn, _ = await _checkout(readonly)
+    async with _transaction(pool, conn):
+        yield conn
+
+
+async def _read(query: Callable[[AsyncConnection], Awaitable[T]]) -> T:
+    """Run ``query`` on a replica when the request allows it, else on the primary.
+
+    A replica that fails during the query (restart, failover, dropped
+    connection) is marked unhealthy and the read is retried once on the primary.
+    """
+    pool, conn, replica = await _checkout(_replica_reads.get())
+    try:
+        async with _transaction(pool, conn):
+            return await query(conn)
+    except OperationalError as e:
+        if replica is None:
+            raise
+        replica.mark_failed(e)
+    pool, conn, _ = await _checkout(False)
+    async with _transaction(pool, conn):
+        return await query(conn)
+
+
+async def execute_query(
+    sql: str, params: tuple = (), *, name: Optional[str] = None
+) -> list[dict[str, Any]]:
+    async def query(conn: AsyncConnection) -> list[dict[str, Any]]:
+        async with conn.cursor() as cur:
+            with track_query(sql, name) as observed:
+                await _execute(cur, sql, params)
+                rows = await cur.fetchall()
+                observed.rows = len(rows)
+            return rows
+
+    return await _read(query)
+
+
+def stream_query(
+    sql: str, params: tuple = (), batch_size: Optional[int] = None
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Yield result rows in batches from a server-side cursor.
+
+    Only one batch is held in memory at a time, so arbitrarily large results
+    can be exported with flat memory use. The connection is held until the
+    generator is exhausted or closed. The pool is chosen when this is called,
+    inside the endpoint, even though rows are only fetched later while the
+    response streams.
+    """
+    return _stream(sql, params, batch_size or settings.DB_STREAM_BATCH_SIZE, _replica_reads.get())
+
+
+async def _batches(
+    conn: AsyncConnection, sql: str, params: tuple, batch_size: int
+) -> AsyncIterator[list[dict[str, Any]]]:
+    async with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cur:
+        cur.itersize = batch_size
+        await cur.execute(sql, params)
+        while True:
+            rows = await cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+
+async def _stream(
+    sql: str, params: tuple, batch_size: int, readonly: bool
+) -> AsyncIterator[list[dict[str, Any]]]:
+    pool, conn, replica = await _checkout(readonly)
+    started = False
+    try:
+        async with _transaction(pool, conn):
+            async for rows in _batches(conn, sql, params, batch_size):
+                started = True
+                yield rows
+        return
+    except OperationalError as e:
+        # Once rows have gone to the client the stream cannot be restarted elsewhere.
+        if replica is None or started:
+            raise
+        replica.mark_failed(e)
+    pool, conn, _ = await _checkout(False)
+    async with _transaction(pool, conn):
+        async for rows in _batches(conn, sql, params, batch_size):
+            yield rows
+
+
+async def execute_query_one(
+    sql: str, params: tuple = (), *, name: Optional[str] = None
+) -> Optional[dict[str, Any]]:
+    async def query(conn: AsyncConnection) -> Optional[dict[str, Any]]:
+        async with conn.cursor() as cur:
+            with track_query(sql, name) as observed:
+                await _execute(cur, sql, params)
+                row = await cur.fetchone()
+                observed.rows = int(row is not None)
+            return row
+
+    return await _read(query)
+
+
+async def execute_command(sql: str, params: tuple = (), *, name: Optional[str] = None) -> None:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            with track_query(sql, name) as observed:
+                await _execute(cur, sql, params)
+                observed.rows = max(cur.rowcount, 0)
+
+
+async def execute_returning(
+    sql: str, params: tuple = (), *, name: Optional[str] = None
+) -> Optional[dict[str, Any]]:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            with track_query(sql, name) as observed:
+                await _execute(cur, sql, params)
+                row = await cur.fetchone()
+                observed.rows = int(row is not None)
+            return row
+
+
+def pool_stats() -> Optional[dict[str, Any]]:
+    if _pool is None:
+        return None
+    stats = _pool.get_stats()
+    return _stats.snapshot(
+        in_use=stats["pool_size"] - stats["pool_available"],
+        idle=stats["pool_available"],
+        waiters=stats.get("requests_waiting", 0),
+        max_size=_pool.max_size,
+    )
+
+
+register_pool("async", pool_stats)
+
+
+async def is_healthy() -> bool:
+    """Whether the primary answers; replicas are reported by replicas.check()."""
+    try:
+        await execute_query_one("SELECT 1", name="health_check")
+        return True
+    except Exception:
+        return False
@@ -1,40 +1,62 @@
 from typing import Optional
 
-from app.database import execute_command, execute_query_one, execute_returning
+from app.async_database import execute_command, execute_query_one, execute_returning
+from app.cache import TTLCache
+from app.config import settings
 
+# user_id -> public user row, for the per-request get_current_user lookup.
+_user_cache = TTLCache(settings.AUTH_USER_CACHE_SIZE)
 
-def ensure_app_users_table() -> None:
-    execute_command("""
-        CREATE TABLE IF NOT EXISTS app_users (
-            user_id SERIAL PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            email VARCHAR(255) NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP DEFAULT NOW()
-        )
-    """)
 
+def invalidate_user(user_id: int) -> None:
+    """Call after any write to an app_users row."""
+    _user_cache.delete(user_id)
 
-def create_user(username: str, email: str, password_hash: str) -> Optional[dict]:
-    return execute_returning(
+
+async def create_user(username: str, email: str, password_hash: str) -> Optional[dict]:
+    user = await execute_returning(
         """
         INSERT INTO app_users (username, email, password_hash)
         VALUES (%s, %s, %s)
         RETURNING user_id, username, email, created_at
         """,
         (username, email, password_hash),
+        name="create_user",
+    )
+    if user is not None:
+        invalidate_user(user["user_id"])
+    return user
+
+
+async def update_password_hash(user_id: int, password_hash: str) -> None:
+    await execute_command(
+        "UPDATE app_users SET password_hash = %s WHERE user_id = %s",
+        (password_hash, user_id),
+        name="update_password_hash",
     )
+    invalidate_user(user_id)
 
 
-def get_user_by_username(username: str) -> Optional[dict]:
-    return execute_query_one(
+async def get_user_by_username(username: str) -> Optional[dict]:
+    return await execute_query_one(
         "SELECT user_id, username, email, password_hash, created_at FROM app_users WHERE username = %s",
         (username,),
+        name="get_user_by_username",
     )
 
 
-def get_user_by_id(user_id: int) -> Optional[dict]:
-    return execute_query_one(
+async def get_user_by_id(user_id: int) -> Optional[dict]:
+    return await execute_query_one(
         "SELECT user_id, username, email, created_at FROM app_users WHERE user_id = %s",
         (user_id,),
+        name="get_user_by_id",
     )
+
+
+async def get_user_by_id_cached(user_id: int) -> Optional[dict]:
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = await get_user_by_id(user_id)
+        if user is not None:
+            _user_cache.set(user_id, user, settings.AUTH_USER_CACHE_TTL)
+    return user
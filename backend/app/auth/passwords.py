@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pinning min/max rounds to the configured cost makes passlib flag any hash made
+# with a different cost as needing an update, so login can rehash it.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+def verify_and_update(plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """Return (valid, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class PasswordHashingBusy(Exception):
+    """More password hashes are pending than PASSWORD_HASH_MAX_PENDING allows."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated process pool so it never holds a web worker's GIL.
+
+    Admission is bounded: once ``max_pending`` operations are queued or running,
+    further calls fail immediately with PasswordHashingBusy instead of queueing.
+    A pool broken by a dead worker is replaced on the next failure. Without a
+    started pool (scripts, tests) work falls back to the threadpool.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    def start(self) -> None:
+        if self._executor is None and self.workers > 0:
+            self._executor = self._new_executor()
+            logger.info("Password hashing pool started with %d workers", self.workers)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that already runs the event loop and pool threads is unsafe.
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        # Every call in flight on a broken pool fails; only the first one replaces it.
+        if self._executor is broken:
+            logger.error("Password hashing worker died; restarting the pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHashingBusy()
+        if self._executor is None:
+            self._pending += 1
+            try:
+                return await run_in_threadpool(fn, *args)
+            finally:
+                self._pending -= 1
+        try:
+            return await self._submit(fn, *args)
+        except BrokenProcessPool:
+            if self._executor is None:
+                raise
+            # Hashing is idempotent: retry once on the replacement pool.
+            return await self._submit(fn, *args)
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+        self._pending += 1
+        # The slot is released when the work finishes, not when the caller
+        # stops waiting: a disconnected client's bcrypt run still holds a worker.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update, plain, hashed)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+
+hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
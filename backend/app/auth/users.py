@@ -3,10 +3,10 @@ from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from psycopg2 import IntegrityError
+from psycopg import IntegrityError
 
 from app.config import settings
+from app.auth.passwords import hasher
 from app.auth.schemas import (
     RefreshRequest,
     TokenResponse,
@@ -18,22 +18,21 @@ from app.auth import db as auth_db
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
-
-
-def create_access_token(user_id: int) -> str:
+def create_access_token(user: dict) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Profile claims let get_current_user skip the lookup when AUTH_TRUST_TOKEN_CLAIMS is on.
     return jwt.encode(
-        {"sub": str(user_id), "exp": expire, "type": "access"},
+        {
+            "sub": str(user["user_id"]),
+            "exp": expire,
+            "type": "access",
+            "username": user["username"],
+            "email": user["email"],
+            "created_at": user["created_at"].isoformat(),
+        },
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM,
     )
@@ -48,7 +47,7 @@ def create_refresh_token(user_id: int) -> str:
     )
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInfo:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInfo:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid or expired token",
@@ -63,17 +62,25 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInfo:
     except JWTError:
         raise credentials_exception
 
-    user = auth_db.get_user_by_id(int(user_id))
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "username" in payload:
+        return UserInfo(
+            user_id=int(user_id),
+            username=payload["username"],
+            email=payload["email"],
+            created_at=payload["created_at"],
+        )
+
+    user = await auth_db.get_user_by_id_cached(int(user_id))
     if user is None:
         raise credentials_exception
     return UserInfo(**user)
 
 
 @router.post("/register", response_model=UserInfo, status_code=status.HTTP_201_CREATED)
-def register(data: UserRegister):
-    hashed = hash_password(data.password)
+async def register(data: UserRegister):
+    hashed = await hasher.hash(data.password)
     try:
-        user = auth_db.create_user(data.username, data.email, hashed)
+        user = await auth_db.create_user(data.username, data.email, hashed)
     except IntegrityError as e:
         if "unique" in str(e).lower() or "duplicate" in str(e).lower():
             raise HTTPException(
@@ -87,21 +94,27 @@ def register(data: UserRegister):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: UserLogin):
-    user = auth_db.get_user_by_username(data.username)
-    if user is None or not verify_password(data.password, user["password_hash"]):
+async def login(data: UserLogin):
+    user = await auth_db.get_user_by_username(data.username)
+    valid, new_hash = False, None
+    if user is not None:
+        valid, new_hash = await hasher.verify_and_update(data.password, user["password_hash"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
         )
+    if new_hash is not None:
+        # Stored hash used an outdated bcrypt cost; upgrade it transparently.
+        await auth_db.update_password_hash(user["user_id"], new_hash)
     return TokenResponse(
-        access_token=create_access_token(user["user_id"]),
+        access_token=create_access_token(user),
         refresh_token=create_refresh_token(user["user_id"]),
     )
 
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh(data: RefreshRequest):
+async def refresh(data: RefreshRequest):
     try:
         payload = jwt.decode(data.refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id = payload.get("sub")
@@ -111,16 +124,16 @@ def refresh(data: RefreshRequest):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
-    user = auth_db.get_user_by_id(int(user_id))
+    user = await auth_db.get_user_by_id(int(user_id))
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
 
     return TokenResponse(
-        access_token=create_access_token(int(user_id)),
+        access_token=create_access_token(user),
         refresh_token=create_refresh_token(int(user_id)),
     )
 
 
 @router.get("/me", response_model=UserInfo)
-def me(current_user: UserInfo = Depends(get_current_user)):
+async def me(current_user: UserInfo = Depends(get_current_user)):
     return current_user
@@ -0,0 +1,161 @@
+"""In-memory title prefix index behind /api/movies/autocomplete.
+
+Every title is indexed under each of its word starts, so "mat" finds both
+"Matrix, The (1999)" and "The Matrix Reloaded". Keys live in one sorted list:
+a query is two bisections for its key range, then a top-N by rating count
+over that range. The index is built at startup and rebuilt in the background
+whenever cached /api/movies responses are invalidated.
+"""
+import asyncio
+import bisect
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Optional
+
+import numpy as np
+
+from app.async_database import execute_query
+from app.cache import add_invalidation_hook
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_YEAR = re.compile(r"\s*\(\d{4}(?:-\d{4})?\)\s*$")
+# MovieLens files leading articles at the end: "Matrix, The".
+_MOVED_ARTICLE = re.compile(r"^(.*), (the|a|an|les|la|le|il|el|das|der|die)$", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w]+")
+
+# Candidates considered per query before de-duplicating titles matched by several words.
+_CANDIDATE_FACTOR = 4
+
+
+def normalize(text: str) -> str:
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", folded).split())
+
+
+def _keys(title: str) -> set[str]:
+    base = _TRAILING_YEAR.sub("", title)
+    forms = {normalize(base)}
+    moved = _MOVED_ARTICLE.match(base)
+    if moved:
+        forms.add(normalize(f"{moved.group(2)} {moved.group(1)}"))
+    keys = set()
+    for form in forms:
+        words = form.split(" ")
+        keys.update(" ".join(words[i:]) for i in range(len(words)))
+    keys.discard("")
+    return keys
+
+
+class PrefixIndex:
+    def __init__(self, movies: list[dict[str, Any]]) -> None:
+        entries = sorted(
+            (key, i) for i, movie in enumerate(movies) for key in _keys(movie["title"])
+        )
+        self.movies = movies
+        self.keys = [key for key, _ in entries]
+        self.positions = np.array([i for _, i in entries], dtype=np.int32)
+        popularity = np.array([m["num_ratings"] or 0 for m in movies], dtype=np.int64)
+        self.popularity = popularity[self.positions] if len(entries) else popularity[:0]
+
+    def search(self, query: str, limit: int) -> list[dict[str, Any]]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        if lo == hi:
+            return []
+        scores = self.popularity[lo:hi]
+        k = min(limit * _CANDIDATE_FACTOR, hi - lo)
+        top = np.argpartition(-scores, k - 1)[:k] if k < hi - lo else np.arange(hi - lo)
+        top = top[np.lexsort((self.positions[lo + top], -scores[top]))]
+        seen: set[int] = set()
+        results = []
+        for offset in top:
+            pos = int(self.positions[lo + offset])
+            if pos not in seen:
+                seen.add(pos)
+                results.append(self.movies[pos])
+                if len(results) == limit:
+                    break
+        return results
+
+    def __len__(self) -> int:
+        return len(self.movies)
+
+
+class TitleIndex:
+    """Lifespan-owned holder that rebuilds the prefix index when the catalogue changes."""
+
+    _PREFIX = "/api/movies"
+
+    def __init__(self) -> None:
+        self._index: Optional[PrefixIndex] = None
+        self._stale: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.built_at: Optional[float] = None
+        add_invalidation_hook(self._on_invalidate)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stale = asyncio.Event()
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.warning("Could not build the title index: %s", e)
+            self._stale.set()
+        self._task = asyncio.create_task(self._run(), name="title-index")
+
+    async def stop(self) -> None:
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def rebuild(self) -> None:
+        started = time.monotonic()
+        movies = await execute_query(
+            "SELECT movie_id, title, year, num_ratings FROM movie_catalogue",
+            name="autocomplete_titles",
+        )
+        self._index = await asyncio.to_thread(PrefixIndex, movies)
+        self.built_at = time.time()
+        logger.info("Built title index over %d movies in %.2fs",
+                    len(movies), time.monotonic() - started)
+
+    def _on_invalidate(self, path_prefix: Optional[str]) -> None:
+        # Called from whichever thread invalidated the cache.
+        prefix = path_prefix or ""
+        if not (self._PREFIX.startswith(prefix) or prefix.startswith(self._PREFIX)):
+            return
+        loop, stale = self._loop, self._stale
+        if loop is not None and stale is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(stale.set)
+
+    async def _run(self) -> None:
+        while True:
+            await self._stale.wait()
+            self._stale.clear()
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.warning("Could not rebuild the title index: %s", e)
+                await asyncio.sleep(30)
+                self._stale.set()
+
+    def search(self, query: str, limit: int) -> Optional[list[dict[str, Any]]]:
+        """Top matches by rating count, or None before the first build finishes."""
+        index = self._index
+        return None if index is None else index.search(query, limit)
+
+
+title_index = TitleIndex()
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Optional
+
+import psycopg
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.async_database import conninfo, execute_command
+from app.config import settings
+from app.singleflight import flights
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel that data loads use to invalidate every worker's cache.
+INVALIDATION_CHANNEL = "cache_invalidate"
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire after a per-entry TTL."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# --- HTTP response cache ---
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    media_type: Optional[str]
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+response_cache = TTLCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def cached(ttl: int):
+    """Opt an endpoint into the response cache for ``ttl`` seconds.
+
+    Only takes effect on routers built with ``route_class=CachedRoute``. The key
+    is the path plus query string, so cached endpoints must not vary per user.
+    """
+    def decorator(endpoint):
+        endpoint.cache_ttl = ttl
+        return endpoint
+    return decorator
+
+
+def cache_key(request: Request) -> tuple[str, str]:
+    return request.url.path, "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _respond(request: Request, entry: CachedResponse) -> Response:
+    # no-cache: clients may store the body but must revalidate, which costs a 304.
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+def _replay(entry: CachedResponse) -> Response:
+    return Response(content=entry.body, media_type=entry.media_type, headers=entry.headers)
+
+
+class CachedRoute(APIRoute):
+    """Route class for ``@cached`` and ``@coalesced`` endpoints.
+
+    Cached endpoints are served from ``response_cache`` with ETags. On a miss,
+    and always for coalesced endpoints, identical concurrent requests share a
+    single execution of the endpoint through ``app.singleflight``; each caller
+    then gets its own Response built from the shared body.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        ttl = getattr(self.endpoint, "cache_ttl", None)
+        coalesce = getattr(self.endpoint, "coalesce", False)
+        if ttl is None and not coalesce:
+            return handler
+
+        async def run(request: Request) -> tuple[Request, Any]:
+            """Run the endpoint; a buffered 200 is returned (and cached) as a CachedResponse."""
+            response = await handler(request)
+            if response.status_code != 200 or not hasattr(response, "body"):
+                return request, response
+            headers = {
+                k: v for k, v in response.headers.items()
+                if k not in ("content-length", "content-type")
+            }
+            entry = CachedResponse(
+                body=response.body,
+                media_type=response.media_type,
+                etag=f'"{hashlib.sha256(response.body).hexdigest()[:32]}"',
+                headers=headers,
+            )
+            if ttl is not None:
+                response_cache.set(cache_key(request), entry, ttl)
+            return request, entry
+
+        async def shared_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+            key = cache_key(request)
+            entry = response_cache.get(key) if ttl is not None else None
+            if entry is None:
+                owner, result = await flights.do_async(key, run, request)
+                if not isinstance(result, CachedResponse):
+                    # Errors and streamed bodies can only be sent once, by the
+                    # caller that ran the endpoint; the others run it themselves.
+                    return result if owner is request else await handler(request)
+                entry = result
+            return _respond(request, entry) if ttl is not None else _replay(entry)
+
+        return shared_handler
+
+
+_invalidation_hooks: list[Callable[[Optional[str]], None]] = []
+
+
+def add_invalidation_hook(hook: Callable[[Optional[str]], None]) -> None:
+    """Call ``hook(path_prefix)`` on every invalidation, e.g. to rebuild derived in-memory state.
+
+    Hooks may run on any thread and must not block.
+    """
+    _invalidation_hooks.append(hook)
+
+
+def invalidate(path_prefix: Optional[str] = None) -> int:
+    """Drop cached responses under ``path_prefix`` (all of them if None) in this process."""
+    if path_prefix is None:
+        count = len(response_cache)
+        response_cache.clear()
+    else:
+        count = response_cache.delete_where(lambda key: key[0].startswith(path_prefix))
+    logger.info("Invalidated %d cached responses under %s", count, path_prefix or "/")
+    for hook in _invalidation_hooks:
+        try:
+            hook(path_prefix)
+        except Exception as e:
+            logger.warning("Invalidation hook %r failed: %s", hook, e)
+    return count
+
+
+async def notify_invalidation(path_prefix: Optional[str] = None) -> None:
+    """Invalidate ``path_prefix`` in every worker listening on the database."""
+    invalidate(path_prefix)
+    await execute_command("SELECT pg_notify(%s, %s)", (INVALIDATION_CHANNEL, path_prefix or ""))
+
+
+class InvalidationListener:
+    """LISTENs for invalidation notices so loads in other processes can clear this cache.
+
+    Scripts publish with ``SELECT pg_notify('cache_invalidate', '<path prefix>')``;
+    an empty payload clears everything.
+    """
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    conninfo(), autocommit=True
+                ) as conn:
+                    await conn.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+                    async for notice in conn.notifies():
+                        invalidate(notice.payload or None)
+            except psycopg.Error as e:
+                logger.warning("Cache invalidation listener disconnected: %s", e)
+                # Anything may have changed while we were not listening.
+                invalidate()
+                await asyncio.sleep(5)
+
+
+invalidation_listener = InvalidationListener()
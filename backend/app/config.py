@@ -10,12 +10,75 @@ class Settings(BaseSettings):
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
 
+    # Connection pool (per worker process; size against Postgres max_connections)
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free connection
+    DB_POOL_MAX_WAITING: int = 0  # queued requests before shedding load, 0 = unbounded
+    DB_POOL_RETRY_AFTER: int = 1  # Retry-After seconds on 503 when the pool is saturated
+    DB_STREAM_BATCH_SIZE: int = 2000  # rows fetched per round trip by server-side cursors
+    DB_PREPARED_STATEMENTS: bool = False  # prepare helper queries once per pooled connection
+    DB_PREPARED_MAX: int = 100  # prepared statements kept per connection (LRU)
+    SLOW_QUERY_MS: int = 0  # log helper queries slower than this, 0 = off
+
+    # Read replicas (optional; same credentials as the primary). Endpoints marked
+    # @replica_reads send their reads here; writes and later reads in the same
+    # request stay on the primary.
+    DB_REPLICA_HOSTS: str = ""  # comma-separated host[:port] list, empty = primary only
+    DB_REPLICA_POOL_MAX_SIZE: int = 10  # per replica
+    DB_REPLICA_MAX_LAG: float = 10.0  # seconds of replay lag before reads fall back to the primary
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0  # seconds between replica health / lag checks
+
+    # Aggregates
+    AGGREGATE_REFRESH_INTERVAL: int = 900  # seconds between materialized view refreshes, 0 = off
+
+    # Caching
+    MOVIE_TOTAL_CACHE_TTL: int = 300  # seconds a cached movie-list total stays valid
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    ANALYTICS_CACHE_TTL: int = 600  # default TTL for cached analytics responses
+
+    # Movie details
+    MOVIE_BATCH_MAX: int = 1000  # ids accepted by /api/movies/batch
+
+    # Collections
+    COLLECTION_BULK_MAX: int = 1000  # movie ids accepted per bulk add/remove request
+
+    # Offline artifacts (built by `python -m app.<module>`, hot-swapped when republished)
+    ARTIFACTS_DIR: str = "artifacts"
+    ARTIFACT_POLL_INTERVAL: int = 30  # seconds between checks for new versions, 0 = startup only
+    SIMILARITY_TOP_K: int = 50  # neighbours stored per movie
+    SIMILARITY_GENRE_WEIGHT: float = 0.3  # share of the score from genre overlap vs rating behaviour
+    SIMILARITY_SHRINKAGE: float = 25  # co-raters at which a rating similarity counts half
+    RATING_MODEL_MIN_RATINGS: int = 20  # ratings a movie needs to be a training sample
+    RATING_MODEL_TREES: int = 200
+    PREDICTION_BATCH_MAX: int = 10000  # items accepted by /api/predictions/predict/batch
+    SEGMENT_WORKERS: int = 2  # processes fitting segment models in parallel
+    CROSS_GENRE_CHUNK_USERS: int = 20000  # user ids aggregated per pass of the cross-genre build
+
+    # Jobs (/api/jobs, see app/jobs.py)
+    JOB_WORKERS: int = 1  # job processes per API worker, 0 = leave jobs to `python -m app.jobs`
+    JOB_POLL_INTERVAL: float = 2.0  # seconds between checks for queued jobs
+    JOB_STALE_AFTER: int = 60  # seconds without a heartbeat before a running job is retried
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETENTION: int = 604800  # seconds a finished job is kept after it was last requested
+
     # JWT
     SECRET_KEY: str = "change-me-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # changing this rehashes passwords on their next login
+    PASSWORD_HASH_WORKERS: int = 2  # dedicated bcrypt processes per web worker, 0 = threadpool
+    PASSWORD_HASH_MAX_PENDING: int = 32  # queued + running hashes before shedding with 503
+    PASSWORD_HASH_RETRY_AFTER: int = 2
+
+    # Auth user lookups
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: int = 60  # seconds; bounds staleness across worker processes
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False  # build the current user from signed claims, no lookup
+
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
 
@@ -27,6 +90,14 @@ class Settings(BaseSettings):
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    @property
+    def replica_hosts_list(self) -> list[tuple[str, int]]:
+        hosts = []
+        for entry in filter(None, (e.strip() for e in self.DB_REPLICA_HOSTS.split(","))):
+            host, _, port = entry.rpartition(":") if ":" in entry else (entry, "", "")
+            hosts.append((host, int(port) if port else self.DB_PORT))
+        return hosts
+
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
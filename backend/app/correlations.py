@@ -0,0 +1,255 @@
+"""Precomputed correlation matrices behind the personality analytics endpoints.
+
+Build offline and publish with::
+
+    python -m app.correlations trait-genre cross-genre
+
+Correlations are pairwise-complete: each (row, column) pair uses only the users
+with a value for both, so a user who never rated a genre neither counts as
+neutral towards it nor drops out of every other pair. All pairs come out of a
+handful of matrix products over the user axis; those sums are additive, so
+large user sets can be fed through in chunks.
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from scipy import sparse, stats
+
+from app.artifacts import Artifact, publish, read_frame
+from app.config import settings
+from app.preferences import genre_matrix, read_movie_genres
+from app.segments import TRAITS
+
+logger = logging.getLogger(__name__)
+
+TRAIT_GENRE_ARTIFACT = "trait_genre_correlation"
+CROSS_GENRE_ARTIFACT = "cross_genre_correlation"
+
+
+class CorrelationAccumulator:
+    """Sufficient statistics for Pearson's r between every column of X and of Y.
+
+    ``add`` takes a block of users: (users, p) and (users, q) arrays with NaN
+    for missing values. Memory is O(p * q) regardless of how many users pass
+    through.
+    """
+
+    def __init__(self, p: int, q: int) -> None:
+        shape = (p, q)
+        self.n = np.zeros(shape)
+        self.sx = np.zeros(shape)
+        self.sy = np.zeros(shape)
+        self.sxx = np.zeros(shape)
+        self.syy = np.zeros(shape)
+        self.sxy = np.zeros(shape)
+
+    def add(self, x: np.ndarray, y: np.ndarray) -> None:
+        mx = (~np.isnan(x)).astype(np.float64)
+        my = (~np.isnan(y)).astype(np.float64)
+        x0 = np.nan_to_num(x, nan=0.0)
+        y0 = np.nan_to_num(y, nan=0.0)
+        self.n += mx.T @ my
+        self.sx += x0.T @ my
+        self.sy += mx.T @ y0
+        self.sxx += (x0 * x0).T @ my
+        self.syy += mx.T @ (y0 * y0)
+        self.sxy += x0.T @ y0
+
+    def add_sparse(self, x: sparse.spmatrix) -> None:
+        """Correlate the columns of ``x`` with each other; stored entries are the observed values.
+
+        The masks are ``x``'s sparsity pattern, so ``n`` comes out of an
+        indicator-matrix product and no dense block is ever materialised.
+        """
+        x = sparse.csr_matrix(x)
+        indicator = x.copy()
+        indicator.data = np.ones_like(indicator.data)
+        squares = x.multiply(x)
+        self.n += (indicator.T @ indicator).toarray()
+        self.sx += (x.T @ indicator).toarray()
+        self.sy += (indicator.T @ x).toarray()
+        self.sxx += (squares.T @ indicator).toarray()
+        self.syy += (indicator.T @ squares).toarray()
+        self.sxy += (x.T @ x).toarray()
+
+    def result(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (r, two-sided p-value, n); r and p are NaN where undefined."""
+        n = self.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = self.sxy - self.sx * self.sy / n
+            var_x = self.sxx - self.sx ** 2 / n
+            var_y = self.syy - self.sy ** 2 / n
+            r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+            r[(n < 3) | (var_x <= 0) | (var_y <= 0)] = np.nan
+            dof = n - 2
+            t = r * np.sqrt(dof / np.maximum(1 - r ** 2, 1e-12))
+            p = 2 * stats.t.sf(np.abs(t), np.maximum(dof, 1))
+        p[np.isnan(r)] = np.nan
+        return r, p, n.astype(np.int64)
+
+
+def _indices(names: list[str], name: Optional[str]) -> list[int]:
+    if name is None:
+        return list(range(len(names)))
+    return [names.index(name)] if name in names else []
+
+
+@dataclass
+class CorrelationMatrix:
+    rows: list[str]
+    columns: list[str]
+    r: np.ndarray
+    p: np.ndarray
+    n: np.ndarray
+
+    def pairs(
+        self, row: Optional[str] = None, column: Optional[str] = None
+    ) -> list[tuple[str, str, float, float, int]]:
+        """Defined (row, column, r, p, n) entries, strongest correlation first."""
+        out = [
+            (self.rows[i], self.columns[j],
+             float(self.r[i, j]), float(self.p[i, j]), int(self.n[i, j]))
+            for i in _indices(self.rows, row) for j in _indices(self.columns, column)
+            if not np.isnan(self.r[i, j])
+        ]
+        out.sort(key=lambda e: -abs(e[2]))
+        return out
+
+
+def cross_genre_pairs(matrix: CorrelationMatrix, min_shared_users: int) -> list[dict]:
+    """Each unordered genre pair once, strongest correlation first."""
+    return [
+        {"genre_a": a, "genre_b": b, "correlation": round(r, 4), "shared_users": n}
+        for a, b, r, _, n in matrix.pairs()
+        if a < b and n >= min_shared_users
+    ]
+
+
+def load(directory: Path) -> CorrelationMatrix:
+    data = np.load(directory / "matrix.npz")
+    return CorrelationMatrix(
+        rows=data["rows"].tolist(),
+        columns=data["columns"].tolist(),
+        r=data["r"], p=data["p"], n=data["n"],
+    )
+
+
+def save(directory: Path, matrix: CorrelationMatrix) -> None:
+    np.savez(
+        directory / "matrix.npz",
+        rows=np.array(matrix.rows), columns=np.array(matrix.columns),
+        r=matrix.r, p=matrix.p, n=matrix.n,
+    )
+
+
+trait_genre: Artifact[CorrelationMatrix] = Artifact(
+    TRAIT_GENRE_ARTIFACT, load, invalidates="/api/personality/genre-correlation"
+)
+cross_genre: Artifact[CorrelationMatrix] = Artifact(
+    CROSS_GENRE_ARTIFACT, load, invalidates="/api/ratings/cross-genre"
+)
+
+
+# --- Offline builds ---
+
+def build_trait_genre() -> str:
+    """Correlate each Big Five trait with each genre preference (genre mean minus user mean)."""
+    started = time.monotonic()
+    personality = read_frame(
+        f"SELECT user_id, {', '.join(TRAITS)} FROM personality ORDER BY user_id",
+        {"user_id": "int32", **{t: "float64" for t in TRAITS}},
+    )
+    ratings = read_frame(
+        "SELECT r.user_id, r.movie_id, r.rating FROM ratings r JOIN personality p USING (user_id)",
+        {"user_id": "int32", "movie_id": "int32", "rating": "float32"},
+    )
+    movie_ids, movie_genres, genres = read_movie_genres()
+    # Rows line up with ``personality``: both are ordered by user_id.
+    matrix = genre_matrix(
+        personality["user_id"].to_numpy(), ratings, movie_ids, movie_genres, genres
+    )
+
+    acc = CorrelationAccumulator(len(TRAITS), len(genres))
+    acc.add(personality[TRAITS].to_numpy(dtype=np.float64), matrix.preferences())
+    r, p, n = acc.result()
+    result = CorrelationMatrix(rows=list(TRAITS), columns=genres, r=r, p=p, n=n)
+
+    version = publish(TRAIT_GENRE_ARTIFACT, lambda directory: save(directory, result))
+    logger.info("Built trait x genre correlations for %d users in %.1fs",
+                len(personality), time.monotonic() - started)
+    return version
+
+
+def build_cross_genre(chunk_users: Optional[int] = None) -> str:
+    """Correlate users' mean ratings between every pair of genres.
+
+    Users are read and aggregated one user_id range at a time, so memory is
+    bounded by the chunk size rather than the number of users.
+    """
+    started = time.monotonic()
+    chunk_users = chunk_users or settings.CROSS_GENRE_CHUNK_USERS
+    movie_ids, movie_genres, genres = read_movie_genres()
+    bounds = read_frame(
+        "SELECT MIN(user_id) AS lo, MAX(user_id) AS hi FROM ratings", {"lo": "Int64", "hi": "Int64"}
+    ).iloc[0]
+    acc = CorrelationAccumulator(len(genres), len(genres))
+    users = 0
+    if not bounds.isna().any():
+        for lo in range(int(bounds["lo"]), int(bounds["hi"]) + 1, chunk_users):
+            ratings = read_frame(
+                f"SELECT user_id, movie_id, rating FROM ratings "
+                f"WHERE user_id >= {lo} AND user_id < {lo + chunk_users}",
+                {"user_id": "int32", "movie_id": "int32", "rating": "float32"},
+            )
+            if ratings.empty:
+                continue
+            rows = ratings["user_id"].to_numpy() - lo
+            cols = np.searchsorted(movie_ids, ratings["movie_id"].to_numpy())
+            known = (cols < len(movie_ids)) & (
+                movie_ids[np.minimum(cols, len(movie_ids) - 1)] == ratings["movie_id"].to_numpy()
+            )
+            rows, cols = rows[known], cols[known]
+            shape = (chunk_users, len(movie_ids))
+            rated = sparse.csr_matrix(
+                (ratings["rating"].to_numpy(dtype=np.float64)[known], (rows, cols)), shape=shape
+            )
+            seen = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+            # Ratings are positive, so sums and counts share one sparsity pattern.
+            counts = seen @ movie_genres
+            means = (rated @ movie_genres).multiply(counts.power(-1))
+            acc.add_sparse(means)
+            users += len(np.unique(rows))
+
+    r, p, n = acc.result()
+    result = CorrelationMatrix(rows=genres, columns=genres, r=r, p=p, n=n)
+    version = publish(CROSS_GENRE_ARTIFACT, lambda directory: save(directory, result))
+    logger.info("Built cross-genre correlations for %d users in %.1fs",
+                users, time.monotonic() - started)
+    return version
+
+
+BUILDS = {"trait-genre": build_trait_genre, "cross-genre": build_cross_genre}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build and publish correlation matrices.")
+    parser.add_argument(
+        "matrices", nargs="*", help=f"Matrices to build: {', '.join(BUILDS)} (default: all)"
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.matrices) - set(BUILDS)
+    if unknown:
+        parser.error(f"unknown matrices: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    for name in args.matrices or BUILDS:
+        print(f"{name}: {BUILDS[name]()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,225 @@
-import logging
+import bisect
+import hashlib
+import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from typing import Any, Optional
 
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import errors, extensions, pool
 from psycopg2.extras import RealDictCursor
 
 from app.config import settings
+from app.metrics import registry, sql_fingerprint, track_query
 
-logger = logging.getLogger(__name__)
+# Upper bounds (seconds) of the connection wait-time histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolTimeoutError(ConnectionError):
+    """No pooled connection became free within DB_POOL_TIMEOUT, or the wait queue is full."""
+
+
+class PoolStats:
+    """Thread-safe acquisition counters and wait-time histogram for a connection pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self._acquired = 0
+        self._timeouts = 0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._bucket_counts[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self._wait_sum += seconds
+            self._acquired += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self, in_use: int, idle: int, waiters: int, max_size: int) -> dict[str, Any]:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(WAIT_BUCKETS + (float("inf"),), self._bucket_counts):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "in_use": in_use,
+                "idle": idle,
+                "waiters": waiters,
+                "max_size": max_size,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "wait_seconds": {
+                    "buckets": buckets,
+                    "sum": round(self._wait_sum, 6),
+                    "count": self._acquired,
+                },
+            }
+
+
+# --- Prepared statements ---
+
+# Only plannable statements can be PREPAREd; DDL, EXPLAIN etc. run as plain SQL.
+_PREPARABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES)\b", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+def is_preparable(sql: str) -> bool:
+    return bool(_PREPARABLE.match(sql))
+
+
+class PreparedStatementStats:
+    """Process-wide prepared-statement cache hit / miss counters."""
+
+    # Per-statement counters stop growing past this many distinct statements.
+    MAX_TRACKED = 500
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._by_statement: dict[str, list[int]] = {}
+
+    def record(self, sql: str, hit: bool) -> None:
+        key = sql_fingerprint(sql)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            counts = self._by_statement.get(key)
+            if counts is None and len(self._by_statement) < self.MAX_TRACKED:
+                counts = self._by_statement[key] = [0, 0]
+            if counts is not None:
+                counts[0 if hit else 1] += 1
+
+    def record_eviction(self) -> None:
+        with self._lock:
+            self.evictions += 1
+
+    def snapshot(self, top: int = 20) -> dict[str, Any]:
+        with self._lock:
+            hottest = sorted(self._by_statement.items(), key=lambda kv: -(kv[1][0] + kv[1][1]))
+            return {
+                "enabled": settings.DB_PREPARED_STATEMENTS,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "statements": [
+                    {"sql": sql, "hits": hits, "misses": misses}
+                    for sql, (hits, misses) in hottest[:top]
+                ],
+            }
+
+
+prepared_stats = PreparedStatementStats()
+
+
+class PreparingConnection(extensions.connection):
+    """psycopg2 connection that remembers which statements it has PREPAREd.
+
+    The cache lives on the connection object, so a connection the pool
+    discards and replaces starts empty, matching the new server session.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: OrderedDict[str, str] = OrderedDict()
+
+
+def _positional(sql: str) -> str:
+    counter = iter(range(1, 1 << 16))
+    return _PLACEHOLDER.sub(lambda m: "%" if m.group() == "%%" else f"${next(counter)}", sql)
+
+
+def _execute_prepared(cur, sql: str, params: tuple) -> None:
+    conn = cur.connection
+    name = conn.prepared.get(sql)
+    if name is not None:
+        conn.prepared.move_to_end(sql)
+        prepared_stats.record(sql, hit=True)
+    else:
+        name = "ps_" + hashlib.sha1(sql.encode()).hexdigest()[:20]
+        cur.execute(f"PREPARE {name} AS {_positional(sql)}")
+        conn.prepared[sql] = name
+        prepared_stats.record(sql, hit=False)
+        while len(conn.prepared) > settings.DB_PREPARED_MAX:
+            _, evicted = conn.prepared.popitem(last=False)
+            cur.execute(f"DEALLOCATE {evicted}")
+            prepared_stats.record_eviction()
+    args = f" ({', '.join(['%s'] * len(params))})" if params else ""
+    cur.execute(f"EXECUTE {name}{args}", params or None)
+
+
+def _execute(cur, sql: str, params: tuple) -> None:
+    if not (settings.DB_PREPARED_STATEMENTS and is_preparable(sql)):
+        cur.execute(sql, params)
+        return
+    try:
+        _execute_prepared(cur, sql, params)
+    except (errors.InvalidSqlStatementName, errors.FeatureNotSupported) as e:
+        # The server session lost our statements (reset / DISCARD ALL) or a
+        # schema change invalidated a cached plan: start over on this connection.
+        if isinstance(e, errors.FeatureNotSupported) and "cached plan" not in str(e):
+            raise
+        cur.connection.rollback()
+        cur.connection.prepared.clear()
+        _execute_prepared(cur, sql, params)
+
+
+def _connect_kwargs() -> dict[str, Any]:
+    return {
+        "host": settings.DB_HOST,
+        "port": settings.DB_PORT,
+        "dbname": settings.DB_NAME,
+        "user": settings.DB_USER,
+        "password": settings.DB_PASSWORD,
+    }
+
+
+def connect():
+    """Open a dedicated (unpooled) connection, e.g. for long-running scripts."""
+    return psycopg2.connect(**_connect_kwargs())
+
+
+# --- Sync helpers for scripts ---
+#
+# The API uses app.async_database. These keep the same signatures for scripts
+# and one-off jobs, on a small pool that opens on first use.
 
 _pool: Optional[pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
 
 
-def init_pool() -> None:
+def _get_pool() -> pool.ThreadedConnectionPool:
     global _pool
-    try:
-        _pool = pool.ThreadedConnectionPool(
-            minconn=2,
-            maxconn=10,
-            host=settings.DB_HOST,
-            port=settings.DB_PORT,
-            dbname=settings.DB_NAME,
-            user=settings.DB_USER,
-            password=settings.DB_PASSWORD,
-        )
-        logger.info("Database connection pool created")
-    except psycopg2.OperationalError as e:
-        logger.warning("Could not connect to database: %s", e)
-        _pool = None
+    with _pool_lock:
+        if _pool is None:
+            _pool = pool.ThreadedConnectionPool(
+                0, settings.DB_POOL_MAX_SIZE, connection_factory=PreparingConnection,
+                **_connect_kwargs(),
+            )
+        return _pool
 
 
 def close_pool() -> None:
     global _pool
-    if _pool:
-        _pool.closeall()
-        _pool = None
-        logger.info("Database connection pool closed")
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
 
 
 @contextmanager
 def get_connection():
-    if _pool is None:
-        raise ConnectionError("Database pool is not initialised")
-    conn = _pool.getconn()
+    pool_ = _get_pool()
+    conn = pool_.getconn()
     try:
         yield conn
         conn.commit()
@@ -51,35 +227,50 @@ def get_connection():
         conn.rollback()
         raise
     finally:
-        _pool.putconn(conn)
+        pool_.putconn(conn)
 
 
-def execute_query(sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+def execute_query(
+    sql: str, params: tuple = (), *, name: Optional[str] = None
+) -> list[dict[str, Any]]:
     with get_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, params)
-            return [dict(row) for row in cur.fetchall()]
+            with track_query(sql, name) as observed:
+                _execute(cur, sql, params)
+                rows = [dict(row) for row in cur.fetchall()]
+                observed.rows = len(rows)
+            return rows
 
 
-def execute_query_one(sql: str, params: tuple = ()) -> Optional[dict[str, Any]]:
+def execute_query_one(
+    sql: str, params: tuple = (), *, name: Optional[str] = None
+) -> Optional[dict[str, Any]]:
     with get_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, params)
-            row = cur.fetchone()
+            with track_query(sql, name) as observed:
+                _execute(cur, sql, params)
+                row = cur.fetchone()
+                observed.rows = int(row is not None)
             return dict(row) if row else None
 
 
-def execute_command(sql: str, params: tuple = ()) -> None:
+def execute_command(sql: str, params: tuple = (), *, name: Optional[str] = None) -> None:
     with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, params)
+            with track_query(sql, name) as observed:
+                _execute(cur, sql, params)
+                observed.rows = max(cur.rowcount, 0)
 
 
-def execute_returning(sql: str, params: tuple = ()) -> Optional[dict[str, Any]]:
+def execute_returning(
+    sql: str, params: tuple = (), *, name: Optional[str] = None
+) -> Optional[dict[str, Any]]:
     with get_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, params)
-            row = cur.fetchone()
+            with track_query(sql, name) as observed:
+                _execute(cur, sql, params)
+                row = cur.fetchone()
+                observed.rows = int(row is not None)
             return dict(row) if row else None
 
 
@@ -89,3 +280,17 @@ def is_healthy() -> bool:
         return True
     except Exception:
         return False
+
+
+def _prepared_metric_lines():
+    for counter in ("hits", "misses", "evictions"):
+        yield f"# TYPE db_prepared_statement_{counter}_total counter"
+        yield f"db_prepared_statement_{counter}_total {getattr(prepared_stats, counter)}"
+
+
+registry.register_collector(_prepared_metric_lines)
+
+
+def prepared_statement_stats() -> dict[str, Any]:
+    return prepared_stats.snapshot()
+
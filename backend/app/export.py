@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_FORMAT_PATTERN = "^(ndjson|csv)$"
+
+_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    # Multi-valued columns (e.g. genres) use the MovieLens "|" separator.
+    if isinstance(value, (list, tuple)):
+        return "|".join(str(v) for v in value)
+    return value
+
+
+async def _ndjson(batches: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+
+async def _csv(
+    batches: AsyncIterator[list[dict[str, Any]]], columns: list[str]
+) -> AsyncIterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue()
+    async for rows in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_csv_value(row[col]) for col in columns] for row in rows)
+        yield buf.getvalue()
+
+
+def export_response(
+    batches: AsyncIterator[list[dict[str, Any]]],
+    fmt: str,
+    columns: list[str],
+    filename: str,
+) -> StreamingResponse:
+    """Stream batches of rows to the client as NDJSON or CSV, one batch per chunk."""
+    body = _csv(batches, columns) if fmt == "csv" else _ndjson(batches)
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,357 @@
+"""Asynchronous jobs for analytics that can outgrow an HTTP request.
+
+Clients POST ``/api/jobs/<kind>`` and get a job id back at once, then poll
+``GET /api/jobs/{job_id}`` and fetch ``GET /api/jobs/{job_id}/result``. Jobs and
+their results live in the ``jobs`` table (app/migrations/0006_jobs.sql), so any
+API worker can answer for a job another one ran.
+
+A job is identified by its kind, its parameters and the version of the
+artifact it reads, taken at submission. Identical submissions share one job,
+and a finished result is reused until a newer artifact is published.
+
+Work runs on ``JobRunner``'s process pool, never on the event loop. Each API
+worker runs JOB_WORKERS processes; with JOB_WORKERS=0, run dedicated workers::
+
+    python -m app.jobs --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+from app.artifacts import Artifact, ArtifactUnavailable
+from app.async_database import (
+    close_async_pool, execute_command, execute_query_one, execute_returning, init_async_pool,
+)
+from app.config import settings
+from app.correlations import cross_genre, cross_genre_pairs
+from app.segments import segments
+from app.similarity import index as similarity_index
+
+logger = logging.getLogger(__name__)
+
+
+class JobFailed(Exception):
+    """An expected failure inside a job; the message is reported to the client."""
+
+
+@dataclass(frozen=True)
+class JobKind:
+    artifact: Artifact
+    # (loaded artifact, params) -> JSON-serialisable result; runs in a worker process.
+    run: Callable[[Any, dict[str, Any]], Any]
+
+
+def _segments(value, params: dict[str, Any]) -> Any:
+    return value.for_count(params["n_segments"])
+
+
+def _cross_genre(value, params: dict[str, Any]) -> Any:
+    return cross_genre_pairs(value, params["min_shared_users"])
+
+
+def _similar(value, params: dict[str, Any]) -> Any:
+    similar = value.similar(params["movie_id"], params["limit"])
+    if similar is None:
+        raise JobFailed("Movie not found")
+    return similar
+
+
+# Each kind answers from its published artifact, exactly like the synchronous
+# endpoint. The builds themselves (python -m app.segments, app.correlations,
+# app.similarity) publish a version everyone reads, so they stay with whoever
+# runs them rather than with arbitrary API callers; a kind whose answer outgrows
+# its artifact changes only ``run``.
+JOB_KINDS = {
+    "segments": JobKind(segments, _segments),
+    "cross-genre": JobKind(cross_genre, _cross_genre),
+    "similar": JobKind(similarity_index, _similar),
+}
+
+
+# --- Worker processes ---
+
+# Artifact name -> (version, loaded value), so a worker loads each version once.
+_loaded: dict[str, tuple[str, Any]] = {}
+
+
+def execute(kind: str, version: str, params: dict[str, Any]) -> str:
+    """Worker-process entry point: run one job against ``version`` of its artifact; returns JSON."""
+    job_kind = JOB_KINDS[kind]
+    name = job_kind.artifact.name
+    loaded = _loaded.get(name)
+    if loaded is None or loaded[0] != version:
+        loaded = _loaded[name] = (version, job_kind.artifact.load_version(version))
+    return json.dumps(job_kind.run(loaded[1], params))
+
+
+# --- Job table ---
+
+_JOB_COLUMNS = (
+    "job_id, kind, params, status, artifact_version, error, attempts, "
+    "created_at, started_at, finished_at"
+)
+
+_SUBMIT_SQL = f"""
+    INSERT INTO jobs (kind, params, params_hash, artifact_version)
+    VALUES (%s, %s::jsonb, %s, %s)
+    ON CONFLICT (params_hash) WHERE status <> 'failed'
+    DO UPDATE SET requested_at = NOW()
+    RETURNING {_JOB_COLUMNS}
+"""
+
+_CLAIM_SQL = """
+    UPDATE jobs
+    SET status = 'running', started_at = NOW(), heartbeat_at = NOW(), attempts = attempts + 1
+    WHERE job_id = (
+        SELECT job_id FROM jobs
+        WHERE (status = 'queued'
+               OR (status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)))
+          AND attempts < %s
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING job_id, kind, params, artifact_version, attempts
+"""
+
+_FINISH_SQL = """
+    UPDATE jobs
+    SET status = %s, result = %s::jsonb, error = %s, finished_at = NOW()
+    WHERE job_id = %s AND status = 'running'
+"""
+
+_REQUEUE_SQL = "UPDATE jobs SET status = 'queued' WHERE job_id = %s AND status = 'running'"
+
+
+def params_hash(kind: str, params: dict[str, Any], version: str) -> str:
+    return hashlib.sha256(
+        json.dumps([kind, params, version], sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+async def submit(kind: str, params: dict[str, Any]) -> dict[str, Any]:
+    """Queue a job, or return the live job with the same kind, params and artifact version."""
+    artifact = JOB_KINDS[kind].artifact
+    version = artifact.version
+    if version is None:
+        raise ArtifactUnavailable(artifact.name)
+    job = await execute_returning(
+        _SUBMIT_SQL,
+        (kind, json.dumps(params), params_hash(kind, params, version), version),
+        name="submit_job",
+    )
+    if job["status"] == "queued":
+        runner.wake()
+    return job
+
+
+async def get_job(job_id: UUID, with_result: bool = False) -> Optional[dict[str, Any]]:
+    columns = f"{_JOB_COLUMNS}, result" if with_result else _JOB_COLUMNS
+    return await execute_query_one(
+        f"SELECT {columns} FROM jobs WHERE job_id = %s", (job_id,), name="get_job"
+    )
+
+
+# --- Runner ---
+
+class JobRunner:
+    """Claims queued jobs from Postgres and runs them on a dedicated process pool.
+
+    Owned by the app lifespan (or ``python -m app.jobs``). Running jobs get a
+    heartbeat every poll; one whose runner stops beating for JOB_STALE_AFTER
+    seconds is claimed again by another runner, and one whose worker process
+    dies is queued again at once, up to JOB_MAX_ATTEMPTS attempts in all.
+    """
+
+    # Seconds between purges of expired jobs.
+    _MAINTENANCE_INTERVAL = 300
+    # Tries at writing a job's outcome, poll_interval apart, before leaving it to go stale.
+    _RECORD_ATTEMPTS = 3
+
+    def __init__(self, workers: int, poll_interval: float) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._running: dict[UUID, asyncio.Task] = {}
+        self._maintained_at = 0.0
+
+    async def start(self) -> None:
+        if self.workers <= 0 or self._task is not None:
+            return
+        self._executor = self._new_executor()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="job-runner")
+        logger.info("Job runner started with %d workers", self.workers)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in self._running.values():
+            task.cancel()
+        await asyncio.gather(self._task, *self._running.values(), return_exceptions=True)
+        # Jobs cut short stay 'running' and are retried once their heartbeat goes stale.
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._task, self._executor, self._wake = None, None, None
+        self._running.clear()
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that already runs the event loop and pool threads is unsafe.
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._heartbeat()
+                await self._maintain()
+                while len(self._running) < self.workers:
+                    job = await execute_returning(
+                        _CLAIM_SQL, (settings.JOB_STALE_AFTER, settings.JOB_MAX_ATTEMPTS),
+                        name="claim_job",
+                    )
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    self._running[job["job_id"]] = task
+            except Exception as e:
+                logger.warning("Job runner could not reach the database: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        started = time.monotonic()
+        executor = self._executor
+        result, error, crashed = None, None, False
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, execute, job["kind"], job["artifact_version"], job["params"]
+            )
+        except JobFailed as e:
+            error = str(e)
+        except BrokenProcessPool as e:
+            # Every job in flight on the broken pool lands here; only the first rebuilds it.
+            crashed, error = True, "Job worker process died"
+            if self._executor is executor:
+                logger.error("Job %s: %s; restarting the pool", job_id, e)
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, job["kind"])
+            error = f"{type(e).__name__}: {e}"
+        try:
+            for attempt in range(1, self._RECORD_ATTEMPTS + 1):
+                try:
+                    await self._record(job, result, error, crashed)
+                    break
+                except Exception as e:
+                    # Still in _running, so the heartbeat keeps other runners off it meanwhile.
+                    logger.warning("Job %s: could not record its outcome (attempt %d): %s",
+                                   job_id, attempt, e)
+                    if attempt < self._RECORD_ATTEMPTS:
+                        await asyncio.sleep(self.poll_interval)
+            else:
+                # Left 'running' without a heartbeat: it is claimed again once stale.
+                logger.error("Job %s: giving up recording its outcome; it will be retried", job_id)
+                return
+            logger.info("Job %s (%s) %s in %.1fs", job_id, job["kind"],
+                        "failed" if error else "succeeded", time.monotonic() - started)
+        finally:
+            self._running.pop(job_id, None)
+            self.wake()
+
+    async def _record(
+        self, job: dict[str, Any], result: Optional[str], error: Optional[str], crashed: bool
+    ) -> None:
+        if crashed and job["attempts"] < settings.JOB_MAX_ATTEMPTS:
+            # Retried like a job whose heartbeat went stale, up to JOB_MAX_ATTEMPTS.
+            await execute_command(_REQUEUE_SQL, (job["job_id"],), name="requeue_job")
+            logger.warning("Job %s (%s) lost its worker on attempt %d; requeued",
+                           job["job_id"], job["kind"], job["attempts"])
+        else:
+            await execute_command(
+                _FINISH_SQL,
+                ("failed" if error else "succeeded", result, error, job["job_id"]),
+                name="finish_job",
+            )
+
+    async def _heartbeat(self) -> None:
+        if self._running:
+            await execute_command(
+                "UPDATE jobs SET heartbeat_at = NOW() WHERE job_id = ANY(%s) AND status = 'running'",
+                (list(self._running),),
+                name="job_heartbeat",
+            )
+
+    async def _maintain(self) -> None:
+        if time.monotonic() - self._maintained_at < self._MAINTENANCE_INTERVAL:
+            return
+        self._maintained_at = time.monotonic()
+        await execute_command(
+            """
+            UPDATE jobs
+            SET status = 'failed', error = 'Abandoned after repeated worker failures',
+                finished_at = NOW()
+            WHERE status = 'running' AND attempts >= %s
+              AND heartbeat_at < NOW() - make_interval(secs => %s)
+            """,
+            (settings.JOB_MAX_ATTEMPTS, settings.JOB_STALE_AFTER),
+            name="fail_abandoned_jobs",
+        )
+        await execute_command(
+            """
+            DELETE FROM jobs
+            WHERE status IN ('succeeded', 'failed')
+              AND GREATEST(finished_at, requested_at) < NOW() - make_interval(secs => %s)
+            """,
+            (settings.JOB_RETENTION,),
+            name="purge_jobs",
+        )
+
+
+runner = JobRunner(settings.JOB_WORKERS, settings.JOB_POLL_INTERVAL)
+
+
+async def _serve(workers: int) -> None:
+    await init_async_pool()
+    dedicated = JobRunner(workers, settings.JOB_POLL_INTERVAL)
+    await dedicated.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await dedicated.stop()
+        await close_async_pool()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run queued /api/jobs jobs outside the API.")
+    parser.add_argument("--workers", type=int, default=max(settings.JOB_WORKERS, 1),
+                        help="Job processes to run in parallel")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(_serve(args.workers))
+
+
+if __name__ == "__main__":
+    main()
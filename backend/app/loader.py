@@ -0,0 +1,432 @@
+"""Bulk loader for the MovieLens and personality datasets.
+
+Usage::
+
+    python -m app.loader --data-dir data/ml-latest
+    python -m app.loader --data-dir data/ml-latest --tables ratings --workers 4
+
+Each source CSV is streamed into Postgres with ``COPY FROM STDIN`` in chunks of
+``--chunk-rows`` rows, and independent tables load in parallel. Secondary
+indexes and constraints are saved and dropped before the first chunk and
+rebuilt once every chunk is in, followed by ``ANALYZE``.
+
+Every chunk commits together with its row in ``load_progress``, so rerunning
+after a failure skips the chunks that already landed. A source file that
+changed since the last attempt (size or mtime) starts that table over.
+"""
+import argparse
+import csv
+import io
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.database import connect
+from app.migrate import upgrade
+from app.segments import TRAITS
+
+logger = logging.getLogger(__name__)
+
+LOADER_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS load_progress (
+        table_name TEXT NOT NULL,
+        source TEXT NOT NULL,
+        chunk_no INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (table_name, source, chunk_no)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS load_deferred_ddl (
+        table_name TEXT NOT NULL,  -- the table that owns the object
+        object_name TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        definition TEXT NOT NULL,
+        referenced_table TEXT,  -- foreign keys only
+        PRIMARY KEY (table_name, object_name)
+    )
+    """,
+]
+
+_YEAR = re.compile(r"\((\d{4})\)\s*$")
+
+
+# --- Row transforms (CSV row -> COPY columns) ---
+
+def _timestamp(epoch: str) -> str:
+    return datetime.fromtimestamp(int(epoch), timezone.utc).isoformat()
+
+
+def _pg_array(values: list[str]) -> str:
+    quoted = (v.replace("\\", "\\\\").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'"{v}"' for v in quoted) + "}"
+
+
+def _movie_row(row: list[str], idx: dict[str, int]) -> tuple:
+    title = row[idx["title"]].strip()
+    match = _YEAR.search(title)
+    genres = row[idx["genres"]]
+    genre_list = [] if genres == "(no genres listed)" else genres.split("|")
+    return (int(row[idx["movieid"]]), title, match.group(1) if match else None, _pg_array(genre_list))
+
+
+def _rating_row(row: list[str], idx: dict[str, int]) -> tuple:
+    return (
+        int(row[idx["userid"]]),
+        int(row[idx["movieid"]]),
+        row[idx["rating"]],
+        _timestamp(row[idx["timestamp"]]),
+    )
+
+
+def _tag_row(row: list[str], idx: dict[str, int]) -> tuple:
+    return (
+        int(row[idx["userid"]]),
+        int(row[idx["movieid"]]),
+        row[idx["tag"]],
+        _timestamp(row[idx["timestamp"]]),
+    )
+
+
+def _personality_row(row: list[str], idx: dict[str, int]) -> tuple:
+    return (int(row[idx["userid"]]), *(row[idx[trait]] or None for trait in TRAITS))
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    table: str
+    filename: str
+    columns: tuple[str, ...]
+    transform: Callable[[list[str], dict[str, int]], tuple]
+
+
+TABLES = {
+    "movies": TableSpec("movies", "movies.csv", ("movie_id", "title", "year", "genres"), _movie_row),
+    "ratings": TableSpec(
+        "ratings", "ratings.csv", ("user_id", "movie_id", "rating", "rated_at"), _rating_row
+    ),
+    "tags": TableSpec("tags", "tags.csv", ("user_id", "movie_id", "tag", "tagged_at"), _tag_row),
+    "personality": TableSpec(
+        "personality", "personality-data.csv", ("user_id", *TRAITS), _personality_row
+    ),
+}
+
+
+# --- Deferred indexes and constraints ---
+
+def _defer_ddl(conn, tables: list[str]) -> None:
+    """Save and drop the tables' indexes and constraints, plus foreign keys pointing at them.
+
+    Runs once, before any COPY, so every lock is taken by one transaction in a
+    fixed order. Each object is saved once under the table that owns it, and
+    definitions are persisted first, so a resumed load can still rebuild
+    objects that an earlier, failed run already dropped.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO load_deferred_ddl (table_name, object_name, kind, definition, referenced_table)
+            SELECT c.conrelid::regclass::text, c.conname,
+                   CASE c.contype WHEN 'f' THEN 'foreign_key' ELSE 'constraint' END,
+                   pg_get_constraintdef(c.oid),
+                   CASE c.contype WHEN 'f' THEN c.confrelid::regclass::text END
+            FROM pg_constraint c
+            WHERE c.contype IN ('p', 'u', 'f')
+              AND (c.conrelid = ANY(%(t)s::regclass[])
+                   OR (c.contype = 'f' AND c.confrelid = ANY(%(t)s::regclass[])))
+            UNION ALL
+            SELECT i.tablename, i.indexname, 'index', i.indexdef, NULL
+            FROM pg_indexes i
+            WHERE i.schemaname = current_schema() AND i.tablename = ANY(%(t)s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c
+                  WHERE c.conname = i.indexname AND c.conrelid = i.tablename::regclass
+              )
+            ON CONFLICT (table_name, object_name) DO NOTHING
+            """,
+            {"t": tables},
+        )
+        cur.execute(
+            """
+            SELECT table_name, object_name, kind FROM load_deferred_ddl
+            WHERE table_name = ANY(%(t)s) OR referenced_table = ANY(%(t)s)
+            ORDER BY kind = 'foreign_key' DESC, table_name, object_name
+            """,
+            {"t": tables},
+        )
+        for owner, name, kind in cur.fetchall():
+            if kind == "index":
+                cur.execute(f'DROP INDEX IF EXISTS "{name}"')
+            else:
+                cur.execute(f'ALTER TABLE {owner} DROP CONSTRAINT IF EXISTS "{name}"')
+    conn.commit()
+
+
+def _restore_ddl(conn, tables: list[str]) -> None:
+    """Rebuild saved objects: keys first, then foreign keys, then plain indexes."""
+    order = {"constraint": 0, "foreign_key": 1, "index": 2}
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT table_name, object_name, kind, definition FROM load_deferred_ddl
+            WHERE table_name = ANY(%(t)s) OR referenced_table = ANY(%(t)s)
+            """,
+            {"t": tables},
+        )
+        saved = sorted(cur.fetchall(), key=lambda r: order[r[2]])
+        for owner, name, kind, definition in saved:
+            started = time.monotonic()
+            if kind == "index":
+                cur.execute(definition)
+            else:
+                cur.execute(f'ALTER TABLE {owner} ADD CONSTRAINT "{name}" {definition}')
+            cur.execute(
+                "DELETE FROM load_deferred_ddl WHERE table_name = %s AND object_name = %s",
+                (owner, name),
+            )
+            conn.commit()
+            logger.info("Rebuilt %s %s in %.1fs", kind, name, time.monotonic() - started)
+
+
+# --- Chunked COPY ---
+
+def _source_id(path: str) -> str:
+    st = os.stat(path)
+    return f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _read_chunks(
+    path: str, spec: TableSpec, chunk_rows: int, skip: set[int]
+) -> Iterator[tuple[int, io.StringIO, int]]:
+    """Yield (chunk_no, csv buffer, row count); chunks in ``skip`` are read past without parsing.
+
+    Blank lines are dropped before rows are counted into chunks, so chunk
+    boundaries are the same whether a chunk is loaded or skipped on resume.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        idx = {name.strip().lower(): i for i, name in enumerate(header)}
+        rows = (row for row in reader if row)
+        chunk_no = 0
+        while True:
+            if chunk_no in skip:
+                skipped = sum(1 for _ in itertools.islice(rows, chunk_rows))
+                if skipped == 0:
+                    return
+                chunk_no += 1
+                continue
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            count = 0
+            for row in itertools.islice(rows, chunk_rows):
+                writer.writerow(spec.transform(row, idx))
+                count += 1
+            if count == 0:
+                return
+            buf.seek(0)
+            yield chunk_no, buf, count
+            chunk_no += 1
+
+
+_local = threading.local()
+
+
+def _thread_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None or conn.closed:
+        conn = _local.conn = connect()
+        with conn.cursor() as cur:
+            # Each chunk commits with its progress row; losing the tail on a crash is safe to replay.
+            cur.execute("SET synchronous_commit = off")
+        conn.commit()
+    return conn
+
+
+def _copy_chunk(spec: TableSpec, source: str, chunk_no: int, buf: io.StringIO, count: int) -> int:
+    conn = _thread_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(
+                f"COPY {spec.table} ({', '.join(spec.columns)}) FROM STDIN WITH (FORMAT csv)", buf
+            )
+            cur.execute(
+                "INSERT INTO load_progress (table_name, source, chunk_no, row_count) VALUES (%s, %s, %s, %s)",
+                (spec.table, source, chunk_no, count),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def _prepare(tables: list[str], data_dir: str) -> dict[str, tuple[str, set[int]]]:
+    """Find each table's source and loaded chunks; defer DDL and truncate for fresh loads.
+
+    Runs serially before the parallel COPY, so concurrent table loads never
+    take DDL locks against each other. Returns table -> (source id, loaded chunks).
+    """
+    prepared: dict[str, tuple[str, set[int]]] = {}
+    fresh = []
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                path = os.path.join(data_dir, TABLES[table].filename)
+                if not os.path.exists(path):
+                    logger.warning("Skipping %s: %s not found", table, path)
+                    continue
+                source = _source_id(path)
+                cur.execute(
+                    "SELECT chunk_no FROM load_progress WHERE table_name = %s AND source = %s",
+                    (table, source),
+                )
+                done = {row[0] for row in cur.fetchall()}
+                if done:
+                    logger.info("Resuming %s: %d chunks already loaded", table, len(done))
+                else:
+                    # Fresh load: anything already in the table or recorded for an
+                    # older copy of the source file is replaced.
+                    cur.execute("DELETE FROM load_progress WHERE table_name = %s", (table,))
+                    fresh.append(table)
+                prepared[table] = (source, done)
+            conn.commit()
+            if fresh:
+                _defer_ddl(conn, fresh)
+                cur.execute(f"TRUNCATE {', '.join(fresh)}")
+        conn.commit()
+    finally:
+        conn.close()
+    return prepared
+
+
+def load_table(
+    spec: TableSpec, data_dir: str, source: str, done: set[int], chunk_rows: int, workers: int
+) -> int:
+    path = os.path.join(data_dir, spec.filename)
+    started = time.monotonic()
+    loaded = 0
+    in_flight: set[Future] = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"copy-{spec.table}") as pool:
+        for chunk_no, buf, count in _read_chunks(path, spec, chunk_rows, done):
+            # Bound read-ahead so at most ``workers`` parsed chunks sit in memory.
+            while len(in_flight) >= workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_EXCEPTION)
+                loaded += sum(f.result() for f in finished)
+            in_flight.add(pool.submit(_copy_chunk, spec, source, chunk_no, buf, count))
+        loaded += sum(f.result() for f in in_flight)
+    logger.info("Loaded %d %s rows in %.1fs", loaded, spec.table, time.monotonic() - started)
+    return loaded
+
+
+def _finish(tables: list[str], refresh: bool) -> None:
+    conn = connect()
+    try:
+        _restore_ddl(conn, tables)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for table in tables:
+                cur.execute(f"ANALYZE {table}")
+            if refresh:
+                _refresh_aggregates(cur)
+            # Empty payload: every API worker drops its whole response cache.
+            cur.execute("SELECT pg_notify('cache_invalidate', '')")
+    finally:
+        conn.close()
+
+
+def _refresh_aggregates(cur) -> None:
+    from app.aggregates import MATERIALIZED_VIEWS
+
+    for view in MATERIALIZED_VIEWS:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (view,))
+        if not cur.fetchone()[0]:
+            continue
+        started = time.monotonic()
+        cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+        cur.execute(
+            """
+            INSERT INTO aggregate_refreshes (view_name, refreshed_at, duration_ms)
+            VALUES (%s, NOW(), %s)
+            ON CONFLICT (view_name)
+            DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+            """,
+            (view, int((time.monotonic() - started) * 1000)),
+        )
+        logger.info("Refreshed %s in %.1fs", view, time.monotonic() - started)
+
+
+def ensure_tables() -> None:
+    upgrade()
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            for statement in LOADER_TABLES_DDL:
+                cur.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run(
+    data_dir: str,
+    tables: Optional[list[str]] = None,
+    chunk_rows: int = 500_000,
+    workers: int = 2,
+    parallel_tables: int = 4,
+    refresh: bool = True,
+) -> dict[str, Any]:
+    # TABLES order, so every run takes DDL locks in the same order.
+    tables = [table for table in TABLES if tables is None or table in tables]
+    ensure_tables()
+    started = time.monotonic()
+    prepared = _prepare(tables, data_dir)
+    with ThreadPoolExecutor(max_workers=parallel_tables, thread_name_prefix="load") as pool:
+        futures = {
+            table: pool.submit(
+                load_table, TABLES[table], data_dir, source, done, chunk_rows, workers
+            )
+            for table, (source, done) in prepared.items()
+        }
+        counts = {table: future.result() for table, future in futures.items()}
+    _finish(tables, refresh)
+    logger.info("Load finished in %.1fs", time.monotonic() - started)
+    return counts
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data-dir", required=True, help="Directory holding the source CSV files")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), help="Tables to load (default: all)")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Rows per COPY / resume unit")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent COPY streams per table")
+    parser.add_argument("--parallel-tables", type=int, default=4, help="Tables loaded at once")
+    parser.add_argument("--no-refresh", action="store_true", help="Skip refreshing aggregate views")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    counts = run(
+        args.data_dir,
+        tables=args.tables,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        parallel_tables=args.parallel_tables,
+        refresh=not args.no_refresh,
+    )
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
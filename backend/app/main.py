@@ -1,11 +1,21 @@
-import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.aggregates import scheduler as aggregate_scheduler
+from app.artifacts import ArtifactUnavailable, artifact_stats, watcher as artifact_watcher
+from app.autocomplete import title_index
+from app.auth.passwords import PasswordHashingBusy, hasher as password_hasher
+from app.cache import invalidation_listener
 from app.config import settings
-from app.database import init_pool, close_pool, is_healthy
+from app.jobs import runner as job_runner
+from app.async_database import (
+    close_async_pool, init_async_pool, is_healthy, pool_stats, replicas as db_replicas,
+)
+from app.database import PoolTimeoutError, prepared_statement_stats
+from app.metrics import MetricsMiddleware, registry as metrics_registry
 from app.auth.users import router as auth_router
 from app.routers.movies import router as movies_router
 from app.routers.genres import router as genres_router
@@ -13,19 +23,29 @@ from app.routers.ratings import router as ratings_router
 from app.routers.predictions import router as predictions_router
 from app.routers.personality import router as personality_router
 from app.routers.collections import router as collections_router
+from app.routers.jobs import router as jobs_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_pool()
-    # Create app-owned tables
-    try:
-        from app.auth.db import ensure_app_users_table
-        ensure_app_users_table()
-    except Exception as e:
-        logging.warning("Could not create app tables: %s", e)
+    # Schema changes are applied beforehand by `python -m app.migrate`.
+    await init_async_pool()
+    await db_replicas.start()
+    await artifact_watcher.start()
+    await title_index.start()
+    aggregate_scheduler.start()
+    invalidation_listener.start()
+    password_hasher.start()
+    await job_runner.start()
     yield
-    close_pool()
+    await job_runner.stop()
+    password_hasher.shutdown()
+    await invalidation_listener.stop()
+    await aggregate_scheduler.stop()
+    await title_index.stop()
+    await artifact_watcher.stop()
+    await db_replicas.stop()
+    await close_async_pool()
 
 
 app = FastAPI(
@@ -41,7 +61,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Data-Refreshed-At"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry"},
+        headers={"Retry-After": str(settings.DB_POOL_RETRY_AFTER)},
+    )
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many authentication requests, please retry"},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+
+@app.exception_handler(ArtifactUnavailable)
+async def artifact_unavailable_handler(request: Request, exc: ArtifactUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"The {exc.name} artifact has not been built yet"},
+    )
 
 
 @app.get("/")
@@ -54,14 +102,37 @@ def root():
 
 
 @app.get("/health")
-def health():
-    db_ok = is_healthy()
+async def health():
+    """Primary status, plus each configured read replica's status and replay lag."""
+    db_ok = await is_healthy()
     return {
         "status": "healthy" if db_ok else "degraded",
         "database": "connected" if db_ok else "unavailable",
+        "replicas": await db_replicas.check(),
     }
 
 
+@app.get("/health/pool")
+def health_pool():
+    return {
+        "pool": pool_stats(),
+        "replica_pools": db_replicas.pool_stats(),
+        "prepared_statements": prepared_statement_stats(),
+    }
+
+
+@app.get("/health/artifacts")
+def health_artifacts():
+    """Version of each offline artifact currently loaded by this worker."""
+    return artifact_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request, query and pool metrics."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(auth_router)
 app.include_router(movies_router)
 app.include_router(genres_router)
@@ -69,3 +140,4 @@ app.include_router(ratings_router)
 app.include_router(predictions_router)
 app.include_router(personality_router)
 app.include_router(collections_router)
+app.include_router(jobs_router)
@@ -0,0 +1,228 @@
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_query")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+
+
+def sql_fingerprint(sql: str) -> str:
+    """SQL with literals and placeholders replaced by ``?`` and whitespace collapsed."""
+    return " ".join(_LITERALS.sub("?", sql).split())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """Labelled Prometheus histogram with fixed bucket bounds."""
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in snapshot:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels({**labels, 'le': _bound(bound)})} {cumulative}"
+            yield f"{self.name}_sum{_labels(labels)} {total}"
+            yield f"{self.name}_count{_labels(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._histograms: list[Histogram] = []
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]
+    ) -> Histogram:
+        histogram = Histogram(name, help, labelnames, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Add a callable that yields ready-made exposition lines at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for histogram in self._histograms:
+            lines.extend(histogram.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning("Metrics collector %r failed: %s", collector, e)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+http_response_bytes = registry.histogram(
+    "http_response_bytes", "Serialized response body size by route.",
+    ("method", "route"), BYTES_BUCKETS,
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Query execution plus row fetch time by query name.",
+    ("query",), LATENCY_BUCKETS,
+)
+db_query_rows = registry.histogram(
+    "db_query_rows", "Rows returned by query name.",
+    ("query",), ROWS_BUCKETS,
+)
+
+
+_pools: dict[str, Callable[[], Optional[dict[str, Any]]]] = {}
+
+
+def register_pool(pool: str, stats: Callable[[], Optional[dict[str, Any]]]) -> None:
+    """Export a pool's PoolStats snapshot (see app.database.PoolStats) under ``pool=<name>``."""
+    _pools[pool] = stats
+
+
+def unregister_pool(pool: str) -> None:
+    _pools.pop(pool, None)
+
+
+def _pool_metric_lines() -> Iterator[str]:
+    snapshots = [(name, stats()) for name, stats in _pools.items()]
+    snapshots = [(name, snap) for name, snap in snapshots if snap is not None]
+    if not snapshots:
+        return
+    for gauge in ("in_use", "idle", "waiters", "max_size"):
+        yield f"# TYPE db_pool_{gauge} gauge"
+        for name, snap in snapshots:
+            yield f"db_pool_{gauge}{_labels({'pool': name})} {snap[gauge]}"
+    yield "# TYPE db_pool_timeouts_total counter"
+    for name, snap in snapshots:
+        yield f"db_pool_timeouts_total{_labels({'pool': name})} {snap['timeouts']}"
+    yield "# TYPE db_pool_wait_seconds histogram"
+    for name, snap in snapshots:
+        labels = {"pool": name}
+        wait = snap["wait_seconds"]
+        for bound, count in wait["buckets"].items():
+            yield f"db_pool_wait_seconds_bucket{_labels({**labels, 'le': bound})} {count}"
+        yield f"db_pool_wait_seconds_sum{_labels(labels)} {wait['sum']}"
+        yield f"db_pool_wait_seconds_count{_labels(labels)} {wait['count']}"
+
+
+registry.register_collector(_pool_metric_lines)
+
+
+class QueryObservation:
+    rows = 0
+
+
+@contextmanager
+def track_query(sql: str, name: Optional[str] = None) -> Iterator[QueryObservation]:
+    """Time a helper query; callers set ``.rows`` on the yielded observation.
+
+    Unnamed queries are labelled by a short hash of their fingerprint. With
+    SLOW_QUERY_MS set, slower queries are logged with the full fingerprint.
+    """
+    observation = QueryObservation()
+    started = time.perf_counter()
+    try:
+        yield observation
+    finally:
+        elapsed = time.perf_counter() - started
+        fingerprint = None
+        if name is None:
+            fingerprint = sql_fingerprint(sql)
+            name = "sql_" + hashlib.sha1(fingerprint.encode()).hexdigest()[:10]
+        db_query_duration.observe(elapsed, query=name)
+        db_query_rows.observe(observation.rows, query=name)
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            slow_query_logger.warning(
+                "Slow query %s: %.1f ms, %d rows: %s",
+                name, elapsed * 1000, observation.rows, fingerprint or sql_fingerprint(sql),
+            )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and response size per route template."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        body_bytes = 0
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # FastAPI stores the matched route on the scope; using its path
+            # template keeps label cardinality bounded.
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration.observe(
+                time.perf_counter() - started, method=method, route=route_path, status=str(status)
+            )
+            http_response_bytes.observe(body_bytes, method=method, route=route_path)
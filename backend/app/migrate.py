@@ -0,0 +1,235 @@
+"""Versioned schema migrations and the query plan check.
+
+Usage::
+
+    python -m app.migrate                 # apply pending migrations
+    python -m app.migrate status          # list applied and pending versions
+    python -m app.migrate check-plans     # fail if a hot query plans a seq scan
+
+Migrations are the ``NNNN_<name>.sql`` files in ``app/migrations``, applied in
+version order, each in its own transaction, and recorded in
+``schema_migrations``. They run before the API starts (see the Dockerfile),
+never from the app lifespan, so worker start-up does not contend on DDL locks.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from app.database import connect
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Arbitrary key for the advisory lock that serialises concurrent migration runs.
+_MIGRATION_LOCK_KEY = 220013
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        duration_ms INTEGER
+    )
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+
+def discover() -> list[Migration]:
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("[0-9][0-9][0-9][0-9]_*.sql")):
+        version, _, name = path.stem.partition("_")
+        migrations.append(Migration(int(version), name, path.read_text()))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+
+def _applied(cur) -> dict[int, str]:
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cur.fetchall())
+
+
+def upgrade(target: Optional[int] = None) -> list[int]:
+    """Apply pending migrations up to ``target`` (all by default); returns the versions applied."""
+    applied_now = []
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_MIGRATION_LOCK_KEY,))
+            cur.execute(SCHEMA_MIGRATIONS_DDL)
+            conn.commit()
+            applied = _applied(cur)
+            for migration in discover():
+                if target is not None and migration.version > target:
+                    break
+                if migration.version in applied:
+                    if applied[migration.version] != migration.checksum:
+                        logger.warning(
+                            "Migration %04d_%s changed after it was applied",
+                            migration.version, migration.name,
+                        )
+                    continue
+                started = time.monotonic()
+                try:
+                    cur.execute(migration.sql)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) "
+                        "VALUES (%s, %s, %s, %s)",
+                        (migration.version, migration.name, migration.checksum,
+                         int((time.monotonic() - started) * 1000)),
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    logger.error("Migration %04d_%s failed", migration.version, migration.name)
+                    raise
+                logger.info(
+                    "Applied %04d_%s in %.1fs",
+                    migration.version, migration.name, time.monotonic() - started,
+                )
+                applied_now.append(migration.version)
+            cur.execute("SELECT pg_advisory_unlock(%s)", (_MIGRATION_LOCK_KEY,))
+            conn.commit()
+    finally:
+        conn.close()
+    return applied_now
+
+
+def status() -> list[dict[str, Any]]:
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+            applied = _applied(cur) if cur.fetchone()[0] else {}
+    finally:
+        conn.close()
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "applied": m.version in applied,
+            "modified": m.version in applied and applied[m.version] != m.checksum,
+        }
+        for m in discover()
+    ]
+
+
+# --- Plan check ---
+
+# Selective queries issued on the request path, with representative literals.
+# Each must be answered from an index once tables hold real data; full-table
+# analytics (e.g. /api/ratings/patterns) are expected to scan and are not listed.
+HOT_QUERIES = {
+    "movies_list_title": """
+        SELECT movie_id, title, genres, avg_rating, num_ratings FROM movie_catalogue
+        WHERE (title, movie_id) > ('M', 0) ORDER BY title, movie_id LIMIT 21
+    """,
+    "movies_list_rating": """
+        SELECT movie_id, title, genres, avg_rating, num_ratings FROM movie_catalogue
+        ORDER BY COALESCE(avg_rating, 0) DESC, movie_id DESC LIMIT 21
+    """,
+    "movies_title_search": """
+        SELECT movie_id, title FROM movie_catalogue WHERE title ILIKE '%matrix%'
+        ORDER BY similarity(title, 'matrix') DESC, movie_id DESC LIMIT 21
+    """,
+    "movies_genre_filter": """
+        SELECT movie_id FROM movie_catalogue WHERE genres @> ARRAY['Film-Noir']
+    """,
+    "movie_genre_lookup": "SELECT movie_id FROM movies WHERE genres @> ARRAY['Film-Noir']",
+    "movie_by_id": "SELECT * FROM movie_catalogue WHERE movie_id = 1",
+    "movie_rating_distribution": "SELECT * FROM movie_rating_stats WHERE movie_id = 1",
+    "user_high_ratings": "SELECT movie_id, rating FROM ratings WHERE user_id = 1 AND rating >= 4",
+    "user_by_username": "SELECT * FROM app_users WHERE username = 'alice'",
+    "collections_by_user": """
+        SELECT collection_id, name, description, movie_count, created_at FROM collections
+        WHERE user_id = 1 ORDER BY created_at DESC, collection_id DESC
+    """,
+}
+
+# Scanning a table this small is often the cheapest plan, so it is not a failure.
+DEFAULT_MIN_ROWS = 10_000
+
+
+def _seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", ()):
+        yield from _seq_scans(child)
+
+
+def check_plans(min_rows: int = DEFAULT_MIN_ROWS) -> list[str]:
+    """EXPLAIN every hot query; returns a problem description per seq scan on a large table."""
+    problems = []
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            for name, sql in HOT_QUERIES.items():
+                cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                for relation in set(_seq_scans(plan[0]["Plan"])):
+                    cur.execute(
+                        "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", (relation,)
+                    )
+                    row = cur.fetchone()
+                    rows = int(row[0]) if row else 0
+                    if rows >= min_rows:
+                        problems.append(f"{name}: seq scan on {relation} (~{rows} rows)")
+            conn.rollback()
+    finally:
+        conn.close()
+    return problems
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply schema migrations or check query plans.")
+    sub = parser.add_subparsers(dest="command")
+    up = sub.add_parser("upgrade", help="Apply pending migrations (default)")
+    up.add_argument("--target", type=int, help="Stop after this version")
+    sub.add_parser("status", help="List migrations and whether they are applied")
+    check = sub.add_parser("check-plans", help="Fail if a hot query plans a sequential scan")
+    check.add_argument("--min-rows", type=int, default=DEFAULT_MIN_ROWS,
+                       help="Ignore seq scans on tables smaller than this")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "status":
+        for m in status():
+            state = "applied" if m["applied"] else "pending"
+            if m["modified"]:
+                state += " (modified)"
+            print(f"{m['version']:04d}_{m['name']}: {state}")
+    elif args.command == "check-plans":
+        problems = check_plans(args.min_rows)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        if problems:
+            sys.exit(1)
+        print(f"{len(HOT_QUERIES)} hot queries use indexes")
+    else:
+        applied = upgrade(getattr(args, "target", None))
+        print(f"Applied {len(applied)} migration(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+-- Materialized aggregates kept fresh by app.aggregates.RefreshScheduler.
+
+CREATE TABLE IF NOT EXISTS aggregate_refreshes (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    duration_ms INTEGER
+);
+
+-- Denormalised movie list with per-movie rating aggregates. Each list sort mode
+-- has a matching (sort key, movie_id) index so keyset pages are index range scans.
+CREATE MATERIALIZED VIEW IF NOT EXISTS movie_catalogue AS
+SELECT m.movie_id, m.title, m.year, m.genres,
+       s.avg_rating, COALESCE(s.num_ratings, 0) AS num_ratings
+FROM movies m
+LEFT JOIN (
+    SELECT movie_id, AVG(rating)::float8 AS avg_rating, COUNT(*) AS num_ratings
+    FROM ratings
+    GROUP BY movie_id
+) s USING (movie_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS movie_catalogue_pkey ON movie_catalogue (movie_id);
+CREATE INDEX IF NOT EXISTS movie_catalogue_title_idx ON movie_catalogue (title, movie_id);
+CREATE INDEX IF NOT EXISTS movie_catalogue_rating_idx
+    ON movie_catalogue ((COALESCE(avg_rating, 0)) DESC, movie_id DESC);
+CREATE INDEX IF NOT EXISTS movie_catalogue_year_idx
+    ON movie_catalogue ((COALESCE(year, 0)) DESC, movie_id DESC);
+CREATE INDEX IF NOT EXISTS movie_catalogue_num_ratings_idx
+    ON movie_catalogue (num_ratings DESC, movie_id DESC);
+CREATE INDEX IF NOT EXISTS movie_catalogue_genres_idx ON movie_catalogue USING GIN (genres);
+
+-- Per-genre rating statistics behind /api/genres, /popularity and /polarisation.
+CREATE MATERIALIZED VIEW IF NOT EXISTS genre_stats AS
+WITH movie_genres AS (
+    SELECT movie_id, unnest(genres) AS genre FROM movies
+)
+SELECT mg.genre,
+       COUNT(DISTINCT mg.movie_id) AS movie_count,
+       COUNT(r.rating) AS total_ratings,
+       AVG(r.rating)::float8 AS avg_rating,
+       COALESCE(STDDEV_SAMP(r.rating), 0)::float8 AS std_dev,
+       COUNT(DISTINCT r.user_id) AS unique_users
+FROM movie_genres mg
+LEFT JOIN ratings r USING (movie_id)
+GROUP BY mg.genre;
+
+CREATE UNIQUE INDEX IF NOT EXISTS genre_stats_pkey ON genre_stats (genre);
+
+-- CREATE ... AS populates each view, so count that as its first refresh.
+INSERT INTO aggregate_refreshes (view_name)
+VALUES ('movie_catalogue'), ('genre_stats')
+ON CONFLICT DO NOTHING;
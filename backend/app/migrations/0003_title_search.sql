@@ -0,0 +1,7 @@
+-- Trigram index behind the movie list's title filter. It serves
+-- title ILIKE '%...%' for patterns of three or more characters, and
+-- similarity() ranks the matches.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS movie_catalogue_title_trgm_idx
+    ON movie_catalogue USING GIN (title gin_trgm_ops);
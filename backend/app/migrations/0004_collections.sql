@@ -0,0 +1,26 @@
+-- User-owned movie collections.
+--
+-- movie_count is maintained by the statements that add or remove movies (see
+-- app/routers/collections.py), so listing collections never counts rows.
+
+CREATE TABLE IF NOT EXISTS collections (
+    collection_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES app_users (user_id) ON DELETE CASCADE,
+    name VARCHAR(200) NOT NULL,
+    description TEXT,
+    movie_count INTEGER NOT NULL DEFAULT 0 CHECK (movie_count >= 0),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Serves a user's whole collection list, newest first, from the index alone.
+CREATE INDEX IF NOT EXISTS collections_user_idx
+    ON collections (user_id, created_at DESC, collection_id DESC)
+    INCLUDE (name, description, movie_count);
+
+CREATE TABLE IF NOT EXISTS collection_movies (
+    collection_id INTEGER NOT NULL REFERENCES collections (collection_id) ON DELETE CASCADE,
+    movie_id INTEGER NOT NULL REFERENCES movies (movie_id),
+    added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (collection_id, movie_id)
+);
@@ -0,0 +1,141 @@
+-- Per-movie rating histograms, kept current by statement-level triggers on ratings.
+--
+-- buckets[i] counts ratings of i/2 stars (i = 1..10), so one row answers
+-- /api/movies/{id}/ratings and the avg_rating / num_ratings of a movie without
+-- touching ratings. Each INSERT, COPY chunk, UPDATE or DELETE on ratings folds
+-- its transition table into the affected rows in one grouped upsert.
+
+CREATE TABLE IF NOT EXISTS movie_rating_stats (
+    movie_id INTEGER PRIMARY KEY,
+    buckets INTEGER[] NOT NULL,
+    rating_sum DOUBLE PRECISION NOT NULL,
+    num_ratings INTEGER NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION rating_bucket(rating REAL) RETURNS INTEGER
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT LEAST(GREATEST(round(rating::numeric * 2)::integer, 1), 10)
+$$;
+
+-- Adds sign * each (movie_id, rating) pair to the histograms. Changes are
+-- grouped per movie first and applied in movie_id order, so concurrent
+-- loaders lock the same rows in the same order.
+CREATE OR REPLACE FUNCTION apply_rating_deltas(
+    changed_movie_ids INTEGER[], changed_ratings REAL[], signs INTEGER[]
+) RETURNS void
+LANGUAGE sql AS $$
+    WITH per_bucket AS (
+        SELECT d.movie_id, rating_bucket(d.rating) AS bucket,
+               SUM(d.sign)::integer AS n, SUM(d.sign * d.rating::float8) AS total
+        FROM unnest(changed_movie_ids, changed_ratings, signs) AS d(movie_id, rating, sign)
+        GROUP BY 1, 2
+    )
+    INSERT INTO movie_rating_stats AS s (movie_id, buckets, rating_sum, num_ratings)
+    SELECT m.movie_id,
+           array_agg(COALESCE(pb.n, 0) ORDER BY b.bucket),
+           COALESCE(SUM(pb.total), 0),
+           COALESCE(SUM(pb.n), 0)
+    FROM (SELECT DISTINCT movie_id FROM per_bucket) m
+    CROSS JOIN generate_series(1, 10) AS b(bucket)
+    LEFT JOIN per_bucket pb ON pb.movie_id = m.movie_id AND pb.bucket = b.bucket
+    GROUP BY m.movie_id
+    ORDER BY m.movie_id
+    ON CONFLICT (movie_id) DO UPDATE
+    SET buckets = (
+            SELECT array_agg(x + y ORDER BY i)
+            FROM unnest(s.buckets, EXCLUDED.buckets) WITH ORDINALITY AS u(x, y, i)
+        ),
+        rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        num_ratings = s.num_ratings + EXCLUDED.num_ratings
+$$;
+
+CREATE OR REPLACE FUNCTION movie_rating_stats_sync() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_rating_deltas(array_agg(movie_id), array_agg(rating), array_agg(-1))
+        FROM old_rows;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_rating_deltas(array_agg(movie_id), array_agg(rating), array_agg(1))
+        FROM new_rows;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION movie_rating_stats_reset() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE movie_rating_stats;
+    RETURN NULL;
+END
+$$;
+
+-- Transition tables need one trigger per event.
+DROP TRIGGER IF EXISTS ratings_stats_insert ON ratings;
+CREATE TRIGGER ratings_stats_insert
+    AFTER INSERT ON ratings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_stats_sync();
+
+DROP TRIGGER IF EXISTS ratings_stats_update ON ratings;
+CREATE TRIGGER ratings_stats_update
+    AFTER UPDATE ON ratings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_stats_sync();
+
+DROP TRIGGER IF EXISTS ratings_stats_delete ON ratings;
+CREATE TRIGGER ratings_stats_delete
+    AFTER DELETE ON ratings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_stats_sync();
+
+-- The loader truncates ratings before a fresh load.
+DROP TRIGGER IF EXISTS ratings_stats_truncate ON ratings;
+CREATE TRIGGER ratings_stats_truncate
+    AFTER TRUNCATE ON ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_stats_reset();
+
+-- Backfill. The triggers above already hold off concurrent writers until this commits.
+TRUNCATE movie_rating_stats;
+WITH per_bucket AS (
+    SELECT movie_id, rating_bucket(rating) AS bucket,
+           COUNT(*)::integer AS n, SUM(rating::float8) AS total
+    FROM ratings
+    GROUP BY 1, 2
+)
+INSERT INTO movie_rating_stats (movie_id, buckets, rating_sum, num_ratings)
+SELECT m.movie_id,
+       array_agg(COALESCE(pb.n, 0) ORDER BY b.bucket),
+       COALESCE(SUM(pb.total), 0),
+       COALESCE(SUM(pb.n), 0)
+FROM (SELECT DISTINCT movie_id FROM per_bucket) m
+CROSS JOIN generate_series(1, 10) AS b(bucket)
+LEFT JOIN per_bucket pb ON pb.movie_id = m.movie_id AND pb.bucket = b.bucket
+GROUP BY m.movie_id;
+
+ANALYZE movie_rating_stats;
+
+-- movie_catalogue now takes its aggregates from the histograms, so a refresh
+-- reads one row per movie instead of scanning ratings.
+DROP MATERIALIZED VIEW IF EXISTS movie_catalogue;
+CREATE MATERIALIZED VIEW movie_catalogue AS
+SELECT m.movie_id, m.title, m.year, m.genres,
+       s.rating_sum / NULLIF(s.num_ratings, 0) AS avg_rating,
+       COALESCE(s.num_ratings, 0)::bigint AS num_ratings
+FROM movies m
+LEFT JOIN movie_rating_stats s USING (movie_id);
+
+CREATE UNIQUE INDEX movie_catalogue_pkey ON movie_catalogue (movie_id);
+CREATE INDEX movie_catalogue_title_idx ON movie_catalogue (title, movie_id);
+CREATE INDEX movie_catalogue_rating_idx
+    ON movie_catalogue ((COALESCE(avg_rating, 0)) DESC, movie_id DESC);
+CREATE INDEX movie_catalogue_year_idx
+    ON movie_catalogue ((COALESCE(year, 0)) DESC, movie_id DESC);
+CREATE INDEX movie_catalogue_num_ratings_idx
+    ON movie_catalogue (num_ratings DESC, movie_id DESC);
+CREATE INDEX movie_catalogue_genres_idx ON movie_catalogue USING GIN (genres);
+CREATE INDEX movie_catalogue_title_trgm_idx ON movie_catalogue USING GIN (title gin_trgm_ops);
+
+UPDATE aggregate_refreshes SET refreshed_at = NOW() WHERE view_name = 'movie_catalogue';
@@ -0,0 +1,27 @@
+-- Asynchronous analytics jobs behind /api/jobs, run by app.jobs.JobRunner.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL,
+    params JSONB NOT NULL,
+    -- Hash of (kind, params, artifact_version), see app.jobs.params_hash.
+    params_hash TEXT NOT NULL,
+    artifact_version TEXT,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    result JSONB,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    requested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- One live job per hash: identical submissions join it and reuse its result,
+-- while a failed job can be submitted again.
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe_idx ON jobs (params_hash) WHERE status <> 'failed';
+
+-- Runners claim the oldest pending job, and retry running ones whose runner went quiet.
+CREATE INDEX IF NOT EXISTS jobs_pending_idx ON jobs (created_at) WHERE status IN ('queued', 'running');
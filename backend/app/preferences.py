@@ -0,0 +1,82 @@
+"""User x genre rating matrices shared by the offline analytics builds."""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from app.artifacts import read_frame
+
+MOVIE_GENRES_SQL = "SELECT movie_id, array_to_string(genres, '|') AS genres FROM movies"
+
+
+@dataclass
+class GenreMatrix:
+    """Per-genre rating sums and counts for a fixed, ordered set of users."""
+
+    user_ids: np.ndarray  # sorted, int32
+    genres: list[str]
+    sums: np.ndarray  # (users, genres) float64
+    counts: np.ndarray  # (users, genres) int64
+    user_means: np.ndarray  # (users,) mean over all of the user's ratings, NaN if none
+    rating_counts: np.ndarray  # (users,)
+
+    def means(self) -> np.ndarray:
+        """Mean rating per user and genre; NaN where the user rated nothing in it."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.counts > 0, self.sums / self.counts, np.nan)
+
+    def preferences(self) -> np.ndarray:
+        """Genre means relative to the user's overall mean; NaN where unrated."""
+        return self.means() - self.user_means[:, None]
+
+
+def read_movie_genres() -> tuple[np.ndarray, sparse.csr_matrix, list[str]]:
+    """Sorted movie ids with their movie x genre indicator matrix and genre names."""
+    movies = read_frame(MOVIE_GENRES_SQL, {"movie_id": "int32", "genres": "str"})
+    movies = movies.sort_values("movie_id", kind="stable")
+    binarizer = MultiLabelBinarizer(sparse_output=True)
+    indicator = binarizer.fit_transform(
+        [g.split("|") if g else [] for g in movies["genres"].fillna("")]
+    )
+    return (
+        movies["movie_id"].to_numpy(),
+        sparse.csr_matrix(indicator, dtype=np.float64),
+        binarizer.classes_.tolist(),
+    )
+
+
+def genre_matrix(
+    user_ids: np.ndarray,
+    ratings: pd.DataFrame,
+    movie_ids: np.ndarray,
+    movie_genres: sparse.csr_matrix,
+    genres: list[str],
+) -> GenreMatrix:
+    """Aggregate ``ratings`` (user_id, movie_id, rating) for ``user_ids`` through two sparse products."""
+    user_ids = np.sort(user_ids)
+    rows = np.searchsorted(user_ids, ratings["user_id"].to_numpy())
+    cols = np.searchsorted(movie_ids, ratings["movie_id"].to_numpy())
+    keep = (
+        (rows < len(user_ids)) & (cols < len(movie_ids))
+        & (user_ids[np.minimum(rows, len(user_ids) - 1)] == ratings["user_id"].to_numpy())
+        & (movie_ids[np.minimum(cols, len(movie_ids) - 1)] == ratings["movie_id"].to_numpy())
+    )
+    rows, cols = rows[keep], cols[keep]
+    values = ratings["rating"].to_numpy(dtype=np.float64)[keep]
+    shape = (len(user_ids), len(movie_ids))
+
+    rated = sparse.csr_matrix((values, (rows, cols)), shape=shape)
+    seen = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+    rating_counts = np.bincount(rows, minlength=len(user_ids))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        user_means = np.bincount(rows, weights=values, minlength=len(user_ids)) / rating_counts
+    return GenreMatrix(
+        user_ids=user_ids,
+        genres=genres,
+        sums=(rated @ movie_genres).toarray(),
+        counts=np.rint((seen @ movie_genres).toarray()).astype(np.int64),
+        user_means=user_means,
+        rating_counts=rating_counts,
+    )
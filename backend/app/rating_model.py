@@ -0,0 +1,170 @@
+"""Rating prediction model behind /api/predictions/predict.
+
+Train offline and publish with::
+
+    python -m app.rating_model
+
+A random forest regresses each movie's mean rating on its genres and release
+year, weighted by how many ratings back that mean. Requests are encoded with
+a genre -> column table built once at load time, and a whole batch is scored
+with one ``predict`` per tree; the spread between trees gives the confidence.
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from app.artifacts import Artifact, publish, read_frame
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAME = "rating_model"
+
+# Most-rated movies kept as candidates for ``similar_titles``.
+_REFERENCE_MOVIES = 5000
+_SIMILAR_TITLES = 3
+# Batch rows compared against the reference set at once; bounds the dense overlap matrix.
+_SIMILAR_CHUNK = 1024
+
+
+def _features(
+    multi_hot: np.ndarray, years: Sequence[Optional[float]], default_year: float
+) -> np.ndarray:
+    year = np.array([np.nan if y is None else y for y in years], dtype=np.float32)
+    missing = np.isnan(year)
+    year[missing] = default_year
+    return np.column_stack([multi_hot, year, missing, multi_hot.sum(axis=1)])
+
+
+@dataclass
+class RatingModel:
+    forest: RandomForestRegressor
+    genres: list[str]
+    default_year: float
+    reference_titles: list[str]
+    reference_genres: np.ndarray  # (movies, genres) multi-hot, most-rated first
+    genre_columns: dict[str, int] = field(init=False)
+    reference_sizes: np.ndarray = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.genre_columns = {genre: i for i, genre in enumerate(self.genres)}
+        self.reference_sizes = self.reference_genres.sum(axis=1)
+
+    def _encode_genres(self, genre_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        encoded = np.zeros((len(genre_lists), len(self.genres)), dtype=np.float32)
+        for row, genres in enumerate(genre_lists):
+            for genre in genres:
+                col = self.genre_columns.get(genre)
+                if col is not None:
+                    encoded[row, col] = 1
+        return encoded
+
+    def _similar_titles(self, multi_hot: np.ndarray) -> list[list[str]]:
+        k = min(_SIMILAR_TITLES, len(self.reference_titles))
+        titles: list[list[str]] = []
+        for start in range(0, len(multi_hot), _SIMILAR_CHUNK):
+            chunk = multi_hot[start:start + _SIMILAR_CHUNK]
+            # Jaccard overlap against the reference set; ties go to the more-rated title.
+            overlap = chunk @ self.reference_genres.T
+            union = chunk.sum(axis=1)[:, None] + self.reference_sizes[None, :] - overlap
+            jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+            top = np.argsort(-jaccard, axis=1, kind="stable")[:, :k]
+            titles.extend(
+                [self.reference_titles[j] for j in row if jaccard[i, j] > 0]
+                for i, row in enumerate(top)
+            )
+        return titles
+
+    def predict(
+        self, genre_lists: Sequence[Sequence[str]], years: Sequence[Optional[int]]
+    ) -> list[dict[str, Any]]:
+        multi_hot = self._encode_genres(genre_lists)
+        x = _features(multi_hot, years, self.default_year)
+        per_tree = np.stack([tree.predict(x) for tree in self.forest.estimators_])
+        predicted = np.clip(per_tree.mean(axis=0), 0.5, 5.0)
+        # 1 when every tree agrees, falling towards 0 as they diverge.
+        confidence = 1 / (1 + per_tree.std(axis=0))
+        return [
+            {"predicted_rating": round(float(p), 3), "confidence": round(float(c), 3),
+             "similar_titles": titles}
+            for p, c, titles in zip(predicted, confidence, self._similar_titles(multi_hot))
+        ]
+
+
+def load(directory: Path) -> RatingModel:
+    return RatingModel(**joblib.load(directory / "model.joblib"))
+
+
+model: Artifact[RatingModel] = Artifact(ARTIFACT_NAME, load)
+
+
+# --- Offline training ---
+
+def train(min_ratings: Optional[int] = None, trees: Optional[int] = None) -> str:
+    started = time.monotonic()
+    min_ratings = min_ratings or settings.RATING_MODEL_MIN_RATINGS
+    movies = read_frame(
+        "SELECT title, year, array_to_string(genres, '|') AS genres, avg_rating, num_ratings "
+        "FROM movie_catalogue WHERE num_ratings > 0 ORDER BY num_ratings DESC, movie_id",
+        {"title": "str", "year": "float32", "genres": "str",
+         "avg_rating": "float64", "num_ratings": "int64"},
+    )
+    genre_lists = [g.split("|") if g else [] for g in movies["genres"].fillna("")]
+    binarizer = MultiLabelBinarizer()
+    multi_hot = binarizer.fit_transform(genre_lists).astype(np.float32)
+    genres = binarizer.classes_.tolist()
+    default_year = float(np.nanmedian(movies["year"])) if movies["year"].notna().any() else 2000.0
+
+    years = [None if np.isnan(y) else y for y in movies["year"]]
+    x = _features(multi_hot, years, default_year)
+    train_rows = (movies["num_ratings"] >= min_ratings).to_numpy()
+    forest = RandomForestRegressor(
+        n_estimators=trees or settings.RATING_MODEL_TREES,
+        min_samples_leaf=5,
+        n_jobs=-1,
+        random_state=0,
+    )
+    forest.fit(
+        x[train_rows],
+        movies["avg_rating"].to_numpy()[train_rows],
+        sample_weight=np.log1p(movies["num_ratings"].to_numpy()[train_rows]),
+    )
+    # Scoring happens per tree inside request threads; parallelism there is unwanted.
+    forest.set_params(n_jobs=1)
+    logger.info("Trained on %d movies in %.1fs", int(train_rows.sum()), time.monotonic() - started)
+
+    def write(directory: Path) -> None:
+        joblib.dump(
+            {
+                "forest": forest,
+                "genres": genres,
+                "default_year": default_year,
+                "reference_titles": movies["title"].head(_REFERENCE_MOVIES).tolist(),
+                "reference_genres": multi_hot[:_REFERENCE_MOVIES],
+            },
+            directory / "model.joblib",
+        )
+
+    return publish(ARTIFACT_NAME, write)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train and publish the rating prediction model.")
+    parser.add_argument("--min-ratings", type=int, help="Ratings a movie needs to be a training sample")
+    parser.add_argument("--trees", type=int, help="Trees in the forest")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(train(args.min_ratings, args.trees))
+
+
+if __name__ == "__main__":
+    main()
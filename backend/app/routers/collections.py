@@ -4,8 +4,11 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
+from app.async_database import execute_query, execute_query_one, execute_returning
 from app.auth.schemas import UserInfo
 from app.auth.users import get_current_user
+from app.config import settings
+from app.routers.movies import fetch_movie_details
 
 router = APIRouter(prefix="/api/collections", tags=["collections"])
 
@@ -43,73 +46,226 @@ class AddMovie(BaseModel):
     movie_id: int
 
 
+class BulkMovies(BaseModel):
+    movie_ids: list[int] = Field(min_length=1, max_length=settings.COLLECTION_BULK_MAX)
+
+
+class BulkResult(BaseModel):
+    collection_id: int
+    changed: int  # movies actually added or removed; duplicates and unknown ids are skipped
+    movie_count: int
+
+
+# --- Queries ---
+
+_SUMMARY_COLUMNS = "collection_id, name, description, movie_count, created_at"
+
+# Both statements lock the collection row (checking ownership at the same time),
+# change collection_movies in one set-based statement and apply the number of
+# rows actually changed to movie_count, so the count never needs a COUNT(*).
+_ADD_MOVIES_SQL = """
+    WITH target AS (
+        SELECT collection_id FROM collections
+        WHERE collection_id = %s AND user_id = %s
+        FOR UPDATE
+    ), changed AS (
+        INSERT INTO collection_movies (collection_id, movie_id)
+        SELECT t.collection_id, m.movie_id
+        FROM target t
+        CROSS JOIN unnest(%s::int[]) AS ids(movie_id)
+        JOIN movies m ON m.movie_id = ids.movie_id
+        ON CONFLICT DO NOTHING
+        RETURNING movie_id
+    )
+    UPDATE collections c
+    SET movie_count = c.movie_count + (SELECT COUNT(*) FROM changed),
+        updated_at = CASE WHEN EXISTS (SELECT 1 FROM changed) THEN NOW() ELSE c.updated_at END
+    FROM target t
+    WHERE c.collection_id = t.collection_id
+    RETURNING c.collection_id, (SELECT COUNT(*) FROM changed) AS changed, c.movie_count
+"""
+
+_REMOVE_MOVIES_SQL = """
+    WITH target AS (
+        SELECT collection_id FROM collections
+        WHERE collection_id = %s AND user_id = %s
+        FOR UPDATE
+    ), changed AS (
+        DELETE FROM collection_movies cm
+        USING target t
+        WHERE cm.collection_id = t.collection_id AND cm.movie_id = ANY(%s::int[])
+        RETURNING cm.movie_id
+    )
+    UPDATE collections c
+    SET movie_count = c.movie_count - (SELECT COUNT(*) FROM changed),
+        updated_at = CASE WHEN EXISTS (SELECT 1 FROM changed) THEN NOW() ELSE c.updated_at END
+    FROM target t
+    WHERE c.collection_id = t.collection_id
+    RETURNING c.collection_id, (SELECT COUNT(*) FROM changed) AS changed, c.movie_count
+"""
+
+
+async def _change_movies(sql: str, collection_id: int, user_id: int, movie_ids: list[int], name: str):
+    result = await execute_returning(
+        sql, (collection_id, user_id, list(dict.fromkeys(movie_ids))), name=name
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return result
+
+
 # --- Endpoints ---
 
 @router.get("", response_model=list[CollectionSummary])
-def list_collections(current_user: UserInfo = Depends(get_current_user)):
-    """List all collections for the authenticated user."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+async def list_collections(current_user: UserInfo = Depends(get_current_user)):
+    """List all collections for the authenticated user, newest first."""
+    return await execute_query(
+        f"""
+        SELECT {_SUMMARY_COLUMNS} FROM collections
+        WHERE user_id = %s
+        ORDER BY created_at DESC, collection_id DESC
+        """,
+        (current_user.user_id,),
+        name="list_collections",
+    )
 
 
 @router.post("", response_model=CollectionSummary, status_code=status.HTTP_201_CREATED)
-def create_collection(
+async def create_collection(
     data: CollectionCreate,
     current_user: UserInfo = Depends(get_current_user),
 ):
     """Create a new collection."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return await execute_returning(
+        f"""
+        INSERT INTO collections (user_id, name, description)
+        VALUES (%s, %s, %s)
+        RETURNING {_SUMMARY_COLUMNS}
+        """,
+        (current_user.user_id, data.name, data.description),
+        name="create_collection",
+    )
 
 
 @router.get("/{collection_id}", response_model=CollectionDetail)
-def get_collection(
+async def get_collection(
     collection_id: int,
     current_user: UserInfo = Depends(get_current_user),
 ):
-    """Get collection detail with its movies."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Get collection detail with its movies, in the order they were added."""
+    collection = await execute_query_one(
+        """
+        SELECT c.collection_id, c.name, c.description, c.created_at, c.updated_at,
+               ARRAY(
+                   SELECT cm.movie_id FROM collection_movies cm
+                   WHERE cm.collection_id = c.collection_id
+                   ORDER BY cm.added_at, cm.movie_id
+               ) AS movie_ids
+        FROM collections c
+        WHERE c.collection_id = %s AND c.user_id = %s
+        """,
+        (collection_id, current_user.user_id),
+        name="get_collection",
+    )
+    if collection is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    collection["movies"] = await fetch_movie_details(collection.pop("movie_ids"))
+    return collection
 
 
 @router.put("/{collection_id}", response_model=CollectionSummary)
-def update_collection(
+async def update_collection(
     collection_id: int,
     data: CollectionUpdate,
     current_user: UserInfo = Depends(get_current_user),
 ):
-    """Update collection name or description."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Update collection name or description; an explicit null description clears it."""
+    collection = await execute_returning(
+        f"""
+        UPDATE collections
+        SET name = COALESCE(%s, name),
+            description = CASE WHEN %s THEN %s ELSE description END,
+            updated_at = NOW()
+        WHERE collection_id = %s AND user_id = %s
+        RETURNING {_SUMMARY_COLUMNS}
+        """,
+        (data.name, "description" in data.model_fields_set, data.description,
+         collection_id, current_user.user_id),
+        name="update_collection",
+    )
+    if collection is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return collection
 
 
 @router.delete("/{collection_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_collection(
+async def delete_collection(
     collection_id: int,
     current_user: UserInfo = Depends(get_current_user),
 ):
     """Delete a collection."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    deleted = await execute_returning(
+        "DELETE FROM collections WHERE collection_id = %s AND user_id = %s RETURNING collection_id",
+        (collection_id, current_user.user_id),
+        name="delete_collection",
+    )
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
 
 
-@router.post("/{collection_id}/movies", status_code=status.HTTP_201_CREATED)
-def add_movie_to_collection(
+@router.post(
+    "/{collection_id}/movies", response_model=BulkResult, status_code=status.HTTP_201_CREATED
+)
+async def add_movie_to_collection(
     collection_id: int,
     data: AddMovie,
     current_user: UserInfo = Depends(get_current_user),
 ):
-    """Add a movie to a collection."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Add a movie to a collection; adding one that is already there is a no-op."""
+    result = await _change_movies(
+        _ADD_MOVIES_SQL, collection_id, current_user.user_id, [data.movie_id], "add_collection_movies"
+    )
+    # Nothing added is either a duplicate or an unknown movie; only the miss pays for the check.
+    if result["changed"] == 0 and await execute_query_one(
+        "SELECT 1 FROM movies WHERE movie_id = %s", (data.movie_id,), name="movie_exists"
+    ) is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return result
+
+
+@router.post("/{collection_id}/movies/bulk", response_model=BulkResult)
+async def add_movies_to_collection(
+    collection_id: int,
+    data: BulkMovies,
+    current_user: UserInfo = Depends(get_current_user),
+):
+    """Add many movies in one statement; ids already present or unknown are skipped."""
+    return await _change_movies(
+        _ADD_MOVIES_SQL, collection_id, current_user.user_id, data.movie_ids, "add_collection_movies"
+    )
+
+
+@router.post("/{collection_id}/movies/bulk-remove", response_model=BulkResult)
+async def remove_movies_from_collection(
+    collection_id: int,
+    data: BulkMovies,
+    current_user: UserInfo = Depends(get_current_user),
+):
+    """Remove many movies in one statement; ids not in the collection are skipped."""
+    return await _change_movies(
+        _REMOVE_MOVIES_SQL, collection_id, current_user.user_id, data.movie_ids,
+        "remove_collection_movies",
+    )
 
 
 @router.delete("/{collection_id}/movies/{movie_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_movie_from_collection(
+async def remove_movie_from_collection(
     collection_id: int,
     movie_id: int,
     current_user: UserInfo = Depends(get_current_user),
 ):
-    """Remove a movie from a collection."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Remove a movie from a collection; removing one that is not there is a no-op."""
+    await _change_movies(
+        _REMOVE_MOVIES_SQL, collection_id, current_user.user_id, [movie_id],
+        "remove_collection_movies",
+    )
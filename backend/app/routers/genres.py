@@ -1,9 +1,14 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Response
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/genres", tags=["genres"])
+from app.aggregates import set_freshness_header
+from app.async_database import execute_query, replica_reads
+from app.cache import CachedRoute, cached
+from app.config import settings
+
+router = APIRouter(prefix="/api/genres", tags=["genres"], route_class=CachedRoute)
 
 
 # --- Response Models ---
@@ -28,24 +33,64 @@ class GenrePolarisation(BaseModel):
     polarisation_score: float
 
 
+# Largest possible standard deviation on the 0.5-5 star scale, used to
+# normalise polarisation scores into [0, 1].
+_MAX_STD_DEV = 2.25
+
+
+# --- Helpers ---
+
+async def _read_genre_stats(response: Response, columns: str, clauses: str) -> list[dict]:
+    """Read the genre_stats aggregate and report its refresh time on the response."""
+    rows = await execute_query(
+        f"""
+        SELECT {columns}, ar.refreshed_at
+        FROM genre_stats
+        LEFT JOIN aggregate_refreshes ar ON ar.view_name = 'genre_stats'
+        {clauses}
+        """,
+        name="genre_stats",
+    )
+    if rows:
+        set_freshness_header(response, rows[0]["refreshed_at"])
+    return rows
+
+
 # --- Endpoints ---
 
 @router.get("", response_model=list[GenreCount])
-def list_genres():
+@cached(settings.ANALYTICS_CACHE_TTL)
+@replica_reads
+async def list_genres(response: Response):
     """List all genres with movie counts and average ratings."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return await _read_genre_stats(
+        response,
+        "genre, movie_count, ROUND(avg_rating::numeric, 3)::float AS avg_rating",
+        "ORDER BY genre",
+    )
 
 
 @router.get("/popularity", response_model=list[GenrePopularity])
-def genre_popularity():
+@cached(settings.ANALYTICS_CACHE_TTL)
+@replica_reads
+async def genre_popularity(response: Response):
     """Genre popularity statistics (total ratings, unique users)."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return await _read_genre_stats(
+        response,
+        "genre, total_ratings, ROUND(avg_rating::numeric, 3)::float AS avg_rating, unique_users",
+        "WHERE total_ratings > 0 ORDER BY total_ratings DESC, genre",
+    )
 
 
 @router.get("/polarisation", response_model=list[GenrePolarisation])
-def genre_polarisation():
+@cached(settings.ANALYTICS_CACHE_TTL)
+@replica_reads
+async def genre_polarisation(response: Response):
     """Genre polarisation scores (high std-dev = polarising)."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return await _read_genre_stats(
+        response,
+        f"""genre, ROUND(avg_rating::numeric, 3)::float AS avg_rating,
+            ROUND(std_dev::numeric, 3)::float AS std_dev,
+            ROUND((std_dev / {_MAX_STD_DEV})::numeric, 3)::float AS polarisation_score""",
+        "WHERE total_ratings > 1 ORDER BY std_dev DESC, genre",
+    )
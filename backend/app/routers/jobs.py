@@ -0,0 +1,102 @@
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from app.config import settings
+from app.jobs import get_job, submit
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+# --- Request / Response Models ---
+
+class SegmentsJob(BaseModel):
+    n_segments: int = Field(5, ge=2, le=20)
+
+
+class CrossGenreJob(BaseModel):
+    min_shared_users: int = Field(10, ge=1)
+
+
+class SimilarJob(BaseModel):
+    movie_id: int
+    limit: int = Field(10, ge=1, le=100)
+
+
+class JobInfo(BaseModel):
+    job_id: UUID
+    kind: str
+    params: dict[str, Any]
+    status: str  # queued | running | succeeded | failed
+    artifact_version: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# --- Helpers ---
+
+async def _submit(kind: str, params: BaseModel, response: Response) -> dict[str, Any]:
+    job = await submit(kind, params.model_dump())
+    response.headers["Location"] = f"{router.prefix}/{job['job_id']}"
+    if job["status"] == "succeeded":
+        # A finished job with the same parameters: its result can be fetched right away.
+        response.status_code = status.HTTP_200_OK
+    return job
+
+
+# --- Endpoints ---
+
+@router.post("/segments", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
+async def submit_segments_job(data: SegmentsJob, response: Response):
+    """Queue the /api/personality/segments computation."""
+    return await _submit("segments", data, response)
+
+
+@router.post("/cross-genre", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
+async def submit_cross_genre_job(data: CrossGenreJob, response: Response):
+    """Queue the /api/ratings/cross-genre computation."""
+    return await _submit("cross-genre", data, response)
+
+
+@router.post("/similar", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
+async def submit_similar_job(data: SimilarJob, response: Response):
+    """Queue the /api/predictions/similar/{movie_id} computation."""
+    return await _submit("similar", data, response)
+
+
+@router.get("/{job_id}", response_model=JobInfo)
+async def get_job_status(job_id: UUID):
+    """Job status; poll until it is succeeded or failed."""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: UUID):
+    """The job's result once it succeeded.
+
+    202 with the job status while it is queued or running, 409 with the error
+    if it failed.
+    """
+    job = await get_job(job_id, with_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=409, detail=job["error"] or "Job failed")
+    if job["status"] != "succeeded":
+        job.pop("result")
+        return JSONResponse(
+            JobInfo(**job).model_dump(mode="json"),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Retry-After": str(max(int(settings.JOB_POLL_INTERVAL), 1))},
+        )
+    return job["result"]
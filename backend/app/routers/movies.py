@@ -1,8 +1,17 @@
-from typing import Optional
+import base64
+import binascii
+import json
+from typing import Any, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+from app.async_database import execute_query, execute_query_one, replica_reads, stream_query
+from app.autocomplete import title_index
+from app.cache import TTLCache
+from app.config import settings
+from app.export import EXPORT_FORMAT_PATTERN, export_response
+
 router = APIRouter(prefix="/api/movies", tags=["movies"])
 
 
@@ -18,9 +27,11 @@ class MovieSummary(BaseModel):
 
 class MovieList(BaseModel):
     movies: list[MovieSummary]
-    total: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class MovieDetail(BaseModel):
@@ -33,40 +44,324 @@ class MovieDetail(BaseModel):
     tags: list[str] = []
 
 
+class TitleMatch(BaseModel):
+    movie_id: int
+    title: str
+    year: Optional[int] = None
+    num_ratings: int = 0
+
+
 class RatingDistribution(BaseModel):
     movie_id: int
     title: str
     distribution: dict[str, int]
-    avg_rating: float
-    num_ratings: int
+    avg_rating: Optional[float] = None
+    num_ratings: int = 0
+
+
+# --- Queries ---
+
+_EXPORT_COLUMNS = ["movie_id", "title", "year", "genres", "avg_rating", "num_ratings"]
+
+# Live per-movie aggregates from the trigger-maintained histograms, see
+# app/migrations/0005_rating_histograms.sql. ``s`` is movie_rating_stats.
+_AVG_RATING = "s.rating_sum / NULLIF(s.num_ratings, 0)"
+_NUM_RATINGS = "COALESCE(s.num_ratings, 0)"
+
+# Half-star bucket labels, matching movie_rating_stats.buckets[1..10].
+_BUCKET_LABELS = [f"{i / 2:.1f}" for i in range(1, 11)]
+
+_EXPORT_SQL = f"""
+    SELECT m.movie_id, m.title, m.year, m.genres,
+           ROUND(({_AVG_RATING})::numeric, 3)::float AS avg_rating,
+           {_NUM_RATINGS} AS num_ratings
+    FROM movies m
+    LEFT JOIN movie_rating_stats s USING (movie_id)
+    ORDER BY m.movie_id
+"""
+
+
+# Tags shown per movie, most frequently applied first.
+_MAX_TAGS = 20
+
+# One statement for any number of movies: aggregates are one movie_rating_stats
+# row per movie, tags are array-aggregated per movie over tags_movie_idx.
+_DETAILS_SQL = f"""
+    SELECT m.movie_id, m.title, m.year, m.genres,
+           {_AVG_RATING} AS avg_rating, {_NUM_RATINGS} AS num_ratings,
+           COALESCE(t.tags, '{{}}') AS tags
+    FROM unnest(%s::int[]) WITH ORDINALITY AS ids(movie_id, ord)
+    JOIN movies m USING (movie_id)
+    LEFT JOIN movie_rating_stats s USING (movie_id)
+    LEFT JOIN (
+        SELECT movie_id, (array_agg(tag ORDER BY uses DESC, tag))[1:{_MAX_TAGS}] AS tags
+        FROM (
+            SELECT movie_id, tag, COUNT(*) AS uses
+            FROM tags
+            WHERE movie_id = ANY(%s::int[])
+            GROUP BY movie_id, tag
+        ) counted
+        GROUP BY movie_id
+    ) t USING (movie_id)
+    ORDER BY ids.ord
+"""
+
+
+# Sort mode -> (key expression, direction). Each pair is backed by a
+# (key, movie_id) index on movie_catalogue, see app/migrations/0005_rating_histograms.sql.
+_SORT_KEYS = {
+    "title": ("title", "ASC"),
+    "rating": ("COALESCE(avg_rating, 0)", "DESC"),
+    "year": ("COALESCE(year, 0)", "DESC"),
+    "num_ratings": ("num_ratings", "DESC"),
+    # Only with a title filter: ranks trigram matches by similarity to it
+    # (index in app/migrations/0003_title_search.sql). %s is the title.
+    "relevance": ("similarity(title, %s)", "DESC"),
+}
+
+# Sort mode -> JSON types its cursor key may have; anything else never came from us.
+_CURSOR_KEY_TYPES = {
+    "title": (str,),
+    "rating": (int, float),
+    "year": (int,),
+    "num_ratings": (int,),
+    "relevance": (int, float),
+}
+
+_total_cache = TTLCache(maxsize=1024)
+
+
+# --- Helpers ---
+
+def _encode_cursor(sort: str, key: Any, movie_id: int) -> str:
+    raw = json.dumps([sort, key, movie_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key, movie_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    # bool is an int subclass, but true / false is never a valid key or id.
+    if (
+        not isinstance(key, _CURSOR_KEY_TYPES[sort]) or isinstance(key, bool)
+        or not isinstance(movie_id, int) or isinstance(movie_id, bool)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, movie_id
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _movie_filters(
+    title: Optional[str], genre: Optional[str], year: Optional[int], min_rating: Optional[float]
+) -> tuple[list[str], list[Any]]:
+    clauses, params = [], []
+    if title:
+        clauses.append("title ILIKE %s")
+        params.append(f"%{_escape_like(title)}%")
+    if genre:
+        clauses.append("genres @> ARRAY[%s]::text[]")
+        params.append(genre)
+    if year is not None:
+        clauses.append("year = %s")
+        params.append(year)
+    if min_rating is not None:
+        clauses.append("avg_rating >= %s")
+        params.append(min_rating)
+    return clauses, params
+
+
+async def _count_movies(where: str, params: list[Any], mode: str) -> tuple[Optional[int], bool]:
+    """Return (total, is_estimate) for the filtered catalogue according to total_mode."""
+    if mode == "none":
+        return None, False
+    if mode == "estimate":
+        row = await execute_query_one(
+            f"EXPLAIN (FORMAT JSON) SELECT 1 FROM movie_catalogue {where}",
+            tuple(params),
+            name="movies_estimate_total",
+        )
+        plan = row["QUERY PLAN"] if row else None
+        return (int(plan[0]["Plan"]["Plan Rows"]), True) if plan else (None, True)
+
+    key = (where, tuple(params))
+    if mode == "cached":
+        total = _total_cache.get(key)
+        if total is not None:
+            return total, False
+    row = await execute_query_one(
+        f"SELECT COUNT(*) AS total FROM movie_catalogue {where}", tuple(params), name="movies_count"
+    )
+    total = row["total"] if row else 0
+    if mode == "cached":
+        _total_cache.set(key, total, settings.MOVIE_TOTAL_CACHE_TTL)
+    return total, False
+
+
+async def fetch_movie_details(movie_ids: list[int]) -> list[dict[str, Any]]:
+    """Hydrate movies with genres, tags and rating aggregates in a single query.
+
+    Rows come back in ``movie_ids`` order (first occurrence); unknown ids are skipped.
+    """
+    ids = list(dict.fromkeys(movie_ids))
+    if not ids:
+        return []
+    return await execute_query(_DETAILS_SQL, (ids, ids), name="movie_details")
 
 
 # --- Endpoints ---
 
 @router.get("", response_model=MovieList)
-def list_movies(
+@replica_reads
+async def list_movies(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     title: Optional[str] = None,
     genre: Optional[str] = None,
     year: Optional[int] = None,
     min_rating: Optional[float] = Query(None, ge=0, le=5),
-    sort: str = Query("title", pattern="^(title|rating|year|num_ratings)$"),
+    sort: Optional[str] = Query(None, pattern="^(title|rating|year|num_ratings|relevance)$"),
+    cursor: Optional[str] = None,
+    total_mode: str = Query("cached", pattern="^(exact|cached|estimate|none)$"),
+):
+    """Paginated movie list with optional filters.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next page
+    with a keyset seek, so deep pages cost the same as the first. ``page`` is
+    still honoured (as an OFFSET) when no cursor is given.
+
+    Searches by ``title`` default to ``sort=relevance``, best match first.
+    """
+    if sort is None:
+        sort = "relevance" if title else "title"
+    if sort == "relevance" and not title:
+        raise HTTPException(status_code=400, detail="sort=relevance requires a title filter")
+    key_expr, direction = _SORT_KEYS[sort]
+    key_params = [title] if sort == "relevance" else []
+    clauses, params = _movie_filters(title, genre, year, min_rating)
+    filter_where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    filter_params = list(params)
+
+    offset = 0
+    if cursor:
+        last_key, last_id = _decode_cursor(cursor, sort)
+        clauses.append(f"({key_expr}, movie_id) {'>' if direction == 'ASC' else '<'} (%s, %s)")
+        params.extend([*key_params, last_key, last_id])
+    else:
+        offset = (page - 1) * page_size
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    # The page is picked from movie_catalogue's indexes, so filters, sort keys and
+    # cursors follow its last refresh; the aggregates shown are read live from
+    # movie_rating_stats, one primary-key lookup per row on the page.
+    rows = await execute_query(
+        f"""
+        SELECT p.movie_id, p.title, p.genres,
+               {_AVG_RATING} AS avg_rating, {_NUM_RATINGS} AS num_ratings, p.sort_key
+        FROM (
+            SELECT movie_id, title, genres, {key_expr} AS sort_key
+            FROM movie_catalogue
+            {where}
+            ORDER BY {key_expr} {direction}, movie_id {direction}
+            LIMIT %s OFFSET %s
+        ) p
+        LEFT JOIN movie_rating_stats s USING (movie_id)
+        ORDER BY p.sort_key {direction}, p.movie_id {direction}
+        """,
+        (*key_params, *params, *key_params, page_size + 1, offset),
+        name=f"movies_list_{sort}",
+    )
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_cursor(sort, rows[-1]["sort_key"], rows[-1]["movie_id"])
+
+    total, total_is_estimate = await _count_movies(filter_where, filter_params, total_mode)
+    return MovieList(
+        movies=[MovieSummary(**row) for row in rows],
+        total=total,
+        total_is_estimate=total_is_estimate,
+        page=page,
+        page_size=page_size,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/export")
+@replica_reads
+async def export_movies(fmt: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN)):
+    """Stream the full movie catalogue with rating aggregates as NDJSON or CSV."""
+    return export_response(stream_query(_EXPORT_SQL), fmt, _EXPORT_COLUMNS, "movies")
+
+
+@router.get("/autocomplete", response_model=list[TitleMatch])
+async def autocomplete_titles(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
 ):
-    """Paginated movie list with optional filters."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Titles with a word starting with ``q``, most-rated first.
+
+    Served from an in-memory prefix index, so it is safe to call per keystroke.
+    """
+    matches = title_index.search(q, limit)
+    if matches is None:
+        raise HTTPException(status_code=503, detail="Title index is still loading")
+    return matches
+
+
+@router.get("/batch", response_model=list[MovieDetail])
+@replica_reads
+async def get_movies_batch(ids: str = Query(..., pattern=r"^\d+(,\d+)*$")):
+    """Details for many movies at once, e.g. ``?ids=1,2,3``, in the order given.
+
+    Unknown ids are left out rather than failing the whole batch.
+    """
+    movie_ids = [int(i) for i in ids.split(",")]
+    if len(movie_ids) > settings.MOVIE_BATCH_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.MOVIE_BATCH_MAX} ids per request"
+        )
+    return await fetch_movie_details(movie_ids)
 
 
 @router.get("/{movie_id}", response_model=MovieDetail)
-def get_movie(movie_id: int):
+@replica_reads
+async def get_movie(movie_id: int):
     """Single movie detail including tags."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    movies = await fetch_movie_details([movie_id])
+    if not movies:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return movies[0]
 
 
 @router.get("/{movie_id}/ratings", response_model=RatingDistribution)
-def get_movie_ratings(movie_id: int):
-    """Rating distribution for a movie (e.g. count per star bucket)."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+@replica_reads
+async def get_movie_ratings(movie_id: int):
+    """Rating count per half-star bucket ("0.5" .. "5.0"), with average and total.
+
+    Read from the movie's precomputed histogram row, so the cost does not grow
+    with its number of ratings.
+    """
+    row = await execute_query_one(
+        f"""
+        SELECT m.movie_id, m.title, s.buckets,
+               {_AVG_RATING} AS avg_rating, {_NUM_RATINGS} AS num_ratings
+        FROM movies m
+        LEFT JOIN movie_rating_stats s USING (movie_id)
+        WHERE m.movie_id = %s
+        """,
+        (movie_id,),
+        name="movie_rating_distribution",
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    buckets = row.pop("buckets") or [0] * len(_BUCKET_LABELS)
+    return {**row, "distribution": dict(zip(_BUCKET_LABELS, buckets))}
@@ -1,9 +1,15 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/personality", tags=["personality"])
+from app.async_database import execute_query, replica_reads
+from app.cache import CachedRoute, cached
+from app.config import settings
+from app.correlations import trait_genre
+from app.segments import TRAITS, segments
+
+router = APIRouter(prefix="/api/personality", tags=["personality"], route_class=CachedRoute)
 
 
 # --- Response Models ---
@@ -33,29 +39,59 @@ class UserSegment(BaseModel):
     preferred_genres: list[str]
 
 
+# --- Queries ---
+
+_TRAIT_STATS_SQL = f"""
+    SELECT t.trait,
+           ROUND(AVG(t.score)::numeric, 3)::float AS mean,
+           ROUND(COALESCE(STDDEV_SAMP(t.score), 0)::numeric, 3)::float AS std_dev,
+           MIN(t.score)::float AS min,
+           MAX(t.score)::float AS max,
+           COUNT(t.score) AS count
+    FROM personality p
+    CROSS JOIN LATERAL (
+        VALUES {", ".join(f"('{trait}', p.{trait})" for trait in TRAITS)}
+    ) AS t(trait, score)
+    GROUP BY t.trait
+    ORDER BY t.trait
+"""
+
+
 # --- Endpoints ---
 
 @router.get("/traits", response_model=list[TraitStats])
-def personality_traits():
+@cached(settings.ANALYTICS_CACHE_TTL)
+@replica_reads
+async def personality_traits():
     """Big Five personality trait statistics across users."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return await execute_query(_TRAIT_STATS_SQL, name="personality_traits")
 
 
 @router.get("/genre-correlation", response_model=list[TraitGenreCorrelation])
-def trait_genre_correlation(
-    trait: Optional[str] = None,
+@cached(settings.ANALYTICS_CACHE_TTL)
+async def trait_genre_correlation(
+    trait: Optional[str] = Query(None, pattern=f"^({'|'.join(TRAITS)})$"),
     genre: Optional[str] = None,
 ):
-    """Correlation between personality traits and genre preferences."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Correlation between personality traits and genre preferences.
+
+    Slices the matrix published by ``python -m app.correlations trait-genre``,
+    strongest correlation first.
+    """
+    return [
+        {"trait": t, "genre": g, "correlation": round(r, 4), "p_value": p, "sample_size": n}
+        for t, g, r, p, n in trait_genre.get().pairs(trait, genre)
+    ]
 
 
 @router.get("/segments", response_model=list[UserSegment])
-def user_segments(
+@cached(settings.ANALYTICS_CACHE_TTL)
+async def user_segments(
     n_segments: int = Query(5, ge=2, le=20),
 ):
-    """Cluster users into segments based on personality and rating behaviour."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Cluster users into segments based on personality and rating behaviour.
+
+    Segments are fitted offline by ``python -m app.segments``; this only reads
+    the published result, largest segment first.
+    """
+    return segments.get().for_count(n_segments)
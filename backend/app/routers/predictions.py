@@ -1,8 +1,12 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Body, HTTPException, Query
 from pydantic import BaseModel
 
+from app.config import settings
+from app.rating_model import model as rating_model
+from app.similarity import index as similarity_index
+
 router = APIRouter(prefix="/api/predictions", tags=["predictions"])
 
 
@@ -33,12 +37,27 @@ class SimilarMovie(BaseModel):
 @router.post("/predict", response_model=PredictionResponse)
 def predict_rating(data: PredictionRequest):
     """Predict the rating for a hypothetical new title based on genre and metadata."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return rating_model.get().predict([data.genres], [data.year])[0]
+
+
+@router.post("/predict/batch", response_model=list[PredictionResponse])
+def predict_ratings_batch(
+    items: list[PredictionRequest] = Body(..., max_length=settings.PREDICTION_BATCH_MAX),
+):
+    """Score many hypothetical titles in one vectorized pass; results follow input order."""
+    if not items:
+        return []
+    return rating_model.get().predict([i.genres for i in items], [i.year for i in items])
 
 
 @router.get("/similar/{movie_id}", response_model=list[SimilarMovie])
-def similar_movies(movie_id: int, limit: int = Query(10, ge=1, le=100)):
-    """Find movies similar to the given movie based on ratings and genre overlap."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+async def similar_movies(movie_id: int, limit: int = Query(10, ge=1, le=100)):
+    """Find movies similar to the given movie based on ratings and genre overlap.
+
+    Served from the precomputed index (see app/similarity.py), so results
+    reflect ratings as of its last build.
+    """
+    similar = similarity_index.get().similar(movie_id, limit)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return similar
@@ -3,7 +3,14 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/ratings", tags=["ratings"])
+from app.async_database import execute_query, replica_reads, stream_query
+from app.cache import CachedRoute, cached
+from app.config import settings
+from app.correlations import cross_genre, cross_genre_pairs
+from app.export import EXPORT_FORMAT_PATTERN, export_response
+from app.singleflight import coalesced
+
+router = APIRouter(prefix="/api/ratings", tags=["ratings"], route_class=CachedRoute)
 
 
 # --- Response Models ---
@@ -37,25 +44,104 @@ class RatingConsistency(BaseModel):
     least_consistent_pct: float
 
 
+# --- Queries ---
+
+_PATTERN_COLUMNS = ["user_id", "total_ratings", "avg_rating", "std_dev", "genres_rated"]
+
+# Per-user rating behaviour. {limit} picks the users (ORDER BY ... LIMIT, or
+# nothing) before genre breadth is counted, so that join only touches their
+# ratings; {order} orders the output.
+_PATTERNS_SQL = """
+    WITH user_stats AS (
+        SELECT user_id, COUNT(*) AS total_ratings,
+               AVG(rating) AS avg_rating, STDDEV_SAMP(rating) AS std_dev
+        FROM ratings
+        GROUP BY user_id
+        HAVING COUNT(*) >= %s
+        {limit}
+    )
+    SELECT s.user_id, s.total_ratings,
+           ROUND(s.avg_rating::numeric, 3)::float AS avg_rating,
+           ROUND(COALESCE(s.std_dev, 0)::numeric, 3)::float AS std_dev,
+           ug.genres_rated
+    FROM user_stats s
+    CROSS JOIN LATERAL (
+        SELECT COUNT(DISTINCT g.genre) AS genres_rated
+        FROM ratings r
+        JOIN movies m USING (movie_id)
+        CROSS JOIN LATERAL unnest(m.genres) AS g(genre)
+        WHERE r.user_id = s.user_id
+    ) ug
+    {order}
+"""
+
+
+# A user's ratings within a genre count as consistent / inconsistent when
+# their standard deviation falls below / above these bounds.
+_CONSISTENT_STD_DEV = 0.75
+_INCONSISTENT_STD_DEV = 1.25
+_MIN_GENRE_RATINGS = 5
+
+_CONSISTENCY_SQL = """
+    WITH user_genre AS (
+        SELECT g.genre, r.user_id, STDDEV_SAMP(r.rating) AS std_dev
+        FROM ratings r
+        JOIN movies m USING (movie_id)
+        CROSS JOIN LATERAL unnest(m.genres) AS g(genre)
+        GROUP BY g.genre, r.user_id
+        HAVING COUNT(*) >= %s
+    )
+    SELECT genre,
+           ROUND(AVG(std_dev)::numeric, 3)::float AS avg_std_dev,
+           ROUND(100 * AVG((std_dev < %s)::int)::numeric, 2)::float AS most_consistent_pct,
+           ROUND(100 * AVG((std_dev > %s)::int)::numeric, 2)::float AS least_consistent_pct
+    FROM user_genre
+    GROUP BY genre
+    ORDER BY avg_std_dev
+"""
+
+
 # --- Endpoints ---
 
 @router.get("/patterns", response_model=list[RatingPattern])
-def rating_patterns(
+@coalesced
+@replica_reads
+async def rating_patterns(
     limit: int = Query(50, ge=1, le=500),
     min_ratings: int = Query(10, ge=1),
 ):
     """Rating behaviour patterns across users."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    sql = _PATTERNS_SQL.format(
+        limit="ORDER BY total_ratings DESC, user_id LIMIT %s",
+        order="ORDER BY s.total_ratings DESC, s.user_id",
+    )
+    return await execute_query(sql, (min_ratings, limit), name="rating_patterns")
+
+
+@router.get("/patterns/export")
+@replica_reads
+async def export_rating_patterns(
+    min_ratings: int = Query(10, ge=1),
+    fmt: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+):
+    """Stream rating patterns for every qualifying user as NDJSON or CSV."""
+    sql = _PATTERNS_SQL.format(limit="", order="ORDER BY s.user_id")
+    return export_response(
+        stream_query(sql, (min_ratings,)), fmt, _PATTERN_COLUMNS, "rating_patterns"
+    )
 
 
 @router.get("/cross-genre", response_model=list[CrossGenrePreference])
-def cross_genre_preferences(
+@cached(settings.ANALYTICS_CACHE_TTL)
+async def cross_genre_preferences(
     min_shared_users: int = Query(10, ge=1),
 ):
-    """Cross-genre preference correlations."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Cross-genre preference correlations.
+
+    Correlates users' mean ratings between each pair of genres, from the
+    matrix published by ``python -m app.correlations cross-genre``.
+    """
+    return cross_genre_pairs(cross_genre.get(), min_shared_users)
 
 
 @router.get("/low-raters", response_model=list[LowRater])
@@ -69,7 +155,12 @@ def low_raters(
 
 
 @router.get("/consistency", response_model=list[RatingConsistency])
-def rating_consistency():
+@cached(settings.ANALYTICS_CACHE_TTL)
+@replica_reads
+async def rating_consistency():
     """Rating consistency analysis per genre."""
-    # TODO: implement once DB schema is finalised
-    raise HTTPException(status_code=501, detail="Not implemented")
+    return await execute_query(
+        _CONSISTENCY_SQL,
+        (_MIN_GENRE_RATINGS, _CONSISTENT_STD_DEV, _INCONSISTENT_STD_DEV),
+        name="rating_consistency",
+    )
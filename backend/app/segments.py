@@ -0,0 +1,228 @@
+"""Personality user segments behind /api/personality/segments.
+
+Build offline and publish with::
+
+    python -m app.segments            # incremental when possible
+    python -m app.segments --full     # refit every model from scratch
+
+Each user with personality data becomes one row of a feature matrix: the
+standardised Big Five scores plus their genre preferences (genre mean minus
+overall mean) and rating activity. The matrix is built once per run, saved
+next to the models, and shared by worker processes that fit one
+MiniBatchKMeans per segment count. When the previous version used the same
+features, its models are continued with ``partial_fit`` on new users only.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import joblib
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+from app.artifacts import Artifact, artifact_dir, current_version, publish, read_frame
+from app.config import settings
+from app.preferences import genre_matrix, read_movie_genres
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAME = "segments"
+
+# Big Five trait columns of the personality table.
+TRAITS = ["openness", "conscientiousness", "extraversion", "agreeableness", "emotional_stability"]
+SEGMENT_COUNTS = range(2, 21)
+
+_BATCH_SIZE = 1024
+_PREFERRED_GENRES = 3
+
+
+@dataclass
+class Segments:
+    summaries: dict[int, list[dict[str, Any]]]
+    user_count: int
+
+    def for_count(self, n_segments: int) -> list[dict[str, Any]]:
+        return self.summaries.get(n_segments, [])
+
+
+def load(directory: Path) -> Segments:
+    with open(directory / "summaries.json") as f:
+        data = json.load(f)
+    return Segments(
+        summaries={int(n): rows for n, rows in data["summaries"].items()},
+        user_count=data["user_count"],
+    )
+
+
+segments: Artifact[Segments] = Artifact(
+    ARTIFACT_NAME, load, invalidates="/api/personality/segments"
+)
+
+
+# --- Offline build ---
+
+def build_features() -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Return (user_ids, raw feature matrix, column names) for users with personality data."""
+    personality = read_frame(
+        f"SELECT user_id, {', '.join(TRAITS)} FROM personality "
+        f"WHERE {' AND '.join(f'{t} IS NOT NULL' for t in TRAITS)} ORDER BY user_id",
+        {"user_id": "int32", **{t: "float64" for t in TRAITS}},
+    )
+    ratings = read_frame(
+        "SELECT r.user_id, r.movie_id, r.rating FROM ratings r JOIN personality p USING (user_id)",
+        {"user_id": "int32", "movie_id": "int32", "rating": "float32"},
+    )
+    movie_ids, movie_genres, genres = read_movie_genres()
+    user_ids = personality["user_id"].to_numpy()
+    matrix = genre_matrix(user_ids, ratings, movie_ids, movie_genres, genres)
+
+    preferences = np.nan_to_num(matrix.preferences(), nan=0.0)
+    activity = np.log1p(matrix.rating_counts)[:, None]
+    # Users without ratings get the population mean rather than an outlying 0.
+    fill = float(np.nanmean(matrix.user_means)) if np.isfinite(matrix.user_means).any() else 0.0
+    mean_rating = np.nan_to_num(matrix.user_means, nan=fill)[:, None]
+    features = np.hstack([personality[TRAITS].to_numpy(), preferences, activity, mean_rating])
+    columns = TRAITS + [f"genre:{g}" for g in genres] + ["log_ratings", "mean_rating"]
+    return user_ids, features.astype(np.float32), columns
+
+
+def _fit(
+    n_segments: int,
+    scaled_path: str,
+    model: Optional[MiniBatchKMeans],
+    new_rows: Optional[np.ndarray],
+) -> tuple[MiniBatchKMeans, np.ndarray]:
+    """Worker-process entry point: fit (or continue) one model and label every user."""
+    scaled = np.load(scaled_path, mmap_mode="r")
+    if model is None:
+        model = MiniBatchKMeans(
+            n_clusters=n_segments, batch_size=_BATCH_SIZE, n_init=3, random_state=0
+        ).fit(scaled)
+    else:
+        for start in range(0, len(new_rows), _BATCH_SIZE):
+            model.partial_fit(scaled[new_rows[start:start + _BATCH_SIZE]])
+    return model, model.predict(scaled)
+
+
+def _label(centroid_z: np.ndarray) -> str:
+    strongest = np.argsort(-np.abs(centroid_z[: len(TRAITS)]))[:2]
+    return ", ".join(
+        f"{'High' if centroid_z[i] >= 0 else 'Low'} {TRAITS[i].replace('_', ' ')}"
+        for i in strongest
+    )
+
+
+def _summarise(
+    labels: np.ndarray, model: MiniBatchKMeans, features: np.ndarray, columns: list[str]
+) -> list[dict[str, Any]]:
+    genre_cols = [i for i, c in enumerate(columns) if c.startswith("genre:")]
+    sizes = np.bincount(labels, minlength=model.n_clusters)
+    summaries = []
+    for segment in np.argsort(-sizes):
+        members = features[labels == segment]
+        if len(members) == 0:
+            continue
+        traits = members[:, : len(TRAITS)].mean(axis=0)
+        genre_pref = members[:, genre_cols].mean(axis=0)
+        top_genres = np.argsort(-genre_pref)[:_PREFERRED_GENRES]
+        preferred = [columns[genre_cols[i]][len("genre:"):] for i in top_genres]
+        summaries.append({
+            "segment_id": int(segment),
+            "label": _label(model.cluster_centers_[segment]),
+            "size": int(sizes[segment]),
+            "dominant_traits": {t: round(float(v), 3) for t, v in zip(TRAITS, traits)},
+            "preferred_genres": preferred,
+        })
+    return summaries
+
+
+def _previous() -> Optional[dict[str, Any]]:
+    version = current_version(ARTIFACT_NAME)
+    if version is None:
+        return None
+    directory = artifact_dir(ARTIFACT_NAME) / version
+    try:
+        state = joblib.load(directory / "models.joblib")
+        state["user_ids"] = np.load(directory / "user_ids.npy")
+    except FileNotFoundError:
+        return None
+    return state
+
+
+def build(full: bool = False, workers: Optional[int] = None) -> str:
+    started = time.monotonic()
+    user_ids, features, columns = build_features()
+    if len(user_ids) == 0:
+        # Nothing to scale or cluster; keep serving the previous artifact, if any.
+        raise RuntimeError(
+            "No users with complete personality data; load it with python -m app.loader first"
+        )
+    previous = None if full else _previous()
+    if previous is not None and previous["columns"] != columns:
+        logger.info("Feature columns changed; refitting every model")
+        previous = None
+
+    if previous is None:
+        scaler = StandardScaler().fit(features)
+        models: dict[int, Optional[MiniBatchKMeans]] = {n: None for n in SEGMENT_COUNTS}
+        new_rows = None
+    else:
+        # Keep the old scaling so continued centroids stay in the same space.
+        scaler = previous["scaler"]
+        models = {n: previous["models"].get(n) for n in SEGMENT_COUNTS}
+        new_rows = np.flatnonzero(~np.isin(user_ids, previous["user_ids"]))
+        logger.info("Continuing models with %d new users", len(new_rows))
+    scaled = scaler.transform(features).astype(np.float32)
+
+    def write(directory: Path) -> None:
+        np.save(directory / "user_ids.npy", user_ids)
+        np.save(directory / "features.npy", features)
+        np.save(directory / "scaled.npy", scaled)
+        fitted: dict[int, MiniBatchKMeans] = {}
+        summaries: dict[int, list[dict[str, Any]]] = {}
+        # spawn: workers only need the module, and the matrix via the saved file.
+        with ProcessPoolExecutor(
+            max_workers=workers or settings.SEGMENT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = {
+                n: pool.submit(
+                    _fit, n, str(directory / "scaled.npy"), models[n],
+                    new_rows if models[n] is not None else None,
+                )
+                for n in SEGMENT_COUNTS
+                if n < len(user_ids)
+            }
+            for n, future in futures.items():
+                fitted[n], labels = future.result()
+                summaries[n] = _summarise(labels, fitted[n], features, columns)
+        joblib.dump({"scaler": scaler, "models": fitted, "columns": columns}, directory / "models.joblib")
+        with open(directory / "summaries.json", "w") as f:
+            json.dump({"summaries": summaries, "user_count": len(user_ids)}, f)
+
+    version = publish(ARTIFACT_NAME, write)
+    logger.info("Built segments for %d users in %.1fs", len(user_ids), time.monotonic() - started)
+    return version
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fit and publish personality user segments.")
+    parser.add_argument(
+        "--full", action="store_true", help="Refit instead of continuing the previous models"
+    )
+    parser.add_argument("--workers", type=int, help="Worker processes fitting models in parallel")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(build(args.full, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Precomputed item-item similarity index behind /api/predictions/similar.
+
+Build offline and publish with::
+
+    python -m app.similarity
+
+A movie's score against another blends the shrunk cosine similarity of their
+user-mean-centred rating vectors with the Jaccard overlap of their genres. The
+top ``SIMILARITY_TOP_K`` neighbours of every movie are written as fixed-width
+``.npy`` arrays that the API memory-maps, so a lookup is a binary search plus
+one row read.
+"""
+import argparse
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import MultiLabelBinarizer, normalize
+
+from app.artifacts import Artifact, publish, read_frame
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAME = "similarity"
+
+# Movies scored per block; bounds the dense block x movies score matrices.
+_BLOCK_ROWS = 256
+
+
+@dataclass
+class SimilarityIndex:
+    movie_ids: np.ndarray  # sorted, int32
+    neighbors: np.ndarray  # (movies, k) row positions into movie_ids
+    scores: np.ndarray  # (movies, k) float32, descending per row
+    titles: list[str]
+    genres: list[list[str]]
+    avg_ratings: list[Optional[float]]
+
+    def similar(self, movie_id: int, limit: int) -> Optional[list[dict[str, Any]]]:
+        """Top ``limit`` neighbours of ``movie_id``, or None if it is not in the index."""
+        pos = int(np.searchsorted(self.movie_ids, movie_id))
+        if pos >= len(self.movie_ids) or self.movie_ids[pos] != movie_id:
+            return None
+        return [
+            {
+                "movie_id": int(self.movie_ids[n]),
+                "title": self.titles[n],
+                "similarity_score": round(float(score), 4),
+                "genres": self.genres[n],
+                "avg_rating": self.avg_ratings[n],
+            }
+            for n, score in zip(self.neighbors[pos, :limit].tolist(), self.scores[pos, :limit])
+            if score > 0
+        ]
+
+
+def load(directory: Path) -> SimilarityIndex:
+    with open(directory / "movies.json") as f:
+        meta = json.load(f)
+    return SimilarityIndex(
+        movie_ids=np.load(directory / "movie_ids.npy"),
+        neighbors=np.load(directory / "neighbors.npy", mmap_mode="r"),
+        scores=np.load(directory / "scores.npy", mmap_mode="r"),
+        titles=meta["titles"],
+        genres=meta["genres"],
+        avg_ratings=meta["avg_ratings"],
+    )
+
+
+index: Artifact[SimilarityIndex] = Artifact(ARTIFACT_NAME, load)
+
+
+# --- Offline build ---
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def compute(
+    movie_ids: np.ndarray,
+    movie_genres: list[list[str]],
+    user_ids: np.ndarray,
+    rating_movie_ids: np.ndarray,
+    ratings: np.ndarray,
+    top_k: int,
+    genre_weight: float,
+    shrinkage: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return (neighbors, scores) arrays of shape (movies, k) for sorted ``movie_ids``."""
+    n_movies = len(movie_ids)
+    k = min(top_k, n_movies - 1)
+    if k <= 0:
+        return np.empty((n_movies, 0), dtype=np.int32), np.empty((n_movies, 0), dtype=np.float32)
+
+    cols = np.searchsorted(movie_ids, rating_movie_ids)
+    known = (cols < n_movies) & (movie_ids[np.minimum(cols, n_movies - 1)] == rating_movie_ids)
+    cols, user_ids, ratings = cols[known], user_ids[known], ratings[known]
+    _, users = np.unique(user_ids, return_inverse=True)
+    n_users = int(users.max()) + 1 if len(users) else 0
+
+    # Centre on each user's mean so generous and harsh raters are comparable.
+    user_sum = np.bincount(users, weights=ratings, minlength=n_users)
+    user_count = np.bincount(users, minlength=n_users)
+    centred = (ratings - (user_sum / np.maximum(user_count, 1))[users]).astype(np.float32)
+
+    x = normalize(sparse.csr_matrix((centred, (cols, users)), shape=(n_movies, n_users)))
+    xt = x.T.tocsr()
+    rated = sparse.csr_matrix(
+        (np.ones(len(cols), dtype=np.float32), (cols, users)), shape=(n_movies, n_users)
+    )
+    rated_t = rated.T.tocsr()
+    g = sparse.csr_matrix(
+        MultiLabelBinarizer(sparse_output=True).fit_transform(movie_genres), dtype=np.float32
+    )
+    gt = g.T.tocsr()
+    g_size = np.asarray(g.sum(axis=1)).ravel()
+
+    neighbors = np.empty((n_movies, k), dtype=np.int32)
+    scores = np.empty((n_movies, k), dtype=np.float32)
+    for start in range(0, n_movies, _BLOCK_ROWS):
+        stop = min(start + _BLOCK_ROWS, n_movies)
+        cosine = (x[start:stop] @ xt).toarray()
+        # Shrink similarities supported by few co-raters towards zero; with
+        # shrinkage 0, pairs without co-raters would otherwise divide 0 by 0.
+        co_raters = (rated[start:stop] @ rated_t).toarray()
+        support = co_raters + shrinkage
+        cosine *= np.divide(co_raters, support, out=np.zeros_like(co_raters), where=support > 0)
+        overlap = (g[start:stop] @ gt).toarray()
+        union = g_size[start:stop, None] + g_size[None, :] - overlap
+        jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+        block = (1 - genre_weight) * cosine + genre_weight * jaccard
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        neighbors[start:stop], scores[start:stop] = _top_k(block, k)
+    return neighbors, scores
+
+
+def build(
+    top_k: Optional[int] = None,
+    genre_weight: Optional[float] = None,
+    shrinkage: Optional[float] = None,
+) -> str:
+    started = time.monotonic()
+    movies = read_frame(
+        "SELECT movie_id, title, array_to_string(genres, '|') AS genres, avg_rating "
+        "FROM movie_catalogue ORDER BY movie_id",
+        {"movie_id": "int32", "title": "str", "genres": "str", "avg_rating": "float64"},
+    )
+    ratings = read_frame(
+        "SELECT user_id, movie_id, rating FROM ratings",
+        {"user_id": "int32", "movie_id": "int32", "rating": "float32"},
+    )
+    logger.info("Read %d movies and %d ratings in %.1fs",
+                len(movies), len(ratings), time.monotonic() - started)
+
+    movie_ids = movies["movie_id"].to_numpy()
+    genres = [g.split("|") if g else [] for g in movies["genres"].fillna("")]
+    neighbors, scores = compute(
+        movie_ids,
+        genres,
+        ratings["user_id"].to_numpy(),
+        ratings["movie_id"].to_numpy(),
+        ratings["rating"].to_numpy(),
+        top_k or settings.SIMILARITY_TOP_K,
+        settings.SIMILARITY_GENRE_WEIGHT if genre_weight is None else genre_weight,
+        settings.SIMILARITY_SHRINKAGE if shrinkage is None else shrinkage,
+    )
+    avg = movies["avg_rating"].round(3)
+
+    def write(directory: Path) -> None:
+        np.save(directory / "movie_ids.npy", movie_ids)
+        np.save(directory / "neighbors.npy", neighbors)
+        np.save(directory / "scores.npy", scores)
+        with open(directory / "movies.json", "w") as f:
+            json.dump({
+                "titles": movies["title"].tolist(),
+                "genres": genres,
+                "avg_ratings": [None if np.isnan(v) else float(v) for v in avg],
+            }, f)
+
+    version = publish(ARTIFACT_NAME, write)
+    logger.info("Built similarity index for %d movies in %.1fs", len(movie_ids), time.monotonic() - started)
+    return version
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build and publish the item-item similarity index.")
+    parser.add_argument("--top-k", type=int, help="Neighbours kept per movie")
+    parser.add_argument("--genre-weight", type=float, help="Weight of genre overlap (0-1)")
+    parser.add_argument("--shrinkage", type=float, help="Co-rater count at which similarity is halved")
+    args = parser.parse_args(argv)
+    if args.shrinkage is not None and args.shrinkage < 0:
+        parser.error("--shrinkage must not be negative")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(build(args.top_k, args.genre_weight, args.shrinkage))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, Hashable, Optional
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the work; callers that arrive while it is
+    in flight wait for and receive the same result (or exception). Nothing is
+    remembered once the call finishes, so this complements rather than
+    replaces caching.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Blocking variant for sync code running in worker threads."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(
+        self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """Event-loop variant; the shared work runs as a task that outlives any one caller.
+
+        A caller that is cancelled (e.g. its client disconnected) stops waiting
+        without cancelling the computation the other callers depend on.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled.
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._tasks)
+
+
+flights = SingleFlight()
+
+
+def coalesced(endpoint):
+    """Share one in-flight execution between identical concurrent requests.
+
+    Works for sync and async endpoints, but only on routers built with
+    ``route_class=CachedRoute``. Requests are identical when path and query
+    string match, so the endpoint must not vary per user. ``@cached``
+    endpoints are already coalesced on a cache miss.
+    """
+    endpoint.coalesce = True
+    return endpoint
@@ -0,0 +1,12 @@
+"""Benchmarks against a running API at production-like scale.
+
+Run from ``backend/``::
+
+    python -m benchmarks.generate --ratings 10000000      # synthetic data into Postgres
+    python -m benchmarks.load --base-url http://localhost:8000
+    python -m benchmarks.compare results/old.json results/new.json
+
+``generate`` writes MovieLens-shaped CSVs and loads them with ``app.loader``;
+``load`` drives every router through a concurrent HTTP harness and saves
+per-endpoint latency percentiles and throughput as JSON for ``compare``.
+"""
@@ -0,0 +1,89 @@
+"""Compare two ``benchmarks.load`` result files.
+
+Usage::
+
+    python -m benchmarks.compare results/before.json results/after.json
+    python -m benchmarks.compare before.json after.json --threshold 15 --metric p99
+
+Prints p50/p95/p99 latency and throughput per endpoint with the change from
+the baseline. Exits 1 if any endpoint regressed by more than ``--threshold``
+percent (latency up on ``--metric`` or throughput down), so it can gate CI.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Optional
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+
+def _fmt(value: Optional[float], change: Optional[float]) -> str:
+    if value is None:
+        return f"{'-':>18}"
+    delta = f"({change:+.0f}%)" if change is not None else ""
+    return f"{value:>10.1f} {delta:>7}"
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float, metric: str
+) -> list[str]:
+    """Print the comparison table; return the names of regressed endpoints."""
+    regressions = []
+    print(f"{'endpoint':<50} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'req/s':>18}")
+    for name, new in current["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if old is None:
+            print(f"{name:<50} (new)")
+            continue
+        old_ms, new_ms = old["latency_ms"] or {}, new["latency_ms"] or {}
+        cells = []
+        for p in ("p50", "p95", "p99"):
+            cells.append(_fmt(new_ms.get(p), _change(old_ms.get(p), new_ms.get(p))))
+        rps_change = _change(old["throughput_rps"], new["throughput_rps"])
+        cells.append(_fmt(new["throughput_rps"], rps_change))
+
+        latency_change = _change(old_ms.get(metric), new_ms.get(metric))
+        regressed = (
+            (latency_change is not None and latency_change > threshold)
+            or (rps_change is not None and rps_change < -threshold)
+            or new["errors"] > old["errors"]
+        )
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<50} {' '.join(cells)}{'  REGRESSED' if regressed else ''}")
+    for name in baseline["endpoints"].keys() - current["endpoints"].keys():
+        print(f"{name:<50} (missing)")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two load benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change that counts as a regression")
+    parser.add_argument("--metric", default="p95", help="Latency percentile to gate on (p50, p95, p99)")
+    args = parser.parse_args(argv)
+    if args.metric not in ("p50", "p95", "p99"):
+        parser.error("--metric must be p50, p95 or p99")
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for label, report in (("baseline", baseline), ("current", current)):
+        meta = report["meta"]
+        print(f"{label}: {meta.get('git_commit') or '?'} at {meta['started_at']} "
+              f"(concurrency {meta['concurrency']}, {meta['duration']}s)")
+    regressions = compare(baseline, current, args.threshold, args.metric)
+    if regressions:
+        print(f"{len(regressions)} endpoint(s) regressed by more than {args.threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Synthetic MovieLens-shaped dataset generator.
+
+Usage::
+
+    python -m benchmarks.generate --ratings 1000000
+    python -m benchmarks.generate --ratings 100000000 --workers 4
+    python -m benchmarks.generate --ratings 100000 --no-load --data-dir /tmp/ml-100k
+
+Writes ``movies.csv``, ``ratings.csv``, ``tags.csv`` and
+``personality-data.csv`` in the MovieLens layout, then loads them with
+``app.loader`` (which applies migrations first). Movie popularity and user
+activity both follow Zipf-like power laws, so a few titles and users account
+for most ratings, as in the real data. Ratings are generated one block of
+users at a time, so memory stays flat from 100k to 100M ratings.
+"""
+import argparse
+import csv
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.segments import TRAITS
+
+logger = logging.getLogger(__name__)
+
+GENRES = [
+    "Drama", "Comedy", "Thriller", "Romance", "Action", "Crime", "Horror", "Documentary",
+    "Adventure", "Sci-Fi", "Mystery", "Fantasy", "Children", "Animation", "War",
+    "Musical", "Western", "Film-Noir", "IMAX",
+]
+# Rough share of MovieLens titles carrying each genre.
+GENRE_WEIGHTS = np.array([
+    25.0, 17.0, 8.5, 7.5, 7.0, 5.5, 5.5, 4.0, 4.0, 3.5, 3.0, 2.8, 2.5, 2.5, 1.5,
+    1.1, 0.9, 0.3, 0.2,
+])
+
+_TITLE_WORDS = (
+    "night day last first dark love city star man woman girl boy house road war king queen "
+    "secret lost return story dead life blood fire water island river heart dream world "
+    "shadow time summer winter little big black white red blue golden silent wild lonely "
+    "american french midnight morning storm ghost hunter killer family brother sister "
+    "father mother journey escape game kingdom empire legend dragon angel devil paradise"
+).split()
+_TAGS = (
+    "atmospheric", "funny", "dark comedy", "twist ending", "visually appealing", "based on a book",
+    "classic", "thought-provoking", "violence", "great soundtrack", "cult film", "quirky",
+    "sci-fi", "romance", "slow", "philosophical", "dystopia", "surreal", "great acting",
+    "predictable", "boring", "nonlinear", "time travel", "heist",
+)
+
+_FIRST_TIMESTAMP = 820454400  # 1996-01-01
+_LAST_TIMESTAMP = 1735603200  # 2024-12-31
+_MIN_USER_RATINGS = 20  # MovieLens only includes users with at least 20 ratings
+
+
+@dataclass(frozen=True)
+class Scale:
+    ratings: int
+    users: int
+    movies: int
+    tags: int
+    personality_users: int
+
+    @classmethod
+    def for_ratings(cls, ratings: int) -> "Scale":
+        """MovieLens-like proportions: ~150 ratings per user, movies ~ 5 * sqrt(ratings)."""
+        users = max(ratings // 150, 50)
+        return cls(
+            ratings=ratings,
+            users=users,
+            movies=max(int(5 * math.sqrt(ratings)), 500),
+            tags=ratings // 25,
+            personality_users=min(users, 2000),
+        )
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    # np.unique hashes before sorting on numpy 2, which is several times slower here.
+    values.sort()
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def user_activity(scale: Scale, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    """Ratings per user, shuffled over user ids: a Zipf tail above a floor, summing to ~ratings."""
+    floor = min(_MIN_USER_RATINGS, max(scale.ratings // scale.users, 1))
+    cap = max(scale.movies // 2, floor)  # nobody rates the whole catalogue
+    weights = zipf_weights(scale.users, exponent)
+    counts = np.full(scale.users, float(floor))
+    # Hand the mass clipped off the heaviest users to the rest until it is all placed.
+    for _ in range(20):
+        extra = scale.ratings - counts.sum()
+        open_ = counts < cap
+        if extra < 1 or not open_.any():
+            break
+        counts[open_] += weights[open_] / weights[open_].sum() * extra
+        counts = np.minimum(counts, cap)
+    return rng.permutation(np.floor(counts).astype(np.int64))
+
+
+# --- Tables ---
+
+def movies_frame(scale: Scale, rng: np.random.Generator) -> pd.DataFrame:
+    n = scale.movies
+    years = np.clip(2024 - np.floor(rng.exponential(18, n)), 1902, 2024).astype(int)
+    words = rng.choice(_TITLE_WORDS, size=(n, 3))
+    lengths = rng.choice([1, 2, 3], size=n, p=[0.3, 0.5, 0.2])
+    titles = []
+    for i in range(n):
+        title = " ".join(words[i, : lengths[i]]).title()
+        if rng.random() < 0.1:
+            title = f"{title}, The"  # MovieLens moves leading articles to the end
+        titles.append(f"{title} {i + 1} ({years[i]})")
+
+    genre_p = GENRE_WEIGHTS / GENRE_WEIGHTS.sum()
+    genre_counts = rng.choice([1, 2, 3], size=n, p=[0.45, 0.35, 0.2])
+    genres = [
+        "|".join(rng.choice(GENRES, size=k, replace=False, p=genre_p))
+        if rng.random() > 0.01 else "(no genres listed)"
+        for k in genre_counts
+    ]
+    return pd.DataFrame({"movieId": np.arange(1, n + 1), "title": titles, "genres": genres})
+
+
+def rating_blocks(
+    scale: Scale,
+    movie_exponent: float,
+    user_exponent: float,
+    rng: np.random.Generator,
+    block_ratings: int = 2_000_000,
+) -> Iterator[pd.DataFrame]:
+    """Yield ratings for consecutive blocks of users; (user, movie) pairs are unique."""
+    m = scale.movies
+    # Popularity rank -> movie id is shuffled so the head is not simply ids 1..k.
+    popularity = zipf_weights(m, movie_exponent)[rng.permutation(m).argsort()]
+    cdf = np.cumsum(popularity)
+    cdf[-1] = 1.0
+    # Popular titles rate a little higher, as they do in MovieLens.
+    log_popularity = np.log(popularity)
+    quality = rng.normal(3.35, 0.45, m) + 0.06 * (log_popularity - log_popularity.mean())
+    activity = user_activity(scale, user_exponent, rng)
+    bias = rng.normal(0.0, 0.35, scale.users)
+
+    start = 0
+    while start < scale.users:
+        stop = start + 1
+        budget = activity[start]
+        while stop < scale.users and budget + activity[stop] <= block_ratings:
+            budget += activity[stop]
+            stop += 1
+        wanted = activity[start:stop]
+        users = np.arange(start, stop)
+        keys = np.empty(0, dtype=np.int64)
+        missing = wanted
+        # Draws collide on popular titles; keep topping up each user's shortfall.
+        for _ in range(12):
+            draw_users = np.repeat(users, missing)
+            if len(draw_users) == 0:
+                break
+            draws = np.searchsorted(cdf, rng.random(len(draw_users)))
+            keys = _sorted_unique(np.concatenate([keys, draw_users.astype(np.int64) * m + draws]))
+            got = np.bincount((keys // m - start).astype(np.int64), minlength=len(users))
+            missing = np.maximum(wanted - got, 0)
+            if missing.sum() < 0.001 * wanted.sum():
+                break
+
+        user_idx = (keys // m).astype(np.int64)
+        movie_idx = (keys % m).astype(np.int64)
+        raw = quality[movie_idx] + bias[user_idx] + rng.normal(0.0, 0.85, len(keys))
+        ratings = np.clip(np.round(raw * 2) / 2, 0.5, 5.0)
+        timestamps = rng.integers(_FIRST_TIMESTAMP, _LAST_TIMESTAMP, len(keys))
+        yield pd.DataFrame({
+            "userId": user_idx + 1,
+            "movieId": movie_idx + 1,
+            "rating": ratings,
+            "timestamp": timestamps,
+        })
+        start = stop
+
+
+def tags_frame(scale: Scale, movie_exponent: float, rng: np.random.Generator) -> pd.DataFrame:
+    n = scale.tags
+    movies = rng.choice(scale.movies, size=n, p=zipf_weights(scale.movies, movie_exponent))
+    # A small share of users writes most tags.
+    users = rng.choice(scale.users, size=n, p=zipf_weights(scale.users, 1.2))
+    tags = rng.choice(_TAGS, size=n, p=zipf_weights(len(_TAGS), 1.0))
+    return pd.DataFrame({
+        "userId": users + 1,
+        "movieId": movies + 1,
+        "tag": tags,
+        "timestamp": rng.integers(_FIRST_TIMESTAMP, _LAST_TIMESTAMP, n),
+    })
+
+
+def personality_frame(scale: Scale, rng: np.random.Generator) -> pd.DataFrame:
+    users = np.sort(rng.choice(scale.users, size=scale.personality_users, replace=False)) + 1
+    frame = pd.DataFrame({"userid": users})
+    for trait in TRAITS:
+        # The survey scores traits 1-7 in half steps.
+        frame[trait] = np.clip(np.round(rng.normal(4.2, 1.1, len(users)) * 2) / 2, 1, 7)
+    return frame
+
+
+# --- Driver ---
+
+def write_dataset(
+    data_dir: str,
+    scale: Scale,
+    movie_exponent: float = 1.0,
+    user_exponent: float = 0.9,
+    seed: int = 0,
+) -> dict[str, int]:
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    started = time.monotonic()
+    counts = {}
+
+    movies = movies_frame(scale, rng)
+    movies.to_csv(os.path.join(data_dir, "movies.csv"), index=False, quoting=csv.QUOTE_MINIMAL)
+    counts["movies"] = len(movies)
+
+    counts["ratings"] = 0
+    with open(os.path.join(data_dir, "ratings.csv"), "w", newline="") as f:
+        f.write("userId,movieId,rating,timestamp\n")
+        for block in rating_blocks(scale, movie_exponent, user_exponent, rng):
+            block.to_csv(f, header=False, index=False, float_format="%.1f")
+            counts["ratings"] += len(block)
+            logger.info("Wrote %d / ~%d ratings", counts["ratings"], scale.ratings)
+
+    tags = tags_frame(scale, movie_exponent, rng)
+    tags.to_csv(os.path.join(data_dir, "tags.csv"), index=False)
+    counts["tags"] = len(tags)
+
+    personality = personality_frame(scale, rng)
+    personality.to_csv(os.path.join(data_dir, "personality-data.csv"), index=False)
+    counts["personality"] = len(personality)
+
+    logger.info("Wrote dataset to %s in %.1fs: %s", data_dir, time.monotonic() - started, counts)
+    return counts
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate and load a synthetic MovieLens-shaped dataset.")
+    parser.add_argument("--ratings", type=int, default=1_000_000, help="Target number of ratings")
+    parser.add_argument("--users", type=int, help="Users (default: ratings / 150)")
+    parser.add_argument("--movies", type=int, help="Movies (default: 5 * sqrt(ratings))")
+    parser.add_argument("--movie-skew", type=float, default=1.0,
+                        help="Zipf exponent of movie popularity")
+    parser.add_argument("--user-skew", type=float, default=0.9,
+                        help="Zipf exponent of user activity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="Where to write the CSVs (default: benchmarks/data/<ratings>)")
+    parser.add_argument("--no-load", action="store_true", help="Only write the CSVs")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent COPY streams per table")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Rows per COPY chunk")
+    args = parser.parse_args(argv)
+    if args.ratings < 1_000:
+        parser.error("--ratings must be at least 1000")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    defaults = Scale.for_ratings(args.ratings)
+    users = args.users or defaults.users
+    scale = Scale(
+        ratings=args.ratings,
+        users=users,
+        movies=args.movies or defaults.movies,
+        tags=defaults.tags,
+        personality_users=min(users, defaults.personality_users),
+    )
+    data_dir = args.data_dir or os.path.join(os.path.dirname(__file__), "data", str(args.ratings))
+    counts = write_dataset(data_dir, scale, args.movie_skew, args.user_skew, args.seed)
+    if not args.no_load:
+        from app import loader
+
+        counts = loader.run(data_dir, chunk_rows=args.chunk_rows, workers=args.workers)
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
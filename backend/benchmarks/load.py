@@ -0,0 +1,449 @@
+"""Concurrent HTTP load benchmark for every API router.
+
+Usage::
+
+    python -m benchmarks.load
+    python -m benchmarks.load --base-url http://staging:8000 --concurrency 64 --duration 30
+    python -m benchmarks.load --only "movies|genres" --output results/movies.json
+    python -m benchmarks.load --list
+
+Each endpoint is driven on its own, one after another: ``--concurrency``
+clients send back-to-back requests for ``--warmup`` seconds (discarded), then
+for ``--duration`` seconds (measured). Latency is timed from send until the
+whole body has been read, so streamed exports are measured end to end.
+
+Results (p50/p95/p99 latency and throughput per endpoint, plus the run's
+settings and git commit) are written as JSON; diff two runs with
+``python -m benchmarks.compare``. Run against a database filled by
+``python -m benchmarks.generate`` so plans and cache hit rates match
+production scale.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_BENCH_USER = {"username": "loadbench", "password": "loadbench-password", "email": "loadbench@example.com"}
+
+
+@dataclass
+class Fixtures:
+    """Ids and credentials the endpoints need, looked up once before the run."""
+    movie_ids: list[int]
+    title_prefixes: list[str]
+    genres: list[str]
+    headers: dict[str, str] = field(default_factory=dict)
+    collection_id: Optional[int] = None
+    job_id: Optional[str] = None
+    # Collections made by the create endpoint; the delete endpoint consumes them.
+    created: list[int] = field(default_factory=list)
+
+
+Request = Callable[[httpx.AsyncClient, Fixtures, random.Random], Awaitable[Optional[httpx.Response]]]
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    request: Request  # returns None when there was nothing to send
+
+
+def _get(path: str, **params) -> Request:
+    async def request(client, fx, rng):
+        return await client.get(path, params=params or None)
+    return request
+
+
+def _movie_list(**params) -> Request:
+    async def request(client, fx, rng):
+        return await client.get("/api/movies", params={"total_mode": "cached", **params})
+    return request
+
+
+async def _movie_list_by_genre(client, fx, rng):
+    return await client.get("/api/movies", params={"genre": rng.choice(fx.genres), "sort": "rating"})
+
+
+async def _movie_search(client, fx, rng):
+    return await client.get("/api/movies", params={"title": rng.choice(fx.title_prefixes)})
+
+
+async def _movie_deep_page(client, fx, rng):
+    first = await client.get("/api/movies", params={"sort": "year", "page_size": 100, "total_mode": "none"})
+    cursor = first.json().get("next_cursor") if first.status_code == 200 else None
+    if cursor is None:
+        return first
+    return await client.get("/api/movies", params={"sort": "year", "page_size": 100, "cursor": cursor,
+                                                   "total_mode": "none"})
+
+
+async def _autocomplete(client, fx, rng):
+    prefix = rng.choice(fx.title_prefixes)
+    return await client.get("/api/movies/autocomplete", params={"q": prefix[: rng.randint(1, len(prefix))]})
+
+
+async def _movie_batch(client, fx, rng):
+    ids = rng.sample(fx.movie_ids, min(20, len(fx.movie_ids)))
+    return await client.get("/api/movies/batch", params={"ids": ",".join(map(str, ids))})
+
+
+async def _movie_detail(client, fx, rng):
+    return await client.get(f"/api/movies/{rng.choice(fx.movie_ids)}")
+
+
+async def _movie_ratings(client, fx, rng):
+    return await client.get(f"/api/movies/{rng.choice(fx.movie_ids)}/ratings")
+
+
+def _prediction(rng: random.Random, fx: Fixtures) -> dict[str, Any]:
+    return {
+        "title": f"{rng.choice(fx.title_prefixes)} Returns",
+        "genres": rng.sample(fx.genres, min(2, len(fx.genres))),
+        "year": rng.randint(1970, 2024),
+    }
+
+
+async def _predict(client, fx, rng):
+    return await client.post("/api/predictions/predict", json=_prediction(rng, fx))
+
+
+async def _predict_batch(client, fx, rng):
+    return await client.post("/api/predictions/predict/batch", json=[_prediction(rng, fx) for _ in range(20)])
+
+
+async def _similar(client, fx, rng):
+    return await client.get(f"/api/predictions/similar/{rng.choice(fx.movie_ids)}")
+
+
+async def _segments(client, fx, rng):
+    return await client.get("/api/personality/segments", params={"n_segments": rng.randint(2, 8)})
+
+
+async def _login(client, fx, rng):
+    return await client.post("/api/auth/login", json={
+        "username": _BENCH_USER["username"], "password": _BENCH_USER["password"],
+    })
+
+
+async def _me(client, fx, rng):
+    return await client.get("/api/auth/me", headers=fx.headers)
+
+
+async def _list_collections(client, fx, rng):
+    return await client.get("/api/collections", headers=fx.headers)
+
+
+async def _create_collection(client, fx, rng):
+    response = await client.post("/api/collections", headers=fx.headers,
+                                 json={"name": f"bench {rng.getrandbits(32):08x}"})
+    if response.status_code == 201:
+        fx.created.append(response.json()["collection_id"])
+    return response
+
+
+async def _get_collection(client, fx, rng):
+    return await client.get(f"/api/collections/{fx.collection_id}", headers=fx.headers)
+
+
+async def _update_collection(client, fx, rng):
+    return await client.put(f"/api/collections/{fx.collection_id}", headers=fx.headers,
+                            json={"description": f"updated {rng.random():.6f}"})
+
+
+async def _delete_collection(client, fx, rng):
+    if not fx.created:
+        return None
+    return await client.delete(f"/api/collections/{fx.created.pop()}", headers=fx.headers)
+
+
+async def _add_movie(client, fx, rng):
+    return await client.post(f"/api/collections/{fx.collection_id}/movies", headers=fx.headers,
+                             json={"movie_id": rng.choice(fx.movie_ids)})
+
+
+async def _remove_movie(client, fx, rng):
+    return await client.delete(
+        f"/api/collections/{fx.collection_id}/movies/{rng.choice(fx.movie_ids)}", headers=fx.headers
+    )
+
+
+async def _bulk_add(client, fx, rng):
+    ids = rng.sample(fx.movie_ids, min(50, len(fx.movie_ids)))
+    return await client.post(f"/api/collections/{fx.collection_id}/movies/bulk", headers=fx.headers,
+                             json={"movie_ids": ids})
+
+
+async def _bulk_remove(client, fx, rng):
+    ids = rng.sample(fx.movie_ids, min(50, len(fx.movie_ids)))
+    return await client.post(f"/api/collections/{fx.collection_id}/movies/bulk-remove",
+                             headers=fx.headers, json={"movie_ids": ids})
+
+
+async def _submit_job(client, fx, rng):
+    return await client.post("/api/jobs/segments", json={"n_segments": rng.randint(2, 8)})
+
+
+async def _job_status(client, fx, rng):
+    if fx.job_id is None:
+        return None
+    return await client.get(f"/api/jobs/{fx.job_id}")
+
+
+async def _job_result(client, fx, rng):
+    if fx.job_id is None:
+        return None
+    return await client.get(f"/api/jobs/{fx.job_id}/result")
+
+
+# /api/ratings/low-raters is left out: it is a 501 stub.
+ENDPOINTS = [
+    Endpoint("GET /health", _get("/health")),
+    Endpoint("GET /health/pool", _get("/health/pool")),
+    Endpoint("GET /metrics", _get("/metrics")),
+    Endpoint("GET /api/movies", _movie_list()),
+    Endpoint("GET /api/movies?sort=num_ratings", _movie_list(sort="num_ratings")),
+    Endpoint("GET /api/movies?genre=&sort=rating", _movie_list_by_genre),
+    Endpoint("GET /api/movies?title=", _movie_search),
+    Endpoint("GET /api/movies?cursor=", _movie_deep_page),
+    Endpoint("GET /api/movies/export", _get("/api/movies/export")),
+    Endpoint("GET /api/movies/autocomplete", _autocomplete),
+    Endpoint("GET /api/movies/batch", _movie_batch),
+    Endpoint("GET /api/movies/{id}", _movie_detail),
+    Endpoint("GET /api/movies/{id}/ratings", _movie_ratings),
+    Endpoint("GET /api/genres", _get("/api/genres")),
+    Endpoint("GET /api/genres/popularity", _get("/api/genres/popularity")),
+    Endpoint("GET /api/genres/polarisation", _get("/api/genres/polarisation")),
+    Endpoint("GET /api/ratings/patterns", _get("/api/ratings/patterns")),
+    Endpoint("GET /api/ratings/patterns/export", _get("/api/ratings/patterns/export")),
+    Endpoint("GET /api/ratings/cross-genre", _get("/api/ratings/cross-genre")),
+    Endpoint("GET /api/ratings/consistency", _get("/api/ratings/consistency")),
+    Endpoint("POST /api/predictions/predict", _predict),
+    Endpoint("POST /api/predictions/predict/batch", _predict_batch),
+    Endpoint("GET /api/predictions/similar/{id}", _similar),
+    Endpoint("GET /api/personality/traits", _get("/api/personality/traits")),
+    Endpoint("GET /api/personality/genre-correlation", _get("/api/personality/genre-correlation")),
+    Endpoint("GET /api/personality/segments", _segments),
+    Endpoint("POST /api/auth/login", _login),
+    Endpoint("GET /api/auth/me", _me),
+    Endpoint("GET /api/collections", _list_collections),
+    Endpoint("POST /api/collections", _create_collection),
+    Endpoint("DELETE /api/collections/{id}", _delete_collection),
+    Endpoint("GET /api/collections/{id}", _get_collection),
+    Endpoint("PUT /api/collections/{id}", _update_collection),
+    Endpoint("POST /api/collections/{id}/movies", _add_movie),
+    Endpoint("DELETE /api/collections/{id}/movies/{movie_id}", _remove_movie),
+    Endpoint("POST /api/collections/{id}/movies/bulk", _bulk_add),
+    Endpoint("POST /api/collections/{id}/movies/bulk-remove", _bulk_remove),
+    Endpoint("POST /api/jobs/segments", _submit_job),
+    Endpoint("GET /api/jobs/{job_id}", _job_status),
+    Endpoint("GET /api/jobs/{job_id}/result", _job_result),
+]
+
+
+# --- Setup ---
+
+async def prepare(client: httpx.AsyncClient) -> Fixtures:
+    """Check the API is up, then look up movies, genres, a bench user, a collection and a job."""
+    health = (await client.get("/health")).raise_for_status().json()
+    if health.get("database") != "connected":
+        raise RuntimeError(f"API is not healthy: {health}")
+
+    top = (await client.get("/api/movies", params={
+        "sort": "num_ratings", "page_size": 100, "total_mode": "none",
+    })).raise_for_status().json()["movies"]
+    if not top:
+        raise RuntimeError("No movies loaded; run python -m benchmarks.generate first")
+    # Popular titles make the id-keyed endpoints follow the same skew as real traffic.
+    fx = Fixtures(
+        movie_ids=[m["movie_id"] for m in top],
+        title_prefixes=sorted({m["title"].split()[0].strip(",") for m in top}),
+        genres=[g["genre"] for g in (await client.get("/api/genres")).raise_for_status().json()],
+    )
+
+    registered = await client.post("/api/auth/register", json=_BENCH_USER)
+    if registered.status_code not in (201, 409):
+        registered.raise_for_status()
+    tokens = (await _login(client, fx, None)).raise_for_status().json()
+    fx.headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    collection = await client.post("/api/collections", headers=fx.headers, json={"name": "bench"})
+    fx.collection_id = collection.raise_for_status().json()["collection_id"]
+
+    job = await client.post("/api/jobs/segments", json={"n_segments": 5})
+    if job.status_code in (200, 202):
+        fx.job_id = job.json()["job_id"]
+    else:
+        logger.warning("Could not submit a job (%d); job status endpoints are skipped", job.status_code)
+    return fx
+
+
+async def cleanup(client: httpx.AsyncClient, fx: Fixtures) -> None:
+    for collection_id in [fx.collection_id, *fx.created]:
+        if collection_id is not None:
+            await client.delete(f"/api/collections/{collection_id}", headers=fx.headers)
+
+
+# --- Harness ---
+
+async def drive(
+    client: httpx.AsyncClient,
+    endpoint: Endpoint,
+    fx: Fixtures,
+    concurrency: int,
+    seconds: float,
+    seed: int,
+) -> tuple[list[float], Counter, float]:
+    """Run ``concurrency`` back-to-back clients for ``seconds``; (latencies in s, statuses, elapsed)."""
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    async def worker(rng: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            try:
+                response = await endpoint.request(client, fx, rng)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - sent)
+                continue
+            if response is None:
+                await asyncio.sleep(0.01)
+                continue
+            latencies.append(time.perf_counter() - sent)
+            statuses[str(response.status_code)] += 1
+
+    await asyncio.gather(*(worker(random.Random(seed + i)) for i in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def summarise(latencies: list[float], statuses: Counter, elapsed: float) -> dict[str, Any]:
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    result: dict[str, Any] = {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_counts": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": None,
+    }
+    if latencies:
+        ms = np.asarray(latencies) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        result["latency_ms"] = {
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "mean": round(float(ms.mean()), 2),
+            "max": round(float(ms.max()), 2),
+        }
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(
+    base_url: str,
+    endpoints: list[Endpoint],
+    concurrency: int = 16,
+    duration: float = 10.0,
+    warmup: float = 2.0,
+    timeout: float = 30.0,
+    seed: int = 0,
+) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    report: dict[str, Any] = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": base_url,
+            "concurrency": concurrency,
+            "duration": duration,
+            "warmup": warmup,
+            "git_commit": _git_commit(),
+        },
+        "endpoints": {},
+    }
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        fx = await prepare(client)
+        try:
+            for endpoint in endpoints:
+                if warmup > 0:
+                    await drive(client, endpoint, fx, concurrency, warmup, seed)
+                result = summarise(*await drive(client, endpoint, fx, concurrency, duration, seed))
+                report["endpoints"][endpoint.name] = result
+                latency = result["latency_ms"] or {}
+                logger.info(
+                    "%-50s %8.1f req/s  p50 %7.1f  p95 %7.1f  p99 %7.1f ms  errors %d",
+                    endpoint.name, result["throughput_rps"], latency.get("p50", 0),
+                    latency.get("p95", 0), latency.get("p99", 0), result["errors"],
+                )
+        finally:
+            await cleanup(client, fx)
+    report["meta"]["finished_at"] = datetime.now(timezone.utc).isoformat()
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-benchmark every API endpoint.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per endpoint")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--only", help="Regex; only endpoints whose name matches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<UTC time>.json)")
+    parser.add_argument("--list", action="store_true", help="List endpoint names and exit")
+    args = parser.parse_args(argv)
+
+    endpoints = ENDPOINTS
+    if args.only:
+        endpoints = [e for e in ENDPOINTS if re.search(args.only, e.name)]
+        if not endpoints:
+            parser.error(f"--only {args.only!r} matches no endpoint")
+    if args.list:
+        for endpoint in endpoints:
+            print(endpoint.name)
+        return
+    if args.concurrency < 1 or args.duration <= 0:
+        parser.error("--concurrency and --duration must be positive")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = asyncio.run(run(
+        args.base_url, endpoints, args.concurrency, args.duration, args.warmup, args.timeout, args.seed,
+    ))
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results",
+        datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.auth import db as auth_db
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    async def get_user_by_id(user_id):
+        calls.append(user_id)
+        return {"user_id": user_id, "username": f"user{user_id}"}
+
+    monkeypatch.setattr(auth_db, "get_user_by_id", get_user_by_id)
+    auth_db._user_cache.clear()
+    yield calls
+    auth_db._user_cache.clear()
+
+
+def test_cached_lookup_hits_database_once(lookups):
+    async def scenario():
+        first = await auth_db.get_user_by_id_cached(7)
+        second = await auth_db.get_user_by_id_cached(7)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"user_id": 7, "username": "user7"}
+    assert lookups == [7]
+
+
+def test_invalidate_user_forces_reload(lookups):
+    async def scenario():
+        await auth_db.get_user_by_id_cached(7)
+        auth_db.invalidate_user(7)
+        await auth_db.get_user_by_id_cached(7)
+
+    asyncio.run(scenario())
+    assert lookups == [7, 7]
@@ -0,0 +1,39 @@
+from app.autocomplete import PrefixIndex
+
+MOVIES = [
+    {"movie_id": 1, "title": "Matrix, The (1999)", "num_ratings": 500},
+    {"movie_id": 2, "title": "Matrix Reloaded, The (2003)", "num_ratings": 200},
+    {"movie_id": 3, "title": "Mathilde (2004)", "num_ratings": 10},
+    {"movie_id": 4, "title": "Amélie (2001)", "num_ratings": 300},
+    {"movie_id": 5, "title": "Heat (1995)", "num_ratings": None},
+]
+
+
+def _ids(results):
+    return [movie["movie_id"] for movie in results]
+
+
+def test_prefix_ranked_by_popularity():
+    assert _ids(PrefixIndex(MOVIES).search("mat", 10)) == [1, 2, 3]
+
+
+def test_matches_later_words_and_moved_article():
+    index = PrefixIndex(MOVIES)
+    assert _ids(index.search("reloaded", 10)) == [2]
+    assert _ids(index.search("the matrix", 10)) == [1, 2]
+
+
+def test_each_title_once_even_when_several_words_match():
+    assert _ids(PrefixIndex(MOVIES).search("the", 10)) == [1, 2]
+
+
+def test_folds_case_and_accents():
+    assert _ids(PrefixIndex(MOVIES).search("AMELIE", 10)) == [4]
+
+
+def test_limit_and_misses():
+    index = PrefixIndex(MOVIES)
+    assert _ids(index.search("mat", 2)) == [1, 2]
+    assert index.search("zzz", 10) == []
+    assert index.search("  ", 10) == []
+    assert _ids(index.search("heat", 10)) == [5]
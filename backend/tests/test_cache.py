@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.cache import CachedRoute, cached, invalidate
+from app.singleflight import coalesced
+
+calls = {"hello": 0, "slow": 0}
+
+router = APIRouter(route_class=CachedRoute)
+
+
+@router.get("/hello")
+@cached(60)
+async def hello(name: str = "world"):
+    calls["hello"] += 1
+    return {"greeting": f"hello {name}"}
+
+
+@router.get("/missing")
+@cached(60)
+async def missing():
+    calls["hello"] += 1
+    raise HTTPException(status_code=404)
+
+
+@router.get("/slow-async")
+@coalesced
+async def slow_async():
+    calls["slow"] += 1
+    await asyncio.sleep(0.2)
+    return {"calls": calls["slow"]}
+
+
+@router.get("/slow-sync")
+@coalesced
+def slow_sync():
+    calls["slow"] += 1
+    time.sleep(0.2)
+    return {"calls": calls["slow"]}
+
+
+app = FastAPI()
+app.include_router(router)
+
+
+@pytest.fixture
+def client():
+    invalidate()
+    calls["hello"] = calls["slow"] = 0
+    return TestClient(app)
+
+
+def test_etag_and_cache_hit(client):
+    first = client.get("/hello")
+    second = client.get("/hello")
+    assert first.status_code == second.status_code == 200
+    assert first.json() == {"greeting": "hello world"}
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+    assert calls["hello"] == 1
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/hello").headers["etag"]
+    revalidated = client.get("/hello", headers={"If-None-Match": f'"other", {etag}'})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert client.get("/hello", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_query_string_is_part_of_the_key(client):
+    a = client.get("/hello", params={"name": "a"})
+    b = client.get("/hello", params={"name": "b"})
+    assert a.headers["etag"] != b.headers["etag"]
+    assert calls["hello"] == 2
+
+
+def test_errors_are_not_cached(client):
+    assert client.get("/missing").status_code == 404
+    assert client.get("/missing").status_code == 404
+    assert calls["hello"] == 2
+
+
+def test_invalidate_drops_entries(client):
+    client.get("/hello")
+    invalidate("/hello")
+    client.get("/hello")
+    assert calls["hello"] == 2
+
+
+@pytest.mark.parametrize("path", ["/slow-async", "/slow-sync"])
+def test_coalesced_requests_share_one_execution(path):
+    calls["slow"] = 0
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get(path) for _ in range(5)))
+
+    responses = asyncio.run(burst())
+    assert [r.json() for r in responses] == [{"calls": 1}] * 5
+    assert "etag" not in responses[0].headers
+    assert calls["slow"] == 1
+
+
+def test_coalesced_responses_are_not_cached(client):
+    assert client.get("/slow-sync").json() == {"calls": 1}
+    assert client.get("/slow-sync").json() == {"calls": 2}
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.schemas import UserInfo
+from app.auth.users import get_current_user
+from app.routers import collections
+
+USER = UserInfo(user_id=1, username="alice", email="alice@example.com",
+                created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+app = FastAPI()
+app.include_router(collections.router)
+app.dependency_overrides[get_current_user] = lambda: USER
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Stands in for the statements: records calls and returns the configured rows."""
+    state = {"calls": [], "result": None, "movie": {"?column?": 1}}
+
+    async def execute_returning(sql, params=(), *, name=None):
+        state["calls"].append((name, params))
+        return state["result"]
+
+    async def execute_query_one(sql, params=(), *, name=None):
+        state["calls"].append((name, params))
+        return state["movie"]
+
+    monkeypatch.setattr(collections, "execute_returning", execute_returning)
+    monkeypatch.setattr(collections, "execute_query_one", execute_query_one)
+    return state
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_bulk_add_dedupes_ids_and_returns_counts(client, db):
+    db["result"] = {"collection_id": 5, "changed": 2, "movie_count": 7}
+    response = client.post("/api/collections/5/movies/bulk", json={"movie_ids": [3, 4, 3]})
+    assert response.status_code == 200
+    assert response.json() == {"collection_id": 5, "changed": 2, "movie_count": 7}
+    assert db["calls"] == [("add_collection_movies", (5, 1, [3, 4]))]
+
+
+def test_bulk_remove_uses_post(client, db):
+    db["result"] = {"collection_id": 5, "changed": 1, "movie_count": 6}
+    response = client.post("/api/collections/5/movies/bulk-remove", json={"movie_ids": [3]})
+    assert response.json()["changed"] == 1
+    assert db["calls"] == [("remove_collection_movies", (5, 1, [3]))]
+
+
+def test_bulk_rejects_empty_list(client, db):
+    assert client.post("/api/collections/5/movies/bulk", json={"movie_ids": []}).status_code == 422
+
+
+def test_unknown_or_foreign_collection_is_404(client, db):
+    response = client.post("/api/collections/5/movies/bulk", json={"movie_ids": [3]})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Collection not found"
+
+
+def test_add_existing_movie_again_is_a_noop(client, db):
+    db["result"] = {"collection_id": 5, "changed": 0, "movie_count": 7}
+    response = client.post("/api/collections/5/movies", json={"movie_id": 3})
+    assert response.status_code == 201
+    assert response.json()["changed"] == 0
+
+
+def test_add_unknown_movie_is_404(client, db):
+    db["result"] = {"collection_id": 5, "changed": 0, "movie_count": 7}
+    db["movie"] = None
+    response = client.post("/api/collections/5/movies", json={"movie_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Movie not found"
+
+
+def test_add_new_movie_skips_existence_check(client, db):
+    db["result"] = {"collection_id": 5, "changed": 1, "movie_count": 8}
+    assert client.post("/api/collections/5/movies", json={"movie_id": 3}).status_code == 201
+    assert [name for name, _ in db["calls"]] == ["add_collection_movies"]
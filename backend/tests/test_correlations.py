@@ -0,0 +1,54 @@
+import numpy as np
+from scipy import sparse, stats
+
+from app.correlations import CorrelationAccumulator
+
+
+def _pairwise_r(x, y):
+    both = ~np.isnan(x) & ~np.isnan(y)
+    return stats.pearsonr(x[both], y[both])
+
+
+def test_matches_pearson_on_pairwise_complete_rows():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(200, 3))
+    y = x[:, :2] * 0.5 + rng.normal(size=(200, 2))
+    x[rng.random(x.shape) < 0.2] = np.nan
+    y[rng.random(y.shape) < 0.3] = np.nan
+
+    acc = CorrelationAccumulator(3, 2)
+    for start in range(0, 200, 64):  # blocks must add up to one pass over every user
+        acc.add(x[start:start + 64], y[start:start + 64])
+    r, p, n = acc.result()
+
+    for i in range(3):
+        for j in range(2):
+            expected = _pairwise_r(x[:, i], y[:, j])
+            assert n[i, j] == np.sum(~np.isnan(x[:, i]) & ~np.isnan(y[:, j]))
+            assert np.isclose(r[i, j], expected.statistic)
+            assert np.isclose(p[i, j], expected.pvalue)
+
+
+def test_undefined_without_variance_or_enough_pairs():
+    x = np.array([[1.0], [1.0], [1.0], [np.nan]])
+    y = np.array([[1.0, 1.0], [2.0, np.nan], [3.0, np.nan], [4.0, 2.0]])
+    acc = CorrelationAccumulator(1, 2)
+    acc.add(x, y)
+    r, p, n = acc.result()
+    assert np.isnan(r).all() and np.isnan(p).all()
+    assert n.tolist() == [[3, 1]]
+
+
+def test_sparse_matches_dense():
+    rng = np.random.default_rng(1)
+    dense = rng.normal(size=(100, 4))
+    dense[rng.random(dense.shape) < 0.4] = np.nan
+    stored = np.nan_to_num(dense, nan=0.0)
+    # Observed zeros would vanish from a sparse matrix; keep them nonzero.
+    stored[(stored == 0) & ~np.isnan(dense)] = 1e-9
+
+    dense_acc, sparse_acc = CorrelationAccumulator(4, 4), CorrelationAccumulator(4, 4)
+    dense_acc.add(dense, dense)
+    sparse_acc.add_sparse(sparse.csr_matrix(stored))
+    for a, b in zip(dense_acc.result(), sparse_acc.result()):
+        assert np.allclose(a, b, equal_nan=True)
@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import jobs
+from app.jobs import JobRunner, params_hash
+
+
+def test_params_hash_ignores_key_order():
+    assert params_hash("similar", {"movie_id": 1, "limit": 10}, "v1") == params_hash(
+        "similar", {"limit": 10, "movie_id": 1}, "v1"
+    )
+
+
+def test_params_hash_depends_on_kind_params_and_version():
+    base = params_hash("segments", {"n_segments": 5}, "v1")
+    assert params_hash("segments", {"n_segments": 6}, "v1") != base
+    assert params_hash("segments", {"n_segments": 5}, "v2") != base
+    assert params_hash("cross-genre", {"n_segments": 5}, "v1") != base
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Records job-table writes; the first ``failures`` of them raise."""
+    state = {"calls": [], "failures": 0}
+
+    async def execute_command(sql, params=(), *, name=None):
+        state["calls"].append(name)
+        if len(state["calls"]) <= state["failures"]:
+            raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(jobs, "execute_command", execute_command)
+    monkeypatch.setattr(jobs, "execute", lambda kind, version, params: "[]")
+    return state
+
+
+def _run_job(runner):
+    job = {"job_id": "j1", "kind": "segments", "artifact_version": "v1", "params": {},
+           "attempts": 1}
+
+    async def scenario():
+        runner._executor = ThreadPoolExecutor(1)
+        runner._running[job["job_id"]] = None
+        await runner._execute(job)
+        runner._executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_outcome_write_is_retried(writes):
+    writes["failures"] = 1
+    runner = JobRunner(workers=1, poll_interval=0)
+    _run_job(runner)
+    assert writes["calls"] == ["finish_job", "finish_job"]
+    assert runner._running == {}
+
+
+def test_outcome_left_for_stale_retry_after_repeated_failures(writes):
+    writes["failures"] = JobRunner._RECORD_ATTEMPTS
+    runner = JobRunner(workers=1, poll_interval=0)
+    _run_job(runner)
+    assert writes["calls"] == ["finish_job"] * JobRunner._RECORD_ATTEMPTS
+    assert runner._running == {}
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from app import migrate
+
+_PLAN = {
+    "Node Type": "Limit",
+    "Plans": [
+        {
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "ratings"},
+                {"Node Type": "Index Scan", "Relation Name": "movies"},
+                {"Node Type": "Seq Scan", "Relation Name": "genres_small"},
+            ],
+        }
+    ],
+}
+
+
+def test_seq_scans_walks_nested_plans():
+    assert list(migrate._seq_scans(_PLAN)) == ["ratings", "genres_small"]
+    assert list(migrate._seq_scans({"Node Type": "Index Only Scan"})) == []
+
+
+class _Cursor:
+    """Answers EXPLAIN with _PLAN and pg_class lookups with fixed row estimates."""
+
+    reltuples = {"ratings": 5_000_000.0, "genres_small": 20.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if sql.startswith("EXPLAIN"):
+            # psycopg2 may return json columns as text; check_plans handles both.
+            self._row = (json.dumps([{"Plan": _PLAN}]),)
+        else:
+            self._row = (self.reltuples[params[0]],)
+
+    def fetchone(self):
+        return self._row
+
+
+class _Connection:
+    def cursor(self):
+        return _Cursor()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    monkeypatch.setattr(migrate, "HOT_QUERIES", {"hot": "SELECT 1"})
+    monkeypatch.setattr(migrate, "connect", _Connection)
+
+
+def test_check_plans_reports_seq_scans_on_large_tables_only(fake_db):
+    assert migrate.check_plans(min_rows=10_000) == ["hot: seq scan on ratings (~5000000 rows)"]
+
+
+def test_check_plans_threshold(fake_db):
+    assert migrate.check_plans(min_rows=10_000_000) == []
+    assert len(migrate.check_plans(min_rows=1)) == 2
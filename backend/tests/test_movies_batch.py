@@ -0,0 +1,42 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.routers import movies
+
+app = FastAPI()
+app.include_router(movies.router)
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    calls = []
+
+    async def execute_query(sql, params=(), *, name=None):
+        calls.append((name, params))
+        return [
+            {"movie_id": i, "title": f"Movie {i}", "genres": [], "avg_rating": None,
+             "num_ratings": 0, "year": None, "tags": []}
+            for i in params[0]
+        ]
+
+    monkeypatch.setattr(movies, "execute_query", execute_query)
+    return calls
+
+
+def test_batch_is_one_query_with_deduplicated_ids_in_order(queries):
+    response = TestClient(app).get("/api/movies/batch", params={"ids": "3,1,3,2"})
+    assert response.status_code == 200
+    assert [m["movie_id"] for m in response.json()] == [3, 1, 2]
+    assert queries == [("movie_details", ([3, 1, 2], [3, 1, 2]))]
+
+
+def test_batch_rejects_too_many_ids(queries):
+    ids = ",".join(str(i) for i in range(settings.MOVIE_BATCH_MAX + 1))
+    assert TestClient(app).get("/api/movies/batch", params={"ids": ids}).status_code == 400
+    assert queries == []
+
+
+def test_batch_rejects_malformed_ids(queries):
+    assert TestClient(app).get("/api/movies/batch", params={"ids": "1,,2"}).status_code == 422
@@ -0,0 +1,44 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.movies import _decode_cursor, _encode_cursor
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "sort, key",
+    [("title", "Heat (1995)"), ("rating", 4.25), ("rating", 0), ("year", 1999),
+     ("num_ratings", 120), ("relevance", 0.5)],
+)
+def test_round_trip(sort, key):
+    assert _decode_cursor(_encode_cursor(sort, key, 42), sort) == (key, 42)
+
+
+def test_rejects_other_sort():
+    with pytest.raises(HTTPException) as e:
+        _decode_cursor(_encode_cursor("year", 1999, 42), "title")
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["!!!", _raw_cursor({"a": 1}), _raw_cursor([1, 2]), _raw_cursor(5)])
+def test_rejects_malformed(cursor):
+    with pytest.raises(HTTPException) as e:
+        _decode_cursor(cursor, "year")
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "sort, key, movie_id",
+    [("year", [1999], 1), ("year", "1999", 1), ("rating", {"x": 1}, 1), ("title", 3, 1),
+     ("num_ratings", True, 1), ("year", 1999, "1"), ("year", 1999, False)],
+)
+def test_rejects_mistyped_key_or_id(sort, key, movie_id):
+    with pytest.raises(HTTPException) as e:
+        _decode_cursor(_raw_cursor([sort, key, movie_id]), sort)
+    assert e.value.status_code == 400
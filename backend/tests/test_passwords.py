@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from passlib.hash import bcrypt
+
+from app.auth.passwords import PasswordHasher, PasswordHashingBusy, verify_and_update
+from app.config import settings
+
+
+async def _until(predicate):
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_sheds_when_max_pending_reached_and_releases_slot():
+    async def scenario():
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        # Same submit/future interface as the process pool, without spawning.
+        hasher._executor = ThreadPoolExecutor(1)
+        release = threading.Event()
+        blocked = asyncio.create_task(hasher._run(release.wait))
+        await _until(lambda: hasher.pending == 1)
+        with pytest.raises(PasswordHashingBusy):
+            await hasher.hash("secret")
+        release.set()
+        assert await blocked is True
+        await _until(lambda: hasher.pending == 0)
+        hasher.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_slot_held_until_work_finishes_when_caller_gives_up():
+    async def scenario():
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        hasher._executor = ThreadPoolExecutor(1)
+        release = threading.Event()
+        caller = asyncio.create_task(hasher._run(release.wait))
+        await _until(lambda: hasher.pending == 1)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        assert hasher.pending == 1
+        release.set()
+        await _until(lambda: hasher.pending == 0)
+        hasher.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_threadpool_fallback_without_started_pool():
+    async def scenario():
+        hasher = PasswordHasher(workers=0, max_pending=4)
+        hasher.start()
+        assert await hasher._run(sum, [1, 2, 3]) == 6
+        assert hasher.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_verify_and_update_rehashes_outdated_cost():
+    old_rounds = 4 if settings.BCRYPT_ROUNDS != 4 else 5
+    stored = bcrypt.using(rounds=old_rounds).hash("secret")
+
+    valid, new_hash = verify_and_update("secret", stored)
+    assert valid
+    assert new_hash is not None and bcrypt.from_string(new_hash).rounds == settings.BCRYPT_ROUNDS
+
+    assert verify_and_update("secret", new_hash) == (True, None)
+    assert verify_and_update("wrong", stored) == (False, None)
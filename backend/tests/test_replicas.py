@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from psycopg import OperationalError
+
+from app import async_database
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn, self.drained = conn, False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None, **kwargs):
+        if self.conn.fails:
+            raise OperationalError("server closed the connection unexpectedly")
+
+    async def fetchall(self):
+        return [{"server": self.conn.name}]
+
+    async def fetchone(self):
+        return {"server": self.conn.name}
+
+    async def fetchmany(self, size):
+        rows = [] if self.drained else [{"server": self.conn.name}]
+        self.drained = True
+        return rows
+
+
+class _Connection:
+    def __init__(self, name, fails):
+        self.name, self.fails = name, fails
+
+    def cursor(self, **kwargs):
+        return _Cursor(self)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class _Pool:
+    def __init__(self, name, fails=False):
+        self.conn = _Connection(name, fails)
+        self.out = 0
+
+    async def getconn(self):
+        self.out += 1
+        return self.conn
+
+    async def putconn(self, conn):
+        self.out -= 1
+
+
+class _Replica:
+    def __init__(self, pool):
+        self.pool, self.stats, self.failed = pool, async_database.PoolStats(), None
+
+    def mark_failed(self, error):
+        self.failed = error
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primary, replica_pool = _Pool("primary"), _Pool("replica", fails=True)
+    replica = _Replica(replica_pool)
+    monkeypatch.setattr(async_database, "_pool", primary)
+    monkeypatch.setattr(async_database.replicas, "pick", lambda: replica)
+    return primary, replica
+
+
+def _with_replica_reads(coro_fn):
+    async def run():
+        token = async_database._replica_reads.set(True)
+        try:
+            return await coro_fn()
+        finally:
+            async_database._replica_reads.reset(token)
+
+    return asyncio.run(run())
+
+
+def test_read_failing_on_replica_mid_query_retries_on_primary(pools):
+    primary, replica = pools
+    rows = _with_replica_reads(lambda: async_database.execute_query("SELECT 1"))
+    assert rows == [{"server": "primary"}]
+    assert isinstance(replica.failed, OperationalError)
+    assert primary.out == replica.pool.out == 0
+
+
+def test_query_one_retries_on_primary(pools):
+    row = _with_replica_reads(lambda: async_database.execute_query_one("SELECT 1"))
+    assert row == {"server": "primary"}
+
+
+def test_stream_retries_on_primary_before_first_batch(pools):
+    async def collect():
+        return [rows async for rows in async_database.stream_query("SELECT 1")]
+
+    assert _with_replica_reads(collect) == [[{"server": "primary"}]]
+
+
+def test_primary_failure_is_not_retried(pools):
+    primary, replica = pools
+    primary.conn.fails = True
+    with pytest.raises(OperationalError):
+        asyncio.run(async_database.execute_query("SELECT 1"))
+    assert replica.failed is None
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from app import segments
+
+
+def test_build_refuses_empty_personality_data(monkeypatch):
+    empty = np.empty((0, len(segments.TRAITS)), dtype=np.float32)
+    monkeypatch.setattr(
+        segments, "build_features", lambda: (np.empty(0, dtype=np.int32), empty, segments.TRAITS)
+    )
+
+    def publish(*args):
+        raise AssertionError("nothing should be published")
+
+    monkeypatch.setattr(segments, "publish", publish)
+    with pytest.raises(RuntimeError, match="personality"):
+        segments.build()
@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.similarity import _top_k, compute
+
+MOVIE_IDS = np.array([10, 20, 30, 40], dtype=np.int32)
+GENRES = [["Drama"], ["Drama"], ["Comedy"], ["Horror"]]
+# Movies 10 and 20 are rated alike by three users; 40 has no ratings at all.
+USER_IDS = np.array([1, 1, 1, 2, 2, 2, 3, 3, 3])
+RATING_MOVIE_IDS = np.array([10, 20, 30, 10, 20, 30, 10, 20, 30])
+RATINGS = np.array([5.0, 5.0, 1.0, 4.0, 4.0, 2.0, 5.0, 4.5, 1.5])
+
+
+def _compute(**overrides):
+    kwargs = dict(top_k=2, genre_weight=0.0, shrinkage=0.0)
+    kwargs.update(overrides)
+    return compute(MOVIE_IDS, GENRES, USER_IDS, RATING_MOVIE_IDS, RATINGS, **kwargs)
+
+
+def test_top_k_returns_sorted_positions_and_scores():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7]])
+    positions, top = _top_k(scores, 3)
+    assert positions.tolist() == [[1, 3, 2]]
+    assert top.tolist() == [[0.9, 0.7, 0.5]]
+
+
+def test_neighbours_exclude_self_and_are_descending():
+    neighbors, scores = _compute()
+    assert neighbors.shape == scores.shape == (4, 2)
+    for row in range(4):
+        assert row not in neighbors[row]
+        assert scores[row, 0] >= scores[row, 1]
+    assert neighbors[0, 0] == 1 and neighbors[1, 0] == 0
+
+
+def test_zero_shrinkage_without_co_raters_is_finite():
+    _, scores = _compute()
+    assert np.isfinite(scores).all()
+    # Movie 40 shares no raters or genres with anything.
+    assert (scores[3] == 0).all()
+
+
+def test_shrinkage_pulls_scores_towards_zero():
+    _, plain = _compute()
+    _, shrunk = _compute(shrinkage=10.0)
+    assert 0 < shrunk[0, 0] < plain[0, 0]
+    assert np.isclose(shrunk[0, 0], plain[0, 0] * 3 / 13, atol=1e-5)
+
+
+def test_genre_weight_blends_in_jaccard():
+    neighbors, scores = _compute(genre_weight=1.0)
+    assert neighbors[0, 0] == 1
+    assert np.isclose(scores[0, 0], 1.0)
+
+
+def test_top_k_clamped_to_other_movies():
+    neighbors, _ = _compute(top_k=50)
+    assert neighbors.shape == (4, 3)
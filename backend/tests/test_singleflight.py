@@ -0,0 +1,36 @@
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_do_shares_one_call_between_threads():
+    flight, calls, results = SingleFlight(), [], []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return "done"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["done"] * 5
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_do_propagates_errors_and_forgets_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: 42) == 42